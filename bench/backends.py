@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compare the RPC backends' payload sizes and decode times.
+
+The same ``Bug.search`` and ``Bug.comments`` results are encoded as each
+backend would receive them from the server, then decoded the way the
+backend decodes them.  No server is needed.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import timeit
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from bzlib import backend  # noqa: E402
+
+
+def search_result(n):
+    when = datetime.datetime(2015, 4, 25, 12, 0, 0)
+    return {'bugs': [
+        {
+            'id': i,
+            'alias': [],
+            'assigned_to': 'user{}@example.com'.format(i % 50),
+            'cc': ['user{}@example.com'.format(j) for j in range(i % 5)],
+            'component': 'Component {}'.format(i % 20),
+            'creation_time': when,
+            'creator': 'user{}@example.com'.format(i % 70),
+            'is_open': bool(i % 3),
+            'keywords': [],
+            'last_change_time': when,
+            'priority': 'P{}'.format(i % 5 + 1),
+            'product': 'Product {}'.format(i % 10),
+            'resolution': '' if i % 3 else 'FIXED',
+            'severity': 'normal',
+            'status': 'CONFIRMED' if i % 3 else 'RESOLVED',
+            'summary': 'Summary of bug {} '.format(i) * 3,
+            'version': '1.{}'.format(i % 7),
+            'whiteboard': '',
+        }
+        for i in range(1, n + 1)
+    ]}
+
+
+def comments_result(n):
+    when = datetime.datetime(2015, 4, 25, 12, 0, 0)
+    return {'bugs': {'1': {'comments': [
+        {
+            'id': i,
+            'bug_id': 1,
+            'count': i,
+            'creator': 'user{}@example.com'.format(i % 70),
+            'creation_time': when,
+            'time': when,
+            'is_private': False,
+            'text': 'Comment text, line {}.\n'.format(i) * 10,
+        }
+        for i in range(n)
+    ]}}, 'comments': {}}
+
+
+def encodings(result):
+    """Return the response body each backend receives for ``result``."""
+    return {
+        'xmlrpc': xmlrpclib.dumps(
+            (result,), methodresponse=True, allow_none=True),
+        'jsonrpc': backend.dumps({'result': result, 'error': None, 'id': 1}),
+        'rest': backend.dumps(result),
+    }
+
+
+decoders = {
+    'xmlrpc': lambda data: xmlrpclib.loads(data, use_datetime=True)[0][0],
+    'jsonrpc': lambda data: backend.loads(data)['result'],
+    'rest': backend.loads,
+}
+
+
+def run(sizes, repeat):
+    results = []
+    for name, make, n in (
+        [('Bug.search', search_result, n) for n in sizes]
+        + [('Bug.comments', comments_result, n) for n in sizes]
+    ):
+        for key, data in sorted(encodings(make(n)).items()):
+            data = data.encode('utf-8') if not isinstance(data, bytes) \
+                else data
+            decode = decoders[key]
+            seconds = min(timeit.repeat(
+                lambda: decode(data), number=1, repeat=repeat))
+            results.append({
+                'method': name,
+                'items': n,
+                'backend': key,
+                'bytes': len(data),
+                'decode_seconds': seconds,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+        default=[10, 100, 1000, 10000],
+        help='numbers of bugs / comments in each result')
+    parser.add_argument('--repeat', type=int, default=5,
+        help='decode each payload N times and report the fastest')
+    parser.add_argument('--json', action='store_true',
+        help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('{:14} {:>6} {:8} {:>12} {:>12}'.format(
+        'METHOD', 'ITEMS', 'BACKEND', 'BYTES', 'DECODE (ms)'))
+    for r in results:
+        print('{method:14} {items:6} {backend:8} {bytes:12} {0:12.2f}'.format(
+            r['decode_seconds'] * 1000, **r))
+
+
+if __name__ == '__main__':
+    main()
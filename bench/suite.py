@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark commands and library functions against a local server.
+
+For each number of bugs, a ``bzlib.fakeserver`` holding that many bugs
+is started in a child process.  Each benchmark runs in a child process
+of its own with a new ``Bugzilla``, and records its wall time, the
+number of RPCs made and bytes transferred, and how much the peak
+resident memory of the process grew (``peak_memory``; Unix only).  On
+Python 3.4 or later, the peak memory allocated by Python is recorded
+too (``peak_allocated``).  Command output is discarded.  A failing
+benchmark is recorded with its error.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty  # Python 2
+try:
+    import resource
+except ImportError:
+    resource = None  # not Unix
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # Python < 3.4
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+import bzlib  # noqa: E402
+from bzlib import bug  # noqa: E402
+from bzlib import bugzilla  # noqa: E402
+from bzlib import command  # noqa: E402
+from bzlib import fakeserver  # noqa: E402
+from bzlib import stats  # noqa: E402
+
+USER = 'user@example.com'
+
+
+def serve(n, comments, latency, bandwidth, queue):
+    """Serve ``n`` bugs with some comments and history until killed."""
+    store = fakeserver.Store()
+    bugnos = store.populate(n, comments=comments)
+    store.Bug_update({'ids': bugnos, 'work_time': 1.5})
+    server = fakeserver.FakeServer(store, latency, bandwidth)
+    queue.put(server.url)
+    server.serve_forever()
+
+
+class _Discard(object):
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+def _command(cls, **kwargs):
+    """Return a function that runs the command with the given args."""
+    def run(bz, bugnos):
+        args = dict(
+            bugs=bugnos, message=None, jobs=None, url=bz.url,
+            user=bz.user, password=bz.password, server=None,
+        )
+        args.update(kwargs)
+        cmd = cls(argparse.Namespace(**args), None, {}, {}, None)
+        cmd.bz.close()
+        cmd.bz = bz
+        cmd()
+    return run
+
+
+def _search(bz, bugnos):
+    return list(bug.Bug.search(bz, product='TestProduct'))
+
+
+def _field_values(bz, bugnos):
+    return bz.get_field_values('bug_status')
+
+
+def _actual_time(bz, bugnos):
+    bugs = bz.prefetch_history([bz.bug(x) for x in bugnos])
+    return [x.actual_time() for x in bugs]
+
+
+# (name, kind, function); commands that update bugs come last
+BENCHMARKS = [
+    ('Info', 'command', _command(command.Info)),
+    ('List', 'command', _command(command.List)),
+    ('Search', 'command', _command(
+        command.Search, summary=['Generated'], limit=None,
+        **{k: None for k in
+           command.Search.set_arguments
+           + tuple('not_' + x for x in command.Search.set_arguments)}
+    )),
+    ('History', 'command', _command(command.History)),
+    ('Comment', 'command', _command(
+        command.Comment, reverse=True, omit_empty=True, limit=None,
+        which=None, is_private=False)),
+    ('Status', 'command', _command(
+        command.Status, status='RESOLVED', resolution='FIXED',
+        dupe_of=None)),
+    ('Assign', 'command', _command(command.Assign, to=USER)),
+    ('Bug.search', 'library', _search),
+    ('get_field_values', 'library', _field_values),
+    ('actual_time', 'library', _actual_time),
+]
+
+
+def _max_rss():
+    """Return the peak resident memory of this process in bytes."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _measure(url, name, bugnos, config, queue):
+    """Run the named benchmark and put its measurements on ``queue``."""
+    fn = [x[2] for x in BENCHMARKS if x[0] == name][0]
+    bz = bugzilla.Bugzilla(url, USER, 'password', **config)
+    calls = stats.Stats()
+    bz.observers.append(calls)
+    stdout, sys.stdout = sys.stdout, _Discard()
+    if tracemalloc:
+        tracemalloc.start()
+    rss = _max_rss()
+    error = None
+    start = time.time()
+    try:
+        fn(bz, bugnos)
+    except Exception as e:
+        error = repr(e)
+    finally:
+        seconds = time.time() - start
+        peak = _max_rss() - rss if rss is not None else None
+        allocated = \
+            tracemalloc.get_traced_memory()[1] if tracemalloc else None
+        if tracemalloc:
+            tracemalloc.stop()
+        sys.stdout = stdout
+        bz.close()
+    total = calls.total()
+    queue.put({
+        'seconds': seconds,
+        'rpcs': total.calls,
+        'bytes_sent': bz.transport.bytes_sent,
+        'bytes_received': bz.transport.bytes_received,
+        'peak_memory': peak,
+        'peak_allocated': allocated,
+        'error': error,
+    })
+
+
+def measure(url, name, bugnos, config):
+    """Run the named benchmark in a child process; return its measurements.
+
+    A new process does not include the memory peaks of earlier
+    benchmarks.
+    """
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(
+        target=_measure, args=(url, name, bugnos, config, queue))
+    child.start()
+    try:
+        while True:
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                if not child.is_alive():
+                    raise RuntimeError(
+                        'benchmark {} exited with code {}'
+                        .format(name, child.exitcode))
+    finally:
+        child.join()
+
+
+def run(sizes, names, comments, latency, bandwidth, config):
+    results = []
+    for n in sizes:
+        queue = multiprocessing.Queue()
+        server = multiprocessing.Process(
+            target=serve, args=(n, comments, latency, bandwidth, queue))
+        server.daemon = True
+        server.start()
+        try:
+            url = queue.get(timeout=600)
+            bugnos = list(range(1, n + 1))
+            for name, kind, _ in BENCHMARKS:
+                if names and name not in names:
+                    continue
+                result = {'name': name, 'kind': kind, 'bugs': n}
+                result.update(measure(url, name, bugnos, config))
+                results.append(result)
+                print(
+                    '{name:18} {bugs:6} {seconds:8.3f}s {rpcs:6} RPCs'
+                    .format(**result), file=sys.stderr)
+        finally:
+            server.terminate()
+            server.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+        default=[1, 10, 100, 1000, 10000],
+        help='numbers of bugs to benchmark with')
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+        choices=[x[0] for x in BENCHMARKS],
+        help='run only the named benchmarks')
+    parser.add_argument('--comments', type=int, default=3,
+        help='number of comments on each bug')
+    parser.add_argument('--latency', type=float, default=0.0,
+        help='seconds the server delays each request by')
+    parser.add_argument('--bandwidth', type=int,
+        help='bytes a second the server sends responses at')
+    parser.add_argument('--config', nargs='+', default=[], metavar='KEY=VALUE',
+        help='server configs for the client, e.g. jobs=4')
+    parser.add_argument('--output', '-o', metavar='FILE',
+        help='write the results to FILE as JSON (default: standard output)')
+    args = parser.parse_args()
+
+    config = dict(x.split('=', 1) for x in args.config)
+    # measure the RPCs, not the metadata cache of earlier runs
+    config.setdefault('cache', 'off')
+    report = {
+        'version': bzlib.version,
+        'python': platform.python_version(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'latency': args.latency,
+        'bandwidth': args.bandwidth,
+        'comments': args.comments,
+        'config': config,
+        'results': run(
+            args.sizes, args.only, args.comments, args.latency,
+            args.bandwidth, config),
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,605 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""asyncio Bugzilla client.
+
+``AsyncBugzilla`` and ``AsyncBug`` mirror ``bzlib.bugzilla.Bugzilla`` and
+``bzlib.bug.Bug``, except that the methods that make RPCs are coroutines
+and ``AsyncBug.data``, ``comments`` and ``history`` are awaitable::
+
+    bz = AsyncBugzilla(url, user, password)
+    bugs = await asyncio.gather(*(bz.bug(n).data for n in bugnos))
+
+Requests are made with asyncio streams over a pool of keep-alive
+connections; no threads are used.  Unlike ``Bugzilla``, calls have no
+deadline and are not retried (see ``bzlib.policy``), and the number of
+calls in progress is a fixed limit rather than an adaptive one.  This
+module requires Python 3.5.
+"""
+
+import asyncio
+import io
+import ssl
+import urllib.parse as urlparse
+import xmlrpc.client as xmlrpclib
+
+from . import backend
+from . import bug
+from . import bugzilla
+from . import policy
+from . import registry
+from . import session
+from . import transport
+
+
+DEFAULT_CONCURRENCY = policy.DEFAULT_CONCURRENCY
+
+
+class _Response(object):
+    """A received HTTP response, as read by ``transport._Body``."""
+
+    def __init__(self, status, reason, headers, data, will_close):
+        self.status = status
+        self.reason = reason
+        self.msg = headers
+        self.will_close = will_close
+        self._data = io.BytesIO(data)
+
+    def getheader(self, name, default=None):
+        return self.msg.get(name.lower(), default)
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+class _Connection(object):
+    """An HTTP/1.1 connection using asyncio streams, opened on first use."""
+
+    def __init__(self, host, ssl_context=None):
+        parsed = urlparse.urlsplit('//' + host)
+        self.host = host
+        self._address = (
+            parsed.hostname,
+            parsed.port or (443 if ssl_context else 80),
+        )
+        self._ssl = ssl_context
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, handler, body, headers):
+        """Send a request; return the ``_Response``."""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                *self._address, ssl=self._ssl)
+        headers = dict(headers)
+        headers['Host'] = self.host
+        if body is not None:
+            headers['Content-Length'] = str(len(body))
+        head = ['{} {} HTTP/1.1'.format(method, handler)]
+        head.extend('{}: {}'.format(k, v) for k, v in headers.items())
+        self._writer.write(
+            ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + (body or b''))
+        await self._writer.drain()
+        return await self._read_response()
+
+    async def _read_response(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionResetError('connection closed by server')
+        version, status, reason = \
+            (line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        headers = await self._read_headers()
+
+        connection = headers.get('connection', '').lower()
+        will_close = connection == 'close' or (
+            version == 'HTTP/1.0' and connection != 'keep-alive')
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = await self._read_chunked()
+        elif 'content-length' in headers:
+            data = await self._reader.readexactly(
+                int(headers['content-length']))
+        else:
+            data = await self._reader.read()
+            will_close = True
+        return _Response(int(status), reason, headers, data, will_close)
+
+    async def _read_headers(self):
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            line = await self._reader.readline()
+            size = int(line.split(b';')[0], 16)
+            if not size:
+                break
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+        await self._read_headers()  # trailers
+        return b''.join(chunks)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+def _pool(
+    scheme,
+    size=transport.DEFAULT_POOL_SIZE,
+    timeout=transport.DEFAULT_POOL_TIMEOUT
+):
+    """Return a ``ConnectionPool`` of ``_Connection`` objects."""
+    pool = transport.ConnectionPool(scheme, size, timeout)
+    context = ssl.create_default_context() if scheme == 'https' else None
+    pool.connection_class = lambda host: _Connection(host, context)
+    return pool
+
+
+class AsyncTransport(transport.Compression):
+    """Counterpart of ``transport.Transport`` for asyncio.
+
+    ``http_request`` is a coroutine; connections are kept alive in a
+    ``ConnectionPool`` and bodies compressed as for ``Compression``.
+    """
+
+    def __init__(self, scheme='http', pool=None, compress_threshold=None):
+        transport.Compression.__init__(self, compress_threshold)
+        self.pool = pool or _pool(scheme)
+
+    async def http_request(
+        self, host, method, handler, body=None, headers=None
+    ):
+        """Perform an HTTP request; return a ``(response, data)`` pair."""
+        headers = dict(headers or {})
+        headers['User-Agent'] = xmlrpclib.Transport.user_agent
+        body = self._encode(body, headers)
+        while True:
+            conn, reused = self.pool.acquire(host)
+            try:
+                response = await conn.request(method, handler, body, headers)
+                data = transport._Body(self, response).read()
+            except (OSError, asyncio.IncompleteReadError):
+                conn.close()
+                if not reused:
+                    raise
+                # the server closed an idle connection; try another
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(host, conn)
+            return response, data
+
+    def close(self):
+        self.pool.close()
+
+
+class AsyncBugzilla(object):
+    """asyncio counterpart of ``bzlib.bugzilla.Bugzilla``.
+
+    Arguments and config options are as for ``Bugzilla``.  At most
+    ``concurrency`` (config option; default: 8) RPCs are in progress at
+    once; further calls wait their turn.  Products, fields and user
+    matches are kept in memory for the life of the client, but are not
+    cached on disk.
+
+    Calls have no deadline and are not retried; the ``timeout`` and
+    ``retries`` config options are ignored.  Batches, streamed results
+    and the identity map are not supported; run calls concurrently
+    instead.
+    """
+
+    from_config = classmethod(bugzilla.Bugzilla.from_config.__func__)
+
+    def __init__(self, url=None, user=None, password=None, **config):
+        self._products = None
+        self._fields = None
+        self._registry = None
+        self._user_cache = {}
+        self._version = None
+        # asyncio primitives are created in the running event loop
+        self._semaphore = None
+        self._token_lock = None
+
+        self.url = url
+        self.user = user
+        self.password = password
+        self.config = config
+        self.chunk_size = int(
+            config.get('chunk_size', bugzilla.DEFAULT_CHUNK_SIZE))
+        self.concurrency = int(
+            config.get('concurrency', DEFAULT_CONCURRENCY))
+
+        self.tokens = None
+        self.token = None
+        if config.get('session') == 'token' and user and password:
+            self.tokens = session.TokenStore(
+                config.get('token_file'))
+
+        parsed_url = bugzilla._parse_url(url)
+        pool = _pool(
+            parsed_url.scheme,
+            size=int(config.get('pool_size', self.concurrency)),
+            timeout=float(
+                config.get('pool_timeout', transport.DEFAULT_POOL_TIMEOUT))
+        )
+        compress_threshold = config.get('compress_threshold')
+        self.transport = AsyncTransport(
+            pool=pool,
+            compress_threshold=int(compress_threshold)
+            if compress_threshold is not None else None
+        )
+        # the proxy only prepares requests and decodes responses
+        self.server = backend.server_proxy(
+            config.get('backend', 'xmlrpc'), url, None)
+
+    def close(self):
+        """Close idle connections to the server."""
+        self.transport.close()
+
+    async def _call(self, method, params):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        http_method, handler, body, headers = \
+            self.server._prepare(method, params)
+        async with self._semaphore:
+            response, data = await self.transport.http_request(
+                self.server._host, http_method, handler, body, headers)
+        return self.server._result(handler, response, data)
+
+    async def rpc(self, *args, **kwargs):
+        """Do an RPC on the Bugzilla server.
+
+        args: RPC method, in fragments
+        kwargs: RPC parameters
+        """
+        method = '.'.join(args)
+        await self._auth(kwargs)
+        try:
+            return await self._call(method, kwargs)
+        except xmlrpclib.Fault as e:
+            if not self._token_rejected(kwargs, e):
+                raise
+        return await self._call(method, await self._auth(kwargs))
+
+    async def _auth(self, params):
+        """Add authentication to the given RPC parameters."""
+        params.pop('Bugzilla_token', None)
+        token = await self.login() if self.tokens is not None else None
+        if token:
+            params['Bugzilla_token'] = token
+        else:
+            params['Bugzilla_login'] = self.user
+            params['Bugzilla_password'] = self.password
+        return params
+
+    def _token_rejected(self, params, fault):
+        """Return True if the fault is due to an invalid login token."""
+        token = params.get('Bugzilla_token')
+        if not token or \
+                fault.faultCode not in session.INVALID_TOKEN_FAULTS:
+            return False
+        if self.token == token:
+            self.token = None
+            self.tokens.remove(self.url, self.user)
+        return True
+
+    async def login(self):
+        """Return a login token, logging in if necessary.
+
+        Return ``None`` if token sessions are not in use or the server
+        does not issue tokens.
+        """
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if self.tokens is None:
+                return None
+            if self.token is None:
+                self.token = self.tokens.get(self.url, self.user)
+            if self.token is None:
+                result = await self._call(
+                    'User.login',
+                    {'login': self.user, 'password': self.password}
+                )
+                if 'token' not in result:
+                    # server does not support tokens; use the password
+                    self.tokens = None
+                    return None
+                self.token = result['token']
+                self.tokens.set(self.url, self.user, self.token)
+            return self.token
+
+    async def logout(self):
+        """Log out and forget the login token, if any."""
+        token, self.token = self.token, None
+        if self.tokens is not None:
+            token = token or self.tokens.get(self.url, self.user)
+            self.tokens.remove(self.url, self.user)
+        if token:
+            await self._call('User.logout', {'Bugzilla_token': token})
+
+    def bug(self, bugno, include_fields=None):
+        return AsyncBug(self, bugno, include_fields)
+
+    async def bugs(self, bugnos, chunk_size=None, include_fields=None):
+        """Return a list of AsyncBug objects with their data loaded.
+
+        As ``Bugzilla.bugs``, but the ``Bug.get`` calls are concurrent.
+        """
+        bugs = [self.bug(bugno, include_fields) for bugno in bugnos]
+        by_id = bugzilla._by_id(bugs)
+        kwargs = {}
+        if include_fields is not None:
+            kwargs['include_fields'] = bug.Bug._include_fields(include_fields)
+        results = await asyncio.gather(*(
+            self.rpc('Bug', 'get', ids=chunk, **kwargs)
+            for chunk in bugzilla._chunks(by_id, chunk_size or self.chunk_size)
+        ))
+        for result in results:
+            for data in result['bugs']:
+                for _bug in by_id[int(data['id'])]:
+                    _bug.data = data
+        return bugs
+
+    async def get_products(self, use_cache=True):
+        """Get accessible products of this Bugzilla."""
+        if use_cache and self._products:
+            return self._products
+        ids = (await self.rpc('Product', 'get_accessible_products'))['ids']
+        self._products = \
+            (await self.rpc('Product', 'get', ids=ids))['products']
+        return self._products
+
+    async def get_fields(self, use_cache=True):
+        """Get information about bug fields."""
+        if use_cache and self._fields:
+            return self._fields
+        self._fields = (await self.rpc('Bug', 'fields'))['fields']
+        return self._fields
+
+    async def get_field_registry(self, use_cache=True):
+        """Get the bug fields, indexed.
+
+        See ``Bugzilla.get_field_registry``.
+        """
+        fields = await self.get_fields(use_cache)
+        _registry = self._registry
+        if _registry is None or _registry.fields is not fields:
+            _registry = self._registry = registry.FieldRegistry(fields)
+        return _registry
+
+    async def get_version(self, use_cache=True):
+        """Get the version of the Bugzilla server."""
+        if use_cache and self._version:
+            return self._version
+        self._version = (await self.rpc('Bugzilla', 'version'))['version']
+        return self._version
+
+    async def supports_charts(self):
+        """Return True if ``Bug.search`` accepts boolean charts.
+
+        See ``Bugzilla.supports_charts``.
+        """
+        setting = self.config.get('charts')
+        if setting in ('on', 'off'):
+            return setting == 'on'
+        try:
+            version = await self.get_version()
+        except xmlrpclib.Fault:
+            return False
+        return bugzilla._supports_charts(setting, lambda: version)
+
+    async def supports_history_since(self):
+        """Return True if ``Bug.history`` accepts ``new_since``.
+
+        See ``Bugzilla.supports_history_since``.
+        """
+        try:
+            version = await self.get_version()
+        except xmlrpclib.Fault:
+            return False
+        return bugzilla._version_at_least(lambda: version, (5, 0))
+
+    async def get_field_values(self,
+        name,
+        sort=True,
+        omit_empty=True,
+        visible_for=None
+    ):
+        """Return the legal values for a field; a list of dicts.
+
+        See ``Bugzilla.get_field_values``.
+        """
+        return (await self.get_field_registry()).values(
+            name, sort, omit_empty, visible_for)
+
+    async def match_users(self, fragment, use_cache=True):
+        """Return a list of users matching the given string."""
+        if use_cache and fragment in self._user_cache:
+            return self._user_cache[fragment]
+        users = (await self.rpc('User', 'get', match=[fragment]))['users']
+        if use_cache:
+            self._user_cache[fragment] = users
+        return users
+
+    async def match_one_user(self, fragment, use_cache=True):
+        """Return the user matching the given string.
+
+        Raise UserError if the result does not contain exactly one user.
+        """
+        return bugzilla._one_user(fragment, await self.match_users(fragment))
+
+
+class AsyncBug(bug.Bug):
+    """asyncio counterpart of ``bzlib.bug.Bug``.
+
+    ``data``, ``comments`` and ``history`` are awaitable, and so are the
+    results of the methods that make RPCs, e.g.::
+
+        if (await bug.data)['status'] == 'NEW':
+            await bug.set_status('RESOLVED', 'FIXED')
+
+    Fields excluded by ``include_fields`` are not fetched when looked
+    up; the lookup raises ``KeyError``.
+    """
+
+    @property
+    def data(self):
+        return self._get_data()
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    async def _get_data(self):
+        if self._data is None:
+            if not self.bugno:
+                raise Exception("bugno not provided.")
+            kwargs = {}
+            if self.include_fields is not None:
+                kwargs['include_fields'] = self.include_fields
+            result = await self.rpc('get', ids=[self.bugno], **kwargs)
+            self._data = result['bugs'][0]
+        return self._data
+
+    @property
+    def history(self):
+        return self._get_history()
+
+    @history.setter
+    def history(self, value):
+        self._history = value
+        self._history_stale = False
+
+    async def _get_history(self):
+        if self._history is None or self._history_stale:
+            if not self.bugno:
+                raise Exception("bugno not provided.")
+            since = None
+            if self._history and await self.bz.supports_history_since():
+                since = bug._since(self._history, 'when')
+            kwargs = {'new_since': since} if since is not None else {}
+            result = await self.rpc('history', ids=[self.bugno], **kwargs)
+            self.history = bug._merge_since(
+                self._history, result['bugs'][0]['history'], since, 'when')
+        return self._history
+
+    @property
+    def comments(self):
+        return self._get_comments()
+
+    @comments.setter
+    def comments(self, value):
+        self._comments = value
+        self._comments_stale = False
+
+    async def _get_comments(self):
+        if self._comments is None or self._comments_stale:
+            if not self.bugno:
+                raise Exception("bugno not provided.")
+            since = bug._since(self._comments, 'time')
+            kwargs = {'new_since': since} if since is not None else {}
+            result = await self.rpc('comments', ids=[self.bugno], **kwargs)
+            self.comments = bug._merge_since(
+                self._comments, result['bugs'][str(self.bugno)]['comments'],
+                since, 'time')
+        return self._comments
+
+    @classmethod
+    async def search(cls, bz, include_fields=None, **kwargs):
+        """Return a list of bugs matching the search criteria.
+
+        See ``Bug.search``.
+        """
+        needed = set(k[4:] for k in kwargs if k.startswith('not_'))
+        needed -= set(kwargs)
+        charts = await bz.supports_charts() \
+            if needed or kwargs.get('charts') else False
+        needed = set() if charts else needed
+        products = await bz.get_products() if 'product' in needed else None
+        _registry = await bz.get_field_registry() \
+            if needed - {'product'} else None
+        kwargs = cls._search_params(
+            kwargs, lambda: products, lambda: _registry, lambda: charts)
+        include_fields = cls._include_fields(include_fields)
+        if include_fields is not None:
+            kwargs['include_fields'] = include_fields
+        result = await bz.rpc('Bug', 'search', **kwargs)
+        return [cls(bz, data, include_fields) for data in result['bugs']]
+
+    async def create(self):
+        """Create a new bug; return the new bug ID.  See ``Bug.create``."""
+        if self.bugno or 'id' in self._data:
+            raise Exception("bugno is known; not creating bug.")
+        result = await self.rpc('create', **self._data)
+        self.bugno = result['id']
+        return self.bugno
+
+    async def add_comment(self, comment, is_private=False):
+        await self.rpc(
+            'add_comment', id=self.bugno, comment=comment,
+            is_private=is_private
+        )
+        self._comments_stale = True
+        self._history_stale = True
+
+    async def is_open(self):
+        """Return True if the bug is open, otherwise False."""
+        return (await self.data)['is_open']
+
+    async def set_assigned_to(self, user, comment=None, match=True):
+        """Reassign this bug.  See ``Bug.set_assigned_to``."""
+        if match:
+            user = (await self.bz.match_one_user(user))['name']
+        status = None
+        if 'assign_status' in self.bz.config:
+            try:
+                status = (await self.data)['status']
+            except Exception:
+                pass  # ignore errors; status will not be updated
+        return await self._update(self._assign_params(user, comment, status))
+
+    async def update_cc(self, add=None, remove=None, comment=None):
+        """Update the CC list of the bug.  See ``Bug.update_cc``."""
+        if add or remove:
+            return await super(AsyncBug, self).update_cc(add, remove, comment)
+
+    async def _update(self, kwargs):
+        state = self._state()
+        result = await self.rpc('update', ids=[self.bugno], **kwargs)
+        self._data, history = self._updated(state, kwargs, result)
+        if history is not None:
+            self.history = history
+        else:
+            self._history_stale = True
+        if 'comment' in kwargs:
+            self._comments_stale = True
+        return result
+
+    async def actual_time(self):
+        """Calculate the actual hours worked on the bug."""
+        return self._work_time(await self.history)
@@ -0,0 +1,329 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""RPC backends.
+
+Each backend provides an object that behaves like ``xmlrpclib.ServerProxy``
+as far as ``Bugzilla`` is concerned: RPC methods are attributes which are
+called with a single dict of parameters, and errors reported by the server
+are raised as ``xmlrpclib.Fault``.
+
+Proxies also have a ``_stream(method, params, paths)`` method, which
+performs a call and returns an iterator of ``(path, item)`` pairs as
+described in ``bzlib.stream``.
+
+A call can also be made in two halves, for use with other transports:
+``_prepare(method, params)`` returns the ``(HTTP method, handler, body,
+headers)`` of the request, and ``_result(handler, response, data)``
+decodes the response or raises the error it reports.
+"""
+
+import datetime
+import itertools
+import json
+import re
+
+try:
+    from urllib import quote, urlencode
+    import urlparse
+except ImportError:
+    from urllib.parse import quote, urlencode
+    import urllib.parse as urlparse
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import stream
+
+
+BACKENDS = ('xmlrpc', 'jsonrpc', 'rest')
+
+# fault code for methods a backend cannot perform
+FAULT_NO_SUCH_METHOD = -32601
+
+# keys of timestamp values, which XML-RPC returns as datetimes
+_DATETIME_KEYS = frozenset([
+    'creation_time', 'last_change_time', 'time', 'when',
+])
+_DATETIME_RE = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$')
+
+
+def server_proxy(name, url, transport):
+    """Return a proxy for the named backend of the Bugzilla at ``url``.
+
+    ``url`` is the base URL of the Bugzilla; ``transport`` is the
+    ``bzlib.transport.Transport`` with which to make requests.
+    """
+    url = url if url[-1] == '/' else url + '/'
+    if name == 'xmlrpc':
+        return XMLRPCProxy(url + 'xmlrpc.cgi', transport)
+    elif name == 'jsonrpc':
+        return JSONRPCProxy(url + 'jsonrpc.cgi', transport)
+    elif name == 'rest':
+        return RESTProxy(url + 'rest.cgi/', transport)
+    raise ValueError('Unknown backend {!r}.'.format(name))
+
+
+def _json_default(obj):
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, xmlrpclib.DateTime):
+        return datetime.datetime.strptime(
+            obj.value, '%Y%m%dT%H:%M:%S').isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+
+def _json_object_hook(obj):
+    for k in _DATETIME_KEYS & set(obj):
+        v = obj[k]
+        if isinstance(v, type(u'')) and _DATETIME_RE.match(v):
+            obj[k] = datetime.datetime.strptime(v, '%Y-%m-%dT%H:%M:%SZ')
+    return obj
+
+
+def _query_value(value):
+    if isinstance(value, list):
+        return [_query_value(x) for x in value]
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    if isinstance(value, type(u'')):
+        return value.encode('utf-8')
+    return value
+
+
+def _query(params):
+    """Encode parameters as a URL query string."""
+    return urlencode(
+        sorted((k, _query_value(v)) for k, v in params.items()),
+        True
+    )
+
+
+def dumps(obj):
+    return json.dumps(obj, default=_json_default)
+
+
+def loads(data):
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+class XMLRPCProxy(xmlrpclib.ServerProxy):
+    """Proxy for the XML-RPC interface (``xmlrpc.cgi``).
+
+    Results of ``_stream`` are decoded as they are received.
+    """
+
+    def __init__(self, url, transport):
+        # httplib explodes if url is unicode
+        xmlrpclib.ServerProxy.__init__(
+            self, str(url), transport=transport, allow_none=True)
+        parsed_url = urlparse.urlparse(url)
+        self._host = parsed_url.netloc
+        self._handler = parsed_url.path
+        self._transport = transport
+
+    def _body(self, method, params):
+        body = xmlrpclib.dumps((params,), method, allow_none=True)
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8', 'xmlcharrefreplace')
+        return body
+
+    def _prepare(self, method, params):
+        return (
+            'POST', self._handler, self._body(method, params),
+            {'Content-Type': 'text/xml'}
+        )
+
+    def _result(self, handler, response, data):
+        if response.status != 200:
+            raise xmlrpclib.ProtocolError(
+                self._host + handler,
+                response.status, response.reason,
+                response.msg
+            )
+        return xmlrpclib.loads(data, use_datetime=True)[0][0]
+
+    def _stream(self, method, params, paths):
+        return self._transport.stream(
+            self._host, self._handler, self._body(method, params), paths)
+
+
+class _Method(object):
+    def __init__(self, send, name):
+        self._send = send
+        self._name = name
+
+    def __getattr__(self, name):
+        return _Method(self._send, '{}.{}'.format(self._name, name))
+
+    def __call__(self, params=None):
+        return self._send(self._name, params or {})
+
+
+class _Proxy(object):
+    """Base class for proxies that speak JSON over HTTP."""
+
+    def __init__(self, url, transport):
+        parsed_url = urlparse.urlparse(url)
+        self._host = parsed_url.netloc
+        self._handler = parsed_url.path
+        self._transport = transport
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _Method(self._request, name)
+
+    def _decode(self, handler, response, data):
+        """Decode a JSON response body."""
+        try:
+            return loads(data)
+        except ValueError:
+            raise xmlrpclib.ProtocolError(
+                self._host + handler,
+                response.status, response.reason,
+                response.msg
+            )
+
+    def _prepare(self, method, params):
+        raise NotImplementedError
+
+    def _result(self, handler, response, data):
+        raise NotImplementedError
+
+    def _request(self, method, params):
+        http_method, handler, body, headers = self._prepare(method, params)
+        response, data = self._transport.http_request(
+            self._host, http_method, handler, body, headers)
+        return self._result(handler, response, data)
+
+    def _stream(self, method, params, paths):
+        return stream.walk(self._request(method, params), paths)
+
+
+class JSONRPCProxy(_Proxy):
+    """Proxy for the JSON-RPC interface (``jsonrpc.cgi``)."""
+
+    def __init__(self, url, transport):
+        super(JSONRPCProxy, self).__init__(url, transport)
+        self._ids = itertools.count(1)
+
+    def _prepare(self, method, params):
+        if method == 'system.multicall':
+            raise xmlrpclib.Fault(
+                FAULT_NO_SUCH_METHOD, 'multicall not supported')
+        body = dumps({
+            'method': method,
+            'params': [params],
+            'id': next(self._ids),
+        })
+        return 'POST', self._handler, body, {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+
+    def _result(self, handler, response, data):
+        result = self._decode(handler, response, data)
+        if result.get('error'):
+            raise xmlrpclib.Fault(
+                result['error'].get('code'), result['error'].get('message'))
+        return result['result']
+
+
+class RESTProxy(_Proxy):
+    """Proxy for the REST interface (``rest.cgi``), Bugzilla 5.0 or later.
+
+    Only the methods in ``routes`` are available.
+    """
+
+    # method: (HTTP method, resource, parameter that identifies the bug)
+    routes = {
+        'Bug.add_comment': ('POST', 'bug/{}/comment', 'id'),
+        'Bug.comments': ('GET', 'bug/{}/comment', 'ids'),
+        'Bug.create': ('POST', 'bug', None),
+        'Bug.fields': ('GET', 'field/bug', None),
+        'Bug.get': ('GET', 'bug', None),
+        'Bug.history': ('GET', 'bug/{}/history', 'ids'),
+        'Bug.search': ('GET', 'bug', None),
+        'Bug.update': ('PUT', 'bug/{}', 'ids'),
+        'Bugzilla.version': ('GET', 'version', None),
+        'Product.get': ('GET', 'product', None),
+        'Product.get_accessible_products':
+            ('GET', 'product_accessible', None),
+        'User.get': ('GET', 'user', None),
+        'User.login': ('GET', 'login', None),
+        'User.logout': ('GET', 'logout', None),
+    }
+
+    auth_headers = {
+        'Bugzilla_login': 'X-BUGZILLA-LOGIN',
+        'Bugzilla_password': 'X-BUGZILLA-PASSWORD',
+        'Bugzilla_token': 'X-BUGZILLA-TOKEN',
+    }
+
+    def _prepare(self, method, params):
+        try:
+            http_method, resource, bug_param = self.routes[method]
+        except KeyError:
+            raise xmlrpclib.Fault(
+                FAULT_NO_SUCH_METHOD,
+                'method {} not supported by REST backend'.format(method)
+            )
+
+        params = {k: v for k, v in params.items() if v is not None}
+        headers = {'Accept': 'application/json'}
+        for param, header in self.auth_headers.items():
+            if param in params:
+                headers[header] = params.pop(param)
+
+        if bug_param:
+            # the first bug goes in the path; any others stay in params
+            ids = params.pop(bug_param)
+            if isinstance(ids, list):
+                ids, others = ids[0], ids[1:]
+                if others:
+                    params[bug_param] = others
+            resource = resource.format(quote(str(ids)))
+        if method == 'Bug.get' and 'ids' in params:
+            params['id'] = params.pop('ids')
+
+        handler = self._handler + resource
+        body = None
+        if http_method == 'GET':
+            query = _query(params)
+            if query:
+                handler += '?' + query
+        else:
+            body = dumps(params)
+            headers['Content-Type'] = 'application/json'
+        return http_method, handler, body, headers
+
+    def _result(self, handler, response, data):
+        result = self._decode(handler, response, data)
+        if isinstance(result, dict) and result.get('error'):
+            raise xmlrpclib.Fault(result.get('code'), result.get('message'))
+        if response.status >= 400:
+            raise xmlrpclib.ProtocolError(
+                self._host + handler,
+                response.status, response.reason,
+                response.msg
+            )
+        return result
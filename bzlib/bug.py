@@ -16,9 +16,157 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
-import functools
 import itertools
 
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import workers
+
+
+# internal names of fields, as in boolean charts (the fN/oN/vN search
+# parameters) and Bug.fields, where they differ from the names of search
+# parameters
+_CHART_FIELDS = {
+    'creation_time': 'creation_ts',
+    'creator': 'reporter',
+    'id': 'bug_id',
+    'last_change_time': 'delta_ts',
+    'severity': 'bug_severity',
+    'status': 'bug_status',
+    'summary': 'short_desc',
+    'url': 'bug_file_loc',
+    'whiteboard': 'status_whiteboard',
+}
+
+_CHART_OPERATORS = frozenset([
+    'equals', 'notequals', 'anyexact', 'substring', 'casesubstring',
+    'notsubstring', 'anywordssubstr', 'allwordssubstr', 'nowordssubstr',
+    'regexp', 'notregexp', 'lessthan', 'lessthaneq', 'greaterthan',
+    'greaterthaneq', 'anywords', 'allwords', 'nowords', 'changedbefore',
+    'changedafter', 'changedfrom', 'changedto', 'changedby',
+])
+
+# API names of fields, by internal name
+_API_FIELDS = {v: k for k, v in _CHART_FIELDS.items()}
+
+# fields whose search parameters match substrings
+_SUBSTRING_FIELDS = frozenset(['summary', 'whiteboard'])
+
+# fields whose values are lists of bug numbers
+_BUG_LIST_FIELDS = frozenset(['blocks', 'depends_on'])
+
+# fields that are null when not set
+_NULLABLE_FIELDS = frozenset(['deadline', 'dupe_of'])
+
+# fields that Bug.update accepts
+_UPDATE_FIELDS = frozenset([
+    'remaining_time', 'work_time', 'estimated_time', 'deadline',
+    'blocks', 'depends_on',
+    'cc',
+    'comment',
+    'version', 'priority',
+])
+
+# fields that Bugzilla.update_bugs accepts
+_BULK_UPDATE_FIELDS = _UPDATE_FIELDS | frozenset([
+    'assigned_to', 'dupe_of', 'resolution', 'status',
+])
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
+
+def _chart_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def _split(value):
+    return value.split(', ') if value else []
+
+
+def _changed_value(name, old, change):
+    """Return the value of a field after a change reported by the server.
+
+    ``old`` is the value before the change.  Raise ``ValueError`` if the
+    new value cannot be derived from the change.
+    """
+    added = change.get('added', '')
+    if isinstance(old, list):
+        convert = int if name in _BUG_LIST_FIELDS else (lambda x: x)
+        removed = [convert(x) for x in _split(change.get('removed', ''))]
+        value = [x for x in old if x not in removed]
+        return value + [
+            x for x in map(convert, _split(added)) if x not in value]
+    if name == 'dupe_of':
+        return int(added) if added else None
+    if name in _NULLABLE_FIELDS and not added:
+        return None
+    if isinstance(old, _string_types) \
+            or old is None and name in _NULLABLE_FIELDS:
+        return added
+    if isinstance(old, (int, float)) and not isinstance(old, bool):
+        return type(old)(added or 0)
+    raise ValueError('cannot apply change to {}'.format(name))
+
+
+def _timestamp(value):
+    """Return a timestamp returned by the server as a datetime."""
+    if isinstance(value, xmlrpclib.DateTime):
+        return datetime.datetime.strptime(value.value, '%Y%m%dT%H:%M:%S')
+    return value
+
+
+def _since(entries, key):
+    """Return the ``new_since`` time to refresh cached entries from.
+
+    ``entries`` are comments or history entries, whose ``key`` is their
+    time.  Times have a resolution of a second and ``new_since`` is
+    exclusive, so entries in the same second as the newest are
+    requested again.  Return ``None`` if there are no entries.
+    """
+    if not entries:
+        return None
+    newest = max(_timestamp(x[key]) for x in entries)
+    return newest - datetime.timedelta(seconds=1)
+
+
+def _merge_since(entries, new, since, key):
+    """Return ``entries`` with those after ``since`` replaced by ``new``.
+
+    If ``since`` is ``None``, ``new`` are all the entries.
+    """
+    if since is None:
+        return new
+    return [x for x in entries if _timestamp(x[key]) <= since] + list(new)
+
+
+class _Projection(dict):
+    """The data of a bug fetched with ``include_fields``.
+
+    Looking up a field that was not fetched fetches the other fields of
+    the bug.  Membership tests and ``get`` see only the fields fetched.
+    """
+
+    def __init__(self, bug, data):
+        super(_Projection, self).__init__(data)
+        self._bug = bug
+
+    def __missing__(self, key):
+        bug, self._bug = self._bug, None
+        if bug is None or not bug.bugno:
+            raise KeyError(key)
+        self.update(bug._get(exclude_fields=sorted(self)))
+        return self[key]
+
 
 class Bug(object):
 
@@ -27,41 +175,115 @@ class Bug(object):
         if self._data is None:
             if not self.bugno:
                 raise Exception("bugno not provided.")
-            self._data = self.rpc('get', ids=[self.bugno])['bugs'][0]
+            self.data = self._get(include_fields=self.include_fields)
         return self._data
 
     @data.setter
     def data(self, value):
+        if value is not None and self.include_fields is not None:
+            value = _Projection(self, value)
         self._data = value
 
+    def _loaded(self, include_fields):
+        """Return True if the data of the given fields is loaded."""
+        if self._data is None:
+            return False
+        if not isinstance(self._data, _Projection) or self._data._bug is None:
+            return True  # all fields
+        return include_fields is not None \
+            and set(include_fields) <= set(self._data)
+
+    def _merge(self, data, include_fields):
+        """Load data just retrieved with the given ``include_fields``.
+
+        Fields that were not retrieved keep their loaded values.
+        """
+        if include_fields is not None and self._data is not None:
+            self._data.update(data)
+        elif include_fields is not None:
+            self._data = _Projection(self, data)
+        else:
+            self._data = data
+
+    def _want(self, include_fields):
+        """Retrieve ``include_fields`` too when the data is loaded."""
+        if self._data is not None or self.include_fields is None:
+            return
+        if include_fields is None:
+            self.include_fields = None
+        else:
+            self.include_fields = self._include_fields(
+                set(self.include_fields) | set(include_fields))
+
+    def _get(self, **kwargs):
+        """Fetch the data of this bug with the given ``Bug.get`` args."""
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        return self.rpc('get', ids=[self.bugno], **kwargs)['bugs'][0]
+
     @property
     def history(self):
-        if self._history is None:
+        """The history of the bug.
+
+        History loaded before a change to the bug is refreshed with only
+        the newer entries if the server supports it (see
+        ``Bugzilla.supports_history_since``).
+        """
+        if self._history is None or self._history_stale:
             if not self.bugno:
                 raise Exception("bugno not provided.")
-            self._history = \
-                self.rpc('history', ids=[self.bugno])['bugs'][0]['history']
+            since = None
+            if self._history and self.bz.supports_history_since():
+                since = _since(self._history, 'when')
+            kwargs = {'new_since': since} if since is not None else {}
+            result = self.rpc('history', ids=[self.bugno], **kwargs)
+            self.history = _merge_since(
+                self._history, result['bugs'][0]['history'], since, 'when')
         return self._history
 
     @history.setter
     def history(self, value):
         self._history = value
+        self._history_stale = False
 
     @property
     def comments(self):
-        if self._comments is None:
+        """The comments of the bug.
+
+        Comments loaded before a change to the bug are refreshed with
+        only the newer comments.
+        """
+        if self._comments is None or self._comments_stale:
             if not self.bugno:
                 raise Exception("bugno not provided.")
-            result = self.rpc('comments', ids=[self.bugno])
-            self._comments = result['bugs'][str(self.bugno)]['comments']
+            since = _since(self._comments, 'time')
+            kwargs = {'new_since': since} if since is not None else {}
+            result = self.rpc('comments', ids=[self.bugno], **kwargs)
+            self.comments = _merge_since(
+                self._comments, result['bugs'][str(self.bugno)]['comments'],
+                since, 'time')
         return self._comments
 
     @comments.setter
     def comments(self, value):
         self._comments = value
+        self._comments_stale = False
+
+    def _outdate(self, comments=True):
+        """Flush the data, and mark the history stale.
+
+        The comments are marked stale too if ``comments``.  Stale
+        comments and history are refreshed when next used.
+        """
+        self._data = None
+        self._history_stale = True
+        if comments:
+            self._comments_stale = True
 
     @classmethod
-    def search(cls, bz, **kwargs):
+    def search(
+        cls, bz, include_fields=None, page_size=None, prefetch=False,
+        **kwargs
+    ):
         """Return bugs matching the search criteria.
 
         Values for fields are specified as keyword args.  For fields
@@ -69,9 +291,122 @@ class Bug(object):
         negates the criterion.  If both forms are provided ("in" and
         "not in"), the "in" criterion take precedence.
 
+        If the server supports boolean charts (see
+        ``Bugzilla.supports_charts``), negated criteria are sent as
+        charts; otherwise they are expanded to the other legal values
+        of the field.  The ``charts`` keyword arg adds criteria to the
+        chart: a list of ``(field, operator, value)`` triples, all of
+        which must hold, e.g. ``('last_change_time', 'lessthan',
+        datetime.date(2026, 1, 1))`` or ``('summary', 'notsubstring',
+        'crash')``.  ``TypeError`` is raised if the server does not
+        support charts.
+
+        If ``include_fields`` is given, only those fields of the bugs
+        are retrieved; other fields are fetched when first looked up.
+
+        If ``page_size`` (default: the ``page_size`` config option) is
+        given, bugs are retrieved in pages of that many bugs using the
+        ``limit`` and ``offset`` parameters, up to ``limit`` bugs in
+        all, and each page is requested only when the bugs before it
+        have been consumed.  A short page ends the search, so the page
+        size must not exceed the server's ``max_search_results``.  If
+        ``prefetch``, the next page is requested in the background
+        while a page is consumed.  Bugs changed during the search may
+        be missed; bugs are not repeated.
+
         Return an Iterable of bugs (caller must not assume that the
         value returned is a Sequence).
         """
+        kwargs = cls._search_params(
+            kwargs, bz.get_products, bz.get_field_registry,
+            bz.supports_charts)
+        include_fields = cls._include_fields(include_fields)
+        if include_fields is not None:
+            kwargs['include_fields'] = include_fields
+        page_size = int(page_size or bz.config.get('page_size', 0))
+        if page_size:
+            return cls._search_pages(
+                bz, kwargs, include_fields, page_size, prefetch)
+        # bugs are constructed as the response is decoded
+        results = bz.rpc_iter([('bugs',)], 'Bug', 'search', **kwargs)
+        return (cls._found(bz, data, include_fields) for path, data in results)
+
+    @classmethod
+    def _found(cls, bz, data, include_fields):
+        """Return the bug of data retrieved by a search."""
+        if cls is Bug and getattr(bz, 'identity_map', None) is not None:
+            return bz._adopt(data, include_fields)
+        return cls(bz, data, include_fields)
+
+    @classmethod
+    def _search_pages(cls, bz, kwargs, include_fields, page_size, prefetch):
+        """Yield the bugs found by ``Bug.search``, a page at a time."""
+        offset = kwargs.pop('offset', None) or 0
+        # limit=0 means no limit, as in Bug.search
+        remaining = kwargs.pop('limit', None) or None
+
+        def page(args):
+            offset, limit = args
+            return bz.rpc_iter(
+                [('bugs',)], 'Bug', 'search',
+                offset=offset, limit=limit, **kwargs)
+
+        def fetch(args):
+            return list(page(args))
+
+        seen = set()
+        job = None
+        while remaining is None or remaining > 0:
+            limit = page_size if remaining is None \
+                else min(page_size, remaining)
+            if job is not None:
+                job.wait()
+                if job.error is not None:
+                    raise job.error
+                results = job.result
+            else:
+                results = page((offset, limit))
+            offset += limit
+            if remaining is not None:
+                remaining -= limit
+            job = None
+            if prefetch and (remaining is None or remaining > 0):
+                job = workers.start(fetch, (
+                    offset,
+                    page_size if remaining is None
+                    else min(page_size, remaining)
+                ))
+            n = 0
+            for path, data in results:
+                n += 1
+                if data['id'] not in seen:
+                    seen.add(data['id'])
+                    yield cls._found(bz, data, include_fields)
+            if n < limit:
+                return
+
+    @staticmethod
+    def _include_fields(fields):
+        """Return the ``include_fields`` arg to retrieve the given fields.
+
+        The ``id`` field is always included.  Return ``None`` (all
+        fields) if ``fields`` is ``None``.
+        """
+        if fields is None:
+            return None
+        return sorted(set(fields) | set(['id']))
+
+    @staticmethod
+    def _search_params(
+        kwargs, get_products, get_registry, supports_charts=lambda: False
+    ):
+        """Check search criteria and expand "not in" criteria.
+
+        ``get_products`` and ``get_registry`` are called to obtain the
+        legal values of fields if they are needed, and
+        ``supports_charts`` to decide whether to use boolean charts
+        instead.  Return the parameters of the ``Bug.search`` call.
+        """
         fields = frozenset([
             'alias', 'assigned_to', 'component', 'creation_time', 'creator',
             'id', 'last_change_time', 'op_sys', 'rep_platform', 'priority',
@@ -80,25 +415,35 @@ class Bug(object):
             'limit', 'offset',
         ])
 
+        terms = list(kwargs.pop('charts', None) or [])
+        if terms and not supports_charts():
+            raise TypeError(
+                'The server does not support boolean charts (charts).')
+
         # search kwargs for "not in" args and converts to an "in",
         # unless an "in" already exists
-        for _not_in in (k for k in kwargs if k.startswith('not_')):
+        for _not_in in [k for k in kwargs if k.startswith('not_')]:
             _in = _not_in[4:]
             if _in not in fields:
                 raise TypeError('Invalid keyword argument: {}.'.format(_in))
             if _in not in kwargs:
                 # set _in version (_in takes precedence if it's already set)
-                if _in == 'product':
-                    all_values = set(x['name'] for x in bz.get_products())
+                if supports_charts():
+                    values = kwargs[_not_in]
+                    if not isinstance(values, (list, tuple)):
+                        values = [values]
+                    operator = 'notsubstring' \
+                        if _in in _SUBSTRING_FIELDS else 'notequals'
+                    terms.extend((_in, operator, x) for x in values)
                 else:
-                    all_values = set(
-                        value['name'] for value in
-                        [
-                            field['values'] for field in bz.get_fields()
-                            if field['name'] == _in
-                        ][0]
-                    )
-                kwargs[_in] = list(all_values - frozenset(kwargs[_not_in]))
+                    if _in == 'product':
+                        all_values = set(x['name'] for x in get_products())
+                    else:
+                        # Bug.fields uses the internal names of fields
+                        all_values = get_registry().names(
+                            _CHART_FIELDS.get(_in, _in))
+                    kwargs[_in] = list(
+                        all_values - frozenset(kwargs[_not_in]))
             del kwargs[_not_in]  # delete the _not_in
 
         unknowns = set(kwargs.keys()) - fields
@@ -106,21 +451,31 @@ class Bug(object):
             # unknown arguments
             raise TypeError(
                 'Invalid keyword arguments: {}.'.format(', '.join(unknowns)))
-        _cls = functools.partial(cls, bz)  # curry constructor with bz
-        return map(_cls, bz.rpc('Bug', 'search', **kwargs)['bugs'])
 
-    def __init__(self, bz, bugno_or_data=None):
+        for i, (field, operator, value) in enumerate(terms, 1):
+            if operator not in _CHART_OPERATORS:
+                raise TypeError(
+                    'Invalid chart operator: {}.'.format(operator))
+            kwargs['f{}'.format(i)] = _CHART_FIELDS.get(field, field)
+            kwargs['o{}'.format(i)] = operator
+            kwargs['v{}'.format(i)] = _chart_value(value)
+        return kwargs
+
+    def __init__(self, bz, bugno_or_data=None, include_fields=None):
         """Create a bug object.
 
         bz: a bzlib.Bugzilla object
         bugno_or_data: if an int, refers to bugno, otherwise implies a
                        new bug with the given data, otherwise implies
                        a new bug with no data (yet).
+        include_fields: if given, the fields to retrieve; other fields
+                        are retrieved when first looked up.
         If data is None (the default) and if bugno is set, the data will be
         retrieved lazily.
         """
         self.bz = bz
 
+        self.include_fields = self._include_fields(include_fields)
         self.bugno = None
         self.data = None
         self.comments = None
@@ -129,8 +484,8 @@ class Bug(object):
             self.bugno = int(bugno_or_data)
         except TypeError:
             self.data = bugno_or_data or {}
-            if 'id' in self.data:
-                self.bugno = int(self.data['id'])
+            if 'id' in self._data:
+                self.bugno = int(self._data['id'])
 
     @property
     def id(self):
@@ -167,9 +522,12 @@ class Bug(object):
         return self.bugno
 
     def add_comment(self, comment, is_private=False):
-        self.rpc('add_comment', id=self.bugno, comment=comment, is_private=is_private)
-        self.comments = None  # comments are stale
-        self.history = None  # history is stale
+        result = self.rpc(
+            'add_comment', id=self.bugno, comment=comment,
+            is_private=is_private)
+        self._comments_stale = True
+        self._history_stale = True
+        return result
 
     def is_open(self):
         """Return True if the bug is open, otherwise False."""
@@ -177,14 +535,15 @@ class Bug(object):
 
     def set_dupe_of(self, bug, comment=None):
         """Set this bug a duplicate of the given bug."""
+        return self._update(self._dupe_params(bug, comment))
+
+    @staticmethod
+    def _dupe_params(bug, comment):
+        """Return the update parameters to mark a duplicate of ``bug``."""
         kwargs = {'dupe_of': bug}
         if comment:
             kwargs['comment'] = {'body': comment}
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-            self.comments = None  # comments are stale
+        return kwargs
 
     def set_status(self, status, resolution='', comment=None):
         """Set the status of this bug.
@@ -194,16 +553,17 @@ class Bug(object):
 
         A comment may optionally accompany the status change.
         """
+        return self._update(self._status_params(status, resolution, comment))
+
+    @staticmethod
+    def _status_params(status, resolution, comment):
+        """Return the update parameters to set the status."""
         kwargs = {'status': status}
         if resolution:
             kwargs['resolution'] = resolution
         if comment:
             kwargs['comment'] = {'body': comment}
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-            self.comments = None  # comments are stale
+        return kwargs
 
     def set_assigned_to(
         self,
@@ -223,121 +583,222 @@ class Bug(object):
         """
         if match:
             user = self.bz.match_one_user(user)['name']
+        status = None
+        if 'assign_status' in self.bz.config:
+            try:
+                status = self.data['status']
+            except:
+                pass  # ignore errors; status will not be updated
+        return self._update(self._assign_params(user, comment, status))
+
+    def _assign_params(self, user, comment, status):
+        """Return the update parameters to assign the bug to ``user``.
+
+        ``status`` is the current status of the bug, for ``assign_status``.
+        """
         kwargs = {'assigned_to': user}
         if comment:
             kwargs['comment'] = {'body': comment}
-        if 'assign_status' in self.bz.config:
+        if status is not None:
             try:
                 froms, to = self.bz.config['assign_status'].split()
-                if self.data['status'] in froms.split(','):
+                if status in froms.split(','):
                     kwargs['status'] = to
             except:
                 pass  # ignore errors (incorrect config)
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-                self.comments = None  # comments are stale
+        return kwargs
 
     def update(self, **kwargs):
         """Update the bug.
 
         A wrapper for the RPC ``bug.update`` method that performs some sanity
-        checks and flushes cached data as necessary.
+        checks and applies the changes to cached data.
         """
-        fields = frozenset([
-            'remaining_time', 'work_time', 'estimated_time', 'deadline',
-            'blocks', 'depends_on',
-            'cc',
-            'comment',
-            'version', 'priority',
-        ])
-        unknowns = kwargs.keys() - fields
+        return self._update(self._update_params(kwargs))
+
+    @staticmethod
+    def _update_params(kwargs, fields=_UPDATE_FIELDS):
+        """Check and format the parameters of an update.
+
+        Raise ``TypeError`` if there are parameters not in ``fields``.
+        """
+        unknowns = set(kwargs) - fields
         if unknowns:
             # unknown arguments
             raise TypeError('Invalid keyword arguments: {}.'.format(unknowns))
 
         # filter out ``None``s
-        kwargs = {k: v for k, v in kwargs.keys() if v is not None}
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
         # format deadline (YYYY-MM-DD)
         if 'deadline' in kwargs:
             date = kwargs['deadline']
             if isinstance(date, datetime.datetime):
                 date = date.date()  # get date component of a datetime
             kwargs['deadline'] = str(date)  # datetime.date formats in ISO
+        return kwargs
+
+    def _update(self, kwargs):
+        """Do a ``Bug.update`` of this bug and apply it to cached data.
 
+        The changes reported by the server are applied to the data and
+        history, if loaded; what they do not account for is flushed and
+        fetched again when next used.  In a batch, the changes are
+        applied once the batch is sent.
+        """
+        state = self._state()
         result = self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
+        self._data = None  # stale until changes applied
+        self._history_stale = True
         if 'comment' in kwargs:
-            self.comments = None  # comments are stale
+            self._comments_stale = True
+        if hasattr(result, 'add_done_callback'):
+            result.add_done_callback(
+                lambda call: call.fault is None
+                and self._applied(state, kwargs, call.result()))
+        else:
+            self._applied(state, kwargs, result)
         return result
-        # TODO refactor other methods to use this
+
+    def _state(self):
+        """Return the data and history to which to apply an update."""
+        return self._data, None if self._history_stale else self._history
+
+    def _applied(self, state, kwargs, result):
+        """Apply an update, unless the data was fetched since.
+
+        ``state`` is the ``_state()`` before the update, ``kwargs`` the
+        parameters and ``result`` the result of the ``Bug.update`` call,
+        which may have updated other bugs too.
+        """
+        data, history = self._updated(state, kwargs, result)
+        if self._data is None:
+            self._data = data
+        if history is not None and history is self._history:
+            self.history = history
+
+    def _updated(self, state, kwargs, result):
+        """Return the data and history after an update.
+
+        ``state`` is the ``(data, history)`` before the update (either
+        may be ``None``), ``kwargs`` the parameters and ``result`` the
+        result of the ``Bug.update`` call.  Data or history that cannot
+        be derived from the changes the server reports is ``None``.
+        """
+        data, history = state
+        entries = [
+            x for x in result.get('bugs') or []
+            if str(x.get('id')) == str(self.bugno)
+        ]
+        if len(entries) != 1:
+            return None, None
+        entry = entries[0]
+        changes = {
+            _API_FIELDS.get(k, k): v
+            for k, v in (entry.get('changes') or {}).items()
+        }
+        if data is not None:
+            try:
+                patch, stale = self._changed_data(data, entry, changes)
+            except (KeyError, TypeError, ValueError):
+                data = None
+            else:
+                data.update(patch)
+                if isinstance(data, _Projection) and data._bug is not None:
+                    # fetched with the other fields when looked up
+                    for name in stale:
+                        del data[name]
+                elif stale:
+                    data = None
+        if history is not None and changes:
+            if not entry.get('last_change_time') or not self.bz.user \
+                    or 'work_time' in kwargs and 'work_time' not in changes:
+                history = None
+            else:
+                history.append({
+                    'when': entry['last_change_time'],
+                    'who': self.bz.user,
+                    'changes': [
+                        dict(field_name=k, added=v.get('added', ''),
+                             removed=v.get('removed', ''))
+                        for k, v in sorted(changes.items())
+                    ],
+                })
+        return data, history
+
+    @staticmethod
+    def _changed_data(data, entry, changes):
+        """Return the fields of ``data`` changed by an update.
+
+        ``entry`` is the bug's entry in the result of ``Bug.update``.
+        Return ``(patch, stale)``: the new values of changed fields, and
+        the names of fields of ``data`` whose new values are unknown
+        because they depend on fields that were not retrieved.  Only
+        fields in ``data`` are looked up, so that a projection of the
+        data (see ``_Projection``) is not completed.  Raise
+        ``ValueError`` if a changed field cannot be derived.
+        """
+        patch = {
+            k: _changed_value(k, data[k], v)
+            for k, v in changes.items() if k in data
+        }
+        stale = set()
+        if 'is_open' in data and ('status' in changes
+                                  or 'resolution' in changes):
+            # closed bugs, and only closed bugs, have a resolution
+            if 'resolution' in changes:
+                patch['is_open'] = not changes['resolution'].get('added')
+            elif 'resolution' in data:
+                patch['is_open'] = not data['resolution']
+            else:
+                stale.add('is_open')
+        if 'work_time' in changes and 'actual_time' in data:
+            patch['actual_time'] = \
+                data['actual_time'] + float(changes['work_time']['added'])
+        if 'last_change_time' in data and entry.get('last_change_time'):
+            patch['last_change_time'] = entry['last_change_time']
+        return patch, stale
 
     def update_block(self, add=None, remove=None, set=None, comment=None):
         """Update the bugs that this bug blocks.
 
         Accepts arrays of integer bug numbers.
         """
-        blocks = {}
+        return self._update(
+            self._list_params('blocks', add, remove, set, comment))
+
+    @staticmethod
+    def _list_params(name, add, remove, set, comment):
+        """Return the update parameters to change a list field."""
+        value = {}
         if set:
-            blocks['set'] = set
+            value['set'] = set
         else:
             if add:
-                blocks['add'] = add
+                value['add'] = add
             if remove:
-                blocks['remove'] = remove
-        kwargs = {'blocks': blocks}
+                value['remove'] = remove
+        kwargs = {name: value}
         if comment:
             kwargs['comment'] = {'body': comment}
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-            self.comments = None  # comments are stale
+        return kwargs
 
     def update_depend(self, add=None, remove=None, set=None, comment=None):
         """Update the bugs on which this bug depends.
 
         Accepts arrays of integer bug numbers.
         """
-        depends = {}
-        if set:
-            depends['set'] = set
-        else:
-            if add:
-                depends['add'] = add
-            if remove:
-                depends['remove'] = remove
-        kwargs = {'depends_on': depends}
-        if comment:
-            kwargs['comment'] = {'body': comment}
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-            self.comments = None  # comments are stale
+        return self._update(
+            self._list_params('depends_on', add, remove, set, comment))
 
     def update_cc(self, add=None, remove=None, comment=None):
         """Update the CC list of the given bugs.
 
         Accepts arrays of valid user names.
         """
-        cc = {}
-        if add:
-            cc['add'] = add
-        if remove:
-            cc['remove'] = remove
-        if not cc:
+        if not add and not remove:
             return  # nothing to do
-        kwargs = {'cc': cc}
-        if comment:
-            kwargs['comment'] = {'body': comment}
-        self.rpc('update', ids=[self.bugno], **kwargs)
-        self.data = None  # data is stale
-        self.history = None  # history is stale
-        if comment:
-            self.comments = None  # comments are stale
+        return self._update(
+            self._list_params('cc', add, remove, None, comment))
 
     def actual_time(self):
         """Calculate the actual hours worked on a bug.
@@ -345,7 +806,12 @@ class Bug(object):
         Hopefully this will one day be available via rpc('get', ...), but
         for the time being, we have to use the history to calculate it.
         """
-        changesets = (changeset['changes'] for changeset in self.history)
+        return self._work_time(self.history)
+
+    @staticmethod
+    def _work_time(history):
+        """Return the total work time recorded in the given history."""
+        changesets = (changeset['changes'] for changeset in history)
         hours = (
             float(change['added'])
             for change in itertools.chain.from_iterable(changesets)
@@ -15,6 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import itertools
+import re
+import threading
+
 try:
     import urllib.parse as urlparse
 except ImportError:
@@ -24,8 +29,20 @@ try:
 except ImportError:
     import xmlrpc.client as xmlrpclib
 
+from . import backend
 from . import bug
+from . import cache
+from . import cassette
 from . import config
+from . import identity
+from . import planner
+from . import policy
+from . import registry
+from . import session
+from . import stats
+from . import stream
+from . import transport
+from . import workers
 
 
 # field type constants
@@ -38,6 +55,8 @@ FIELD_DATETIME = 5
 FIELD_BUG_ID = 6
 FIELD_BUG_URL = 7
 
+DEFAULT_CHUNK_SIZE = 100
+
 
 class UserError(Exception):
     pass
@@ -47,13 +66,237 @@ class URLError(Exception):
     pass
 
 
+def _parse_url(url):
+    """Parse a Bugzilla URL; raise URLError if it is not supported."""
+    parsed_url = urlparse.urlparse(url)
+    if not parsed_url.netloc:
+        raise URLError('URL {!r} is not valid.'.format(url))
+    if parsed_url.scheme not in ('http', 'https'):
+        raise URLError(
+            'URL scheme {!r} not supported.'.format(parsed_url.scheme)
+        )
+    if parsed_url.params or parsed_url.query or parsed_url.fragment:
+        raise URLError(
+            'URL params, queries and fragments not supported.'
+        )
+    return parsed_url
+
+
+def _chunks(seq, n):
+    """Split a sequence into lists of at most n items."""
+    seq = list(seq)
+    return [seq[i:i + n] for i in range(0, len(seq), n)]
+
+
+def _resume(first, items):
+    """Yield ``first`` then the rest of the ``items`` generator."""
+    try:
+        yield first
+        for item in items:
+            yield item
+    finally:
+        items.close()
+
+
+def _version_tuple(version):
+    """Return the leading numbers of a version string, e.g. (5, 0)."""
+    return tuple(int(x) for x in re.findall(r'\d+', version)[:2])
+
+
+def _version_at_least(version, minimum):
+    """Return True if ``version()`` is at least ``minimum``, e.g. (5, 0)."""
+    try:
+        return _version_tuple(version()) >= minimum
+    except xmlrpclib.Fault:
+        return False  # no Bugzilla.version; very old
+
+
+def _supports_charts(setting, version):
+    """Return True if ``Bug.search`` accepts boolean charts."""
+    if setting in ('on', 'off'):
+        return setting == 'on'
+    return _version_at_least(version, (5, 0))
+
+
+def _written_bugs(params):
+    """Return the numbers of the bugs changed by a write RPC."""
+    bugnos = list(params.get('ids') or [])
+    if params.get('id'):
+        bugnos.append(params['id'])
+    if params.get('dupe_of'):
+        bugnos.append(params['dupe_of'])
+    for name in ('blocks', 'depends_on'):
+        value = params.get(name) or []
+        if isinstance(value, dict):
+            value = itertools.chain.from_iterable(value.values())
+        bugnos.extend(value)
+    return _numbers(bugnos)
+
+
+def _commented_bugs(method, params):
+    """Return the numbers of the bugs a write RPC adds comments to."""
+    bugnos = []
+    if method == 'Bug.add_comment' or params.get('comment'):
+        bugnos.extend(params.get('ids') or [])
+        if params.get('id'):
+            bugnos.append(params['id'])
+    if params.get('dupe_of'):
+        # the duplicate is noted in a comment on the original bug
+        bugnos.append(params['dupe_of'])
+    return _numbers(bugnos)
+
+
+def _numbers(bugnos):
+    """Return the bug numbers of the given bugs, omitting aliases."""
+    result = []
+    for bugno in bugnos:
+        try:
+            result.append(int(bugno))
+        except (TypeError, ValueError):
+            pass  # an alias
+    return result
+
+
+def _one_user(fragment, users):
+    """Return the only user in ``users``, or raise UserError."""
+    if not users:
+        raise UserError("No users matching '{}'".format(fragment))
+    if len(users) > 1:
+        raise UserError("Multiple users matching '{}': {}".format(
+            fragment,
+            ', '.join(map(lambda x: x['name'], users))
+        ))
+    return users[0]
+
+
+def _by_id(bugs):
+    """Group Bug objects by bug number, in order of first appearance."""
+    by_id = collections.OrderedDict()
+    for _bug in bugs:
+        by_id.setdefault(_bug.bugno, []).append(_bug)
+    return by_id
+
+
+class BatchCall(object):
+    """An RPC queued in a ``Batch``.
+
+    Once the batch has been sent, ``result()`` returns the result of
+    the call or raises the ``xmlrpclib.Fault`` it produced, and the
+    callbacks added with ``add_done_callback`` are called.
+    """
+
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.done = False
+        self.fault = None
+        self._result = None
+        self._callbacks = []
+
+    def add_done_callback(self, fn):
+        """Call ``fn(call)`` once the batch has been sent."""
+        if self.done:
+            fn(self)
+        else:
+            self._callbacks.append(fn)
+
+    def _notify(self):
+        callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def set_result(self, result):
+        self._result = result
+        self.done = True
+
+    def set_fault(self, fault):
+        self.fault = fault
+        self.done = True
+
+    def result(self):
+        if not self.done:
+            raise RuntimeError('batch has not been sent')
+        if self.fault is not None:
+            raise self.fault
+        return self._result
+
+
+class Batch(object):
+    """Queue RPCs and send them with ``system.multicall``.
+
+    While a batch is active in a thread (i.e. inside a ``with`` block),
+    calls to the methods in ``methods`` made through ``Bugzilla.rpc``
+    are queued and return a ``BatchCall`` rather than the result.
+    Other calls (e.g. reads) are performed immediately, so they will
+    not observe the effects of queued calls.
+
+    Queued calls are sent in chunks of at most ``chunk_size`` calls
+    when the batch is flushed.  Leaving the ``with`` block flushes the
+    batch and raises the first fault, if any, after all calls were
+    sent.  To handle faults per call instead, call ``flush()`` within
+    the block and inspect the returned ``BatchCall`` objects.
+    """
+
+    methods = frozenset(['Bug.add_comment', 'Bug.update'])
+
+    def __init__(self, bz, chunk_size):
+        self.bz = bz
+        self.chunk_size = chunk_size
+        self._calls = []
+        self._lock = threading.Lock()
+        self._previous = None
+
+    def add(self, method, params):
+        """Queue a call; return its ``BatchCall``."""
+        call = BatchCall(method, params)
+        with self._lock:
+            self._calls.append(call)
+        return call
+
+    def flush(self):
+        """Send all queued calls; return their ``BatchCall`` objects.
+
+        Chunks are sent concurrently by ``Bugzilla.map``.  If the server
+        does not support ``system.multicall``, each call is a chunk.
+        """
+        with self._lock:
+            calls, self._calls = self._calls, []
+        if self.bz._multicall_supported is False:
+            chunks = [[call] for call in calls]
+        else:
+            chunks = list(_chunks(calls, self.chunk_size))
+        for job in self.bz.map(self.bz._multicall, chunks):
+            if job.error is not None:
+                raise job.error
+        for call in calls:
+            call._notify()
+        return calls
+
+    def __enter__(self):
+        self._previous = self.bz.active_batch
+        self.bz._local.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.bz._local.batch = self._previous
+        if exc_type is not None:
+            return
+        for call in self.flush():
+            if call.fault is not None:
+                raise call.fault
+
+
 class Bugzilla(object):
     """A Bugzilla server."""
 
     __slots__ = [
-        '_products', '_fields', '_user_cache',
+        '_products', '_fields', '_registry', '_user_cache', '_version',
         'url', 'user', 'password', 'config',
-        'server',
+        'server', 'transport', 'cassette', 'cache', 'identity_map',
+        'chunk_size', 'jobs', 'policy',
+        'observers',
+        '_local', '_multicall_supported',
+        'tokens', 'token', '_token_lock',
     ]
 
     @classmethod
@@ -99,35 +342,139 @@ class Bugzilla(object):
         url      : points to a bugzilla instance (base URL; must end in '/')
         user     : bugzilla username
         password : bugzilla password
+
+        The ``pool_size`` and ``pool_timeout`` config options control
+        the number of idle connections kept alive, and how many seconds
+        an idle connection may be reused for.  The ``chunk_size`` config
+        option limits the number of calls sent in one multicall.  The
+        ``jobs`` config option sets the number of threads ``map`` uses.
+
+        Each RPC must complete within ``timeout`` seconds (config option;
+        default: 300; 0 for no limit) and idempotent RPCs are tried up to
+        ``retries`` (config option; default: 3) more times if the server
+        is unavailable or overloaded.  At most ``concurrency`` (config
+        option; default: 8) RPCs are in progress at once; fewer if the
+        server is overloaded.  See ``bzlib.policy``.
+
+        If the ``session`` config option is ``token``, log in once and
+        authenticate later calls with the login token instead of the
+        password.  Tokens are saved in the file named by the
+        ``token_file`` config option (default: ``tokens`` in the cache
+        directory) for use by later invocations.
+
+        The ``backend`` config option selects the RPC interface: one of
+        ``xmlrpc`` (the default), ``jsonrpc`` or ``rest``.
+
+        Request bodies of at least ``compress_threshold`` bytes (config
+        option; default: never) are sent gzip-compressed.
+
+        Each RPC is reported to the callables in ``observers`` (see
+        ``bzlib.stats``).
+
+        ``bug`` returns the same ``Bug`` for a bug number while it is one
+        of the ``identity_map_size`` (config option; default: 1000; 0 to
+        disable) most recently used bugs, or referenced elsewhere, so
+        its data is fetched once.  Updates through ``rpc`` invalidate
+        the data of the bugs they change (see ``bzlib.identity``).
+
+        If the ``record`` config option names a file, RPCs and their
+        results are recorded to it.  If the ``replay`` config option
+        names such a file, RPCs are answered from it instead of the
+        server (see ``bzlib.cassette``).
+
+        Fields, products and users are cached on disk between
+        invocations (see ``bzlib.cache``) unless the ``cache`` config
+        option is ``off`` or RPCs are recorded or replayed.  Entries are
+        fresh for ``cache_ttl`` seconds (default: 3600), then refreshed
+        in the background while the stale entry is used, for up to
+        ``cache_max_stale`` seconds more (default: a week).  The cache
+        directory (``cache_dir``) is limited to ``cache_size`` bytes
+        (default: 50 MB).
         """
 
         self._products = None
         self._fields = None
+        self._registry = None
         self._user_cache = {}
+        self._version = None
+        self._local = threading.local()
+        self._multicall_supported = None
 
         self.url = url
         self.user = user
         self.password = password
         self.config = config
+        self.chunk_size = int(config.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        self.jobs = int(config.get('jobs', 1))
+        self.policy = policy.Policy(
+            timeout=float(config.get('timeout', policy.DEFAULT_TIMEOUT))
+            or None,
+            retries=int(config.get('retries', policy.DEFAULT_RETRIES)),
+            limiter=policy.Limiter(int(
+                config.get('concurrency', policy.DEFAULT_CONCURRENCY)))
+        )
 
-        parsed_url = urlparse.urlparse(url)
-        if not parsed_url.netloc:
-            raise URLError('URL {!r} is not valid.'.format(url))
-        if parsed_url.scheme not in ('http', 'https'):
-            raise URLError(
-                'URL scheme {!r} not supported.'.format(parsed_url.scheme)
-            )
-        if parsed_url.params or parsed_url.query or parsed_url.fragment:
-            raise URLError(
-                'URL params, queries and fragments not supported.'
-            )
-        url = url + 'xmlrpc.cgi' if url[-1] == '/' else url + '/xmlrpc.cgi'
-        # httplib explodes if url is unicode
-        self.server = xmlrpclib.ServerProxy(
-            str(url),
+        self.observers = []
+
+        identity_map_size = int(
+            config.get('identity_map_size', identity.DEFAULT_SIZE))
+        self.identity_map = identity.IdentityMap(identity_map_size) \
+            if identity_map_size else None
+
+        parsed_url = _parse_url(url)
+        pool = transport.ConnectionPool(
+            parsed_url.scheme,
+            size=int(config.get('pool_size', transport.DEFAULT_POOL_SIZE)),
+            timeout=float(
+                config.get('pool_timeout', transport.DEFAULT_POOL_TIMEOUT))
+        )
+        compress_threshold = config.get('compress_threshold')
+        self.transport = transport.Transport(
+            parsed_url.scheme,
             use_datetime=True,
-            allow_none=True
+            pool=pool,
+            compress_threshold=int(compress_threshold)
+            if compress_threshold is not None else None
         )
+        self.server = backend.server_proxy(
+            config.get('backend', 'xmlrpc'), url, self.transport)
+
+        self.cassette = None
+        if config.get('replay'):
+            self.cassette = self.server = cassette.Player(config['replay'])
+        elif config.get('record'):
+            self.cassette = self.server = cassette.Recorder(
+                self.server, config['record'],
+                url=url, backend=config.get('backend', 'xmlrpc'))
+
+        self.tokens = None
+        self.token = None
+        self._token_lock = threading.Lock()
+        # a cassette must not read or replace the saved login tokens
+        if config.get('session') == 'token' and user and password \
+                and self.cassette is None:
+            self.tokens = session.TokenStore(config.get('token_file'))
+
+        self.cache = None
+        if config.get('cache') != 'off' and self.cassette is None:
+            self.cache = cache.MetadataCache(
+                config.get('cache_dir'),
+                ttl=float(config.get('cache_ttl', cache.DEFAULT_TTL)),
+                max_stale=float(
+                    config.get('cache_max_stale', cache.DEFAULT_MAX_STALE)),
+                max_size=int(config.get('cache_size', cache.DEFAULT_MAX_SIZE))
+            )
+
+    def close(self):
+        """Close idle connections to the server and the cassette.
+
+        Background refreshes of the metadata cache are completed first.
+        """
+        if self.cache is not None:
+            self.cache.wait()
+        self.transport.close()
+        if self.cassette is not None:
+            self.cassette.close()
 
     def rpc(self, *args, **kwargs):
         """Do an RPC on the Bugzilla server.
@@ -135,33 +482,533 @@ class Bugzilla(object):
         args: RPC method, in fragments
         kwargs: RPC parameters
         """
-        kwargs['Bugzilla_login'] = self.user
-        kwargs['Bugzilla_password'] = self.password
+        method = '.'.join(args)
+        self._auth(kwargs)
+
+        if self.identity_map is not None and method in Batch.methods:
+            self.identity_map.invalidate(
+                _written_bugs(kwargs), _commented_bugs(method, kwargs))
+
+        batch = self.active_batch
+        if batch is not None and method in batch.methods:
+            return batch.add(method, kwargs)
+
+        try:
+            return self._call(method, kwargs)
+        except xmlrpclib.Fault as e:
+            if not self._token_rejected(kwargs, e):
+                raise
+        return self._call(method, self._auth(kwargs))
+
+    def _call(self, method, params):
+        """Perform an RPC according to the policy."""
+        return self._perform(
+            method, lambda: getattr(self.server, method)(params))
+
+    def _perform(self, method, fn, streamed=False):
+        """Call ``fn`` to perform an RPC according to the policy.
+
+        The call is reported to the observers; if ``streamed``, once the
+        iterator ``fn`` returns is exhausted or closed.
+        """
+        if not self.observers:
+            return self.policy.call(method, fn)
 
-        method = self.server
-        for fragment in args:
-            method = getattr(method, fragment)
-        return method(kwargs)
+        call = stats.Call(method)
+
+        def attempt():
+            call.retries += 1
+            return fn()
+
+        with self.transport.tally() as tally:
+            try:
+                result = self.policy.call(method, attempt)
+            except Exception as e:
+                self._notify(call.finish(tally, e))
+                raise
+        if streamed:
+            return self._observe(call, tally, result)
+        self._notify(call.finish(tally))
+        return result
+
+    def _observe(self, call, tally, items):
+        """Iterate over a streamed result, then report the call."""
+        error = None
+        try:
+            for item in items:
+                yield item
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+            self._notify(call.finish(tally, error))
+
+    def _notify(self, call):
+        for observer in self.observers:
+            observer(call)
+
+    def rpc_iter(self, paths, *args, **kwargs):
+        """Do an RPC and iterate over the arrays at ``paths`` in the result.
+
+        Return an iterator of ``(path, item)`` pairs (see ``bzlib.stream``).
+        Where the backend supports it, items are decoded as the response
+        is received, so the whole result is never held in memory.  The
+        call is made, and a fault raised, before this method returns.
+        """
+        method = '.'.join(args)
+        self._auth(kwargs)
+        try:
+            return self._perform(
+                method, lambda: self._open_stream(method, kwargs, paths),
+                streamed=True
+            )
+        except xmlrpclib.Fault as e:
+            if not self._token_rejected(kwargs, e):
+                raise
+        self._auth(kwargs)
+        return self._perform(
+            method, lambda: self._open_stream(method, kwargs, paths),
+            streamed=True
+        )
 
-    def bug(self, bugno):
-        """Extrude a Bug object."""
-        return bug.Bug(self, bugno)
+    def _open_stream(self, method, params, paths):
+        _stream = getattr(self.server, '_stream', None)
+        if _stream is None:
+            result = getattr(self.server, method)(params)
+            return stream.walk(result, paths)
+        items = _stream(method, params, paths)
+        # a fault arrives in place of the first item
+        try:
+            first = next(items)
+        except StopIteration:
+            return iter(())
+        return _resume(first, items)
+
+    def _auth(self, params):
+        """Add authentication to the given RPC parameters."""
+        params.pop('Bugzilla_token', None)
+        token = self.login() if self.tokens is not None else None
+        if token:
+            params['Bugzilla_token'] = token
+        else:
+            params['Bugzilla_login'] = self.user
+            params['Bugzilla_password'] = self.password
+        return params
+
+    def _token_rejected(self, params, fault):
+        """Return True if the fault is due to an invalid login token.
+
+        The rejected token is forgotten, so the next call to ``login``
+        obtains a new one.
+        """
+        token = params.get('Bugzilla_token')
+        if not token or fault.faultCode not in session.INVALID_TOKEN_FAULTS:
+            return False
+        with self._token_lock:
+            if self.token == token:
+                self.token = None
+                self.tokens.remove(self.url, self.user)
+        return True
+
+    def login(self):
+        """Return a login token, logging in if necessary.
+
+        Return ``None`` if token sessions are not in use or the server
+        does not issue tokens.
+        """
+        with self._token_lock:
+            if self.tokens is None:
+                return None
+            if self.token is None:
+                self.token = self.tokens.get(self.url, self.user)
+            if self.token is None:
+                result = self._call(
+                    'User.login',
+                    {'login': self.user, 'password': self.password}
+                )
+                if 'token' not in result:
+                    # server does not support tokens; use the password
+                    self.tokens = None
+                    return None
+                self.token = result['token']
+                self.tokens.set(self.url, self.user, self.token)
+            return self.token
+
+    def logout(self):
+        """Log out and forget the login token, if any."""
+        with self._token_lock:
+            token, self.token = self.token, None
+            if self.tokens is not None:
+                token = token or self.tokens.get(self.url, self.user)
+                self.tokens.remove(self.url, self.user)
+        if token:
+            self._call('User.logout', {'Bugzilla_token': token})
+
+    @property
+    def active_batch(self):
+        """The ``Batch`` active in the current thread, or ``None``."""
+        return getattr(self._local, 'batch', None)
+
+    def batch(self, chunk_size=None):
+        """Return a ``Batch`` for sending many RPCs at once.
+
+        Usage::
+
+          with bz.batch():
+              for bugno in bugnos:
+                  bz.bug(bugno).add_comment('...')
+        """
+        return Batch(self, chunk_size or self.chunk_size)
+
+    def _multicall(self, calls, retry_auth=True):
+        """Perform the given ``BatchCall`` objects.
+
+        Use ``system.multicall`` if the server supports it, otherwise
+        perform the calls one at a time.  Calls rejected because of an
+        invalid login token are tried once more with a new token.
+        """
+        self._send_multicall(calls)
+        retry = [
+            call for call in calls
+            if call.fault is not None
+                and self._token_rejected(call.params, call.fault)
+        ]
+        if retry and retry_auth:
+            for call in retry:
+                call.fault = None
+                self._auth(call.params)
+            self._multicall(retry, retry_auth=False)
+
+    def _send_multicall(self, calls):
+        if self._multicall_supported is not False:
+            try:
+                results = self._call('system.multicall', [
+                    {'methodName': call.method, 'params': [call.params]}
+                    for call in calls
+                ])
+            except xmlrpclib.Fault:
+                # no system.multicall; don't bother trying again
+                self._multicall_supported = False
+            else:
+                self._multicall_supported = True
+                for call, result in zip(calls, results):
+                    if isinstance(result, dict):
+                        call.set_fault(xmlrpclib.Fault(
+                            result['faultCode'], result['faultString']))
+                    else:
+                        call.set_result(result[0])
+                return
+
+        for call in calls:
+            try:
+                call.set_result(self._call(call.method, call.params))
+            except xmlrpclib.Fault as e:
+                call.set_fault(e)
+
+    def map(self, fn, items, jobs=None):
+        """Call ``fn`` on each item, using up to ``jobs`` threads.
+
+        ``jobs`` defaults to the ``jobs`` config option (default: 1).
+        The batch active in the calling thread, if any, is active in the
+        threads too.  Return a list of ``workers.Job`` in the order of
+        the items; exceptions raised by ``fn`` are recorded in the jobs
+        rather than raised.
+        """
+        batch = self.active_batch
+
+        def _fn(item):
+            previous = self.active_batch
+            self._local.batch = batch
+            try:
+                return fn(item)
+            finally:
+                self._local.batch = previous
+
+        return workers.run(_fn, items, jobs or self.jobs)
+
+    def _map_chunks(self, fn, seq, chunk_size):
+        """Call ``fn`` on chunks of ``seq``; return the results in order.
+
+        Raise the first exception, if any, once all chunks are done.
+        """
+        jobs = self.map(fn, list(_chunks(seq, chunk_size or self.chunk_size)))
+        for job in jobs:
+            if job.error is not None:
+                raise job.error
+        return [job.result for job in jobs]
+
+    def bug(self, bugno, include_fields=None):
+        """Extrude a Bug object.
+
+        If the bug is in the identity map, return the existing ``Bug``;
+        ``include_fields`` then widens the fields it retrieves, if its
+        data is not loaded yet.
+        """
+        if self.identity_map is None:
+            return bug.Bug(self, bugno, include_fields)
+        _bug = self.identity_map.get(
+            int(bugno), lambda: bug.Bug(self, bugno, include_fields))
+        _bug._want(include_fields)
+        return _bug
+
+    def _adopt(self, data, include_fields):
+        """Return the ``Bug`` of data just retrieved, with the data."""
+        _bug = self.bug(data['id'], include_fields)
+        _bug._merge(data, include_fields)
+        return _bug
+
+    def bugs(
+        self, bugnos, chunk_size=None, include_fields=None, use_cache=True
+    ):
+        """Return a list of Bug objects with their data loaded.
+
+        The data for all bugs is retrieved using as few ``Bug.get``
+        calls of at most ``chunk_size`` bugs as possible.  The bugs
+        are returned in the order given.  If ``include_fields`` is
+        given, only those fields are retrieved; other fields are
+        fetched when first looked up.  Bugs whose data is already
+        loaded are not retrieved again, unless ``use_cache`` is false.
+        """
+        include_fields = bug.Bug._include_fields(include_fields)
+        bugs = [self.bug(bugno, include_fields) for bugno in bugnos]
+        by_id = _by_id(
+            x for x in bugs if not use_cache or not x._loaded(include_fields))
+        kwargs = {}
+        if include_fields is not None:
+            kwargs['include_fields'] = include_fields
+        results = self._map_chunks(
+            lambda chunk: self.rpc('Bug', 'get', ids=chunk, **kwargs)['bugs'],
+            by_id, chunk_size
+        )
+        for data in itertools.chain.from_iterable(results):
+            for _bug in by_id[int(data['id'])]:
+                _bug._merge(data, include_fields)
+        return bugs
+
+    def update_bugs(self, bugnos, chunk_size=None, **changes):
+        """Make the same changes to many bugs.
+
+        ``changes`` are the keyword args of ``Bug.update``, or
+        ``assigned_to``, ``dupe_of``, ``resolution`` and ``status``,
+        and are checked and formatted as by ``Bug.update``.  Bugs are
+        updated using as few ``Bug.update`` calls of at most
+        ``chunk_size`` bugs as possible, even in a batch.  If a call
+        fails, e.g. because one of its bugs cannot be changed, its bugs
+        are updated one at a time so that the others are still updated.
+        The changes are applied to the bugs in the identity map.
+
+        Return a list of ``workers.Job`` in the order of the bugs, whose
+        ``result`` is the bug's entry in the result of ``Bug.update``,
+        or ``error`` the exception raised updating the bug.
+        """
+        params = bug.Bug._update_params(changes, bug._BULK_UPDATE_FIELDS)
+        jobs = [workers.Job(bugno) for bugno in bugnos]
+
+        def update(bugnos):
+            """Update the bugs in one call; return their entries."""
+            bugs = []
+            if self.identity_map is not None:
+                bugs = [self.identity_map.find(int(x)) for x in bugnos]
+            states = [(x, x._state()) for x in bugs if x is not None]
+            previous, self._local.batch = self.active_batch, None
+            try:
+                result = self.rpc('Bug', 'update', ids=bugnos, **params)
+            finally:
+                self._local.batch = previous
+            for _bug, state in states:
+                _bug._applied(state, params, result)
+            by_id = {str(x['id']): x for x in result['bugs']}
+            return [by_id.get(str(bugno)) for bugno in bugnos]
+
+        def update_chunk(chunk):
+            try:
+                entries = update([job.item for job in chunk])
+            except xmlrpclib.Fault:
+                if len(chunk) == 1:
+                    raise
+                for job in chunk:
+                    job(lambda bugno: update([bugno])[0])
+                return
+            for job, entry in zip(chunk, entries):
+                job.result = entry
+
+        chunks = list(_chunks(jobs, chunk_size or self.chunk_size))
+        for chunk_job in self.map(update_chunk, chunks):
+            if chunk_job.error is not None:
+                for job in chunk_job.item:
+                    job.error = chunk_job.error
+        return jobs
+
+    def plan_update(self, bugnos, changes, fields=None):
+        """Plan the updates of many bugs, skipping changes that are no-ops.
+
+        The current values of the changed fields are retrieved, and
+        only the changes that change each bug are planned; bugs with
+        the same changes are updated together.  See ``planner.plan``
+        for the args.  Return a ``planner.Plan``; call its ``execute``
+        method to make the updates.
+        """
+        return planner.plan(self, bugnos, changes, fields)
+
+    def prefetch_comments(self, bugs, chunk_size=None):
+        """Load the comments of the given Bug objects.
+
+        Comments are retrieved using as few ``Bug.comments`` calls of at
+        most ``chunk_size`` bugs as possible.  Bugs whose comments are
+        already loaded are skipped; stale comments are refreshed with
+        only the newer comments.  Return a list of the bugs.
+        """
+        def load(chunk, since):
+            comments = {bugno: [] for bugno in chunk}
+            for bugno, comment in self.iter_comments(chunk, since):
+                comments[bugno].append(comment)
+            return comments
+
+        return self._prefetch(bugs, 'comments', 'time', load, chunk_size)
+
+    def iter_comments(self, bugnos, new_since=None):
+        """Iterate over the comments of the given bugs in one call.
+
+        If ``new_since`` is given, only comments made after that time
+        are retrieved.  Yield ``(bugno, comment)`` pairs as the response
+        is decoded.
+        """
+        kwargs = {'new_since': new_since} if new_since is not None else {}
+        items = self.rpc_iter(
+            [('bugs', stream.ANY, 'comments')],
+            'Bug', 'comments', ids=list(bugnos), **kwargs
+        )
+        for path, comment in items:
+            yield int(path[1]), comment
+
+    def prefetch_history(self, bugs, chunk_size=None):
+        """Load the history of the given Bug objects.
+
+        History is retrieved using as few ``Bug.history`` calls of at
+        most ``chunk_size`` bugs as possible.  Bugs whose history is
+        already loaded are skipped; stale history is refreshed with
+        only the newer entries if the server supports it.  Return a list
+        of the bugs.
+        """
+        def load(chunk, since):
+            kwargs = {'new_since': since} if since is not None else {}
+            result = self.rpc('Bug', 'history', ids=chunk, **kwargs)
+            return {int(x['id']): x['history'] for x in result['bugs']}
+
+        return self._prefetch(
+            bugs, 'history', 'when', load, chunk_size,
+            incremental=self.supports_history_since)
+
+    def _prefetch(
+        self, bugs, name, key, load, chunk_size, incremental=lambda: True
+    ):
+        """Load the comments or history (``name``) of the given bugs.
+
+        ``load(chunk, since)`` returns the entries of the bugs in
+        ``chunk`` by bug number; only those after ``since`` unless it is
+        ``None``.  ``key`` is the time of an entry.  Stale entries are
+        refreshed from the oldest ``since`` of the stale bugs, if
+        ``incremental()``.  Return a list of the bugs.
+        """
+        bugs = list(bugs)
+        missing, stale = [], []
+        for _bug in bugs:
+            entries = getattr(_bug, '_' + name)
+            if entries is None:
+                missing.append(_bug)
+            elif getattr(_bug, '_{}_stale'.format(name)):
+                stale.append(_bug)
+        if stale and not incremental():
+            missing, stale = missing + stale, []
+        # bugs without entries have no time to refresh from
+        missing += [x for x in stale if not getattr(x, '_' + name)]
+        stale = [x for x in stale if getattr(x, '_' + name)]
+
+        def fetch(bugs, since):
+            by_id = _by_id(bugs)
+            results = self._map_chunks(
+                lambda chunk: load(chunk, since), by_id, chunk_size)
+            for entries in results:
+                for bugno, data in entries.items():
+                    for _bug in by_id[bugno]:
+                        setattr(_bug, name, bug._merge_since(
+                            getattr(_bug, '_' + name), data, since, key))
+
+        fetch(missing, None)
+        if stale:
+            fetch(stale, min(
+                bug._since(getattr(x, '_' + name), key) for x in stale))
+        return bugs
+
+    def _cached(self, name, fetch, use_cache):
+        """Return ``fetch()``, or its result saved in the disk cache."""
+        if self.cache is None:
+            return fetch()
+        return self.cache.get(
+            self.url, self.user, name, fetch, refresh=not use_cache)
 
     def get_products(self, use_cache=True):
         """Get accessible products of this Bugzilla."""
         if use_cache and self._products:
             return self._products
-        ids = self.rpc('Product', 'get_accessible_products')['ids']
-        self._products = self.rpc('Product', 'get', ids=ids)['products']
+
+        def fetch():
+            ids = self.rpc('Product', 'get_accessible_products')['ids']
+            return self.rpc('Product', 'get', ids=ids)['products']
+        self._products = self._cached('products', fetch, use_cache)
         return self._products
 
     def get_fields(self, use_cache=True):
         """Get information about bug fields."""
         if use_cache and self._fields:
             return self._fields
-        self._fields = self.rpc('Bug', 'fields')['fields']
+        self._fields = self._cached(
+            'fields', lambda: self.rpc('Bug', 'fields')['fields'], use_cache)
         return self._fields
 
+    def get_field_registry(self, use_cache=True):
+        """Get the bug fields, indexed; a ``registry.FieldRegistry``.
+
+        The registry is built once each time the fields are loaded.
+        """
+        fields = self.get_fields(use_cache)
+        _registry = self._registry
+        if _registry is None or _registry.fields is not fields:
+            _registry = self._registry = registry.FieldRegistry(fields)
+        return _registry
+
+    def get_version(self, use_cache=True):
+        """Get the version of the Bugzilla server, e.g. ``'5.0.4'``."""
+        if use_cache and self._version:
+            return self._version
+        self._version = self._cached(
+            'version',
+            lambda: self.rpc('Bugzilla', 'version')['version'],
+            use_cache
+        )
+        return self._version
+
+    def supports_charts(self):
+        """Return True if ``Bug.search`` accepts boolean charts.
+
+        Boolean charts (the ``f1``, ``o1`` and ``v1`` parameters) are
+        supported by Bugzilla 5.0 or later; older versions ignore them.
+        The ``charts`` config option (``on`` or ``off``) overrides the
+        version check.
+        """
+        return _supports_charts(self.config.get('charts'), self.get_version)
+
+    def supports_history_since(self):
+        """Return True if ``Bug.history`` accepts ``new_since``.
+
+        ``new_since`` is supported by Bugzilla 5.0 or later; older
+        versions return the whole history.
+        """
+        return _version_at_least(self.get_version, (5, 0))
+
     def get_field_values(self,
         name,
         sort=True,
@@ -170,6 +1017,8 @@ class Bugzilla(object):
     ):
         """Return the legal values for a field; a list of dicts.
 
+        The list is shared by later calls and must not be modified.
+
         visible_for:
             A dict of bug data.  If the field has a value_field and its value
             is a key in the dict, the value of that bug field will be used to
@@ -177,26 +1026,18 @@ class Bugzilla(object):
             visibility_values.  If the field does not have a value_field, no
             effect.  If not supplied, no effect.
         """
-        field = filter(lambda x: x['name'] == name, self.get_fields())[0]
-        values = [value for value in field['values'] if 'name' in value]
-        if omit_empty:
-            values = filter(lambda x: x['name'], values)
-        value_field = field.get('value_field')
-        if visible_for and value_field and value_field in visible_for:
-            visibility_value = visible_for[value_field]
-            values = filter(
-                lambda x: visibility_value in x['visibility_values'],
-                values
-            )
-        if sort:
-            values = sorted(values, key=lambda x: int(x['sortkey']))
-        return values
+        return self.get_field_registry().values(
+            name, sort, omit_empty, visible_for)
 
     def match_users(self, fragment, use_cache=True):
         """Return a list of users matching the given string."""
         if use_cache and fragment in self._user_cache:
             return self._user_cache[fragment]
-        users = self.rpc('User', 'get', match=[fragment])['users']
+        users = self._cached(
+            'users:' + fragment,
+            lambda: self.rpc('User', 'get', match=[fragment])['users'],
+            use_cache
+        )
         if use_cache:
             self._user_cache[fragment] = users
         return users
@@ -206,12 +1047,4 @@ class Bugzilla(object):
 
         Raise UserError if the result does not contain exactly one user.
         """
-        users = self.match_users(fragment)
-        if not users:
-            raise UserError("No users matching '{}'".format(fragment))
-        if len(users) > 1:
-            raise UserError("Multiple users matching '{}': {}".format(
-                fragment,
-                ', '.join(map(lambda x: x['name'], users))
-            ))
-        return users[0]
+        return _one_user(fragment, self.match_users(fragment))
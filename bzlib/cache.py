@@ -0,0 +1,196 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""On-disk cache of server metadata (fields, products and users).
+
+Entries are keyed by server URL, user and name, and are saved one per
+file in the ``metadata`` directory of the cache directory.  An entry is
+fresh for ``ttl`` seconds.  A stale entry up to ``max_stale`` seconds
+old is returned at once and refreshed in a background thread
+(stale-while-revalidate); older entries are refreshed before returning.
+When the files exceed ``max_size`` bytes in total, the least recently
+used are removed.
+"""
+
+import hashlib
+import os
+import os.path
+import threading
+import time
+
+from . import backend
+from . import config
+
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_STALE = 7 * 24 * 3600
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+_SUFFIX = '.json'
+
+
+def default_path():
+    return os.path.join(config.cache_dir(), 'metadata')
+
+
+class MetadataCache(object):
+    """Metadata saved to files between invocations.
+
+    Files are created readable and writable only by the user, and are
+    replaced atomically.  Unreadable entries are treated as missing.
+    """
+
+    def __init__(
+        self, path=None,
+        ttl=DEFAULT_TTL, max_stale=DEFAULT_MAX_STALE, max_size=DEFAULT_MAX_SIZE
+    ):
+        self._path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.threads = []
+
+    @property
+    def path(self):
+        path = self._path or default_path()
+        if not os.path.isdir(path):
+            os.makedirs(path, 0o700)
+        return path
+
+    def _file(self, url, user, name):
+        key = u'\0'.join([url or u'', user or u'', name]).encode('utf-8')
+        return os.path.join(
+            self.path, hashlib.sha1(key).hexdigest() + _SUFFIX)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'rb') as fh:
+                return backend.loads(fh.read())
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write(self, path, entry):
+        tmp = '{}.{}.{}'.format(
+            path, os.getpid(), threading.current_thread().ident)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(backend.dumps(entry).encode('utf-8'))
+        os.rename(tmp, path)
+        self._evict()
+
+    def _files(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.path, x) for x in names if x.endswith(_SUFFIX)
+        ]
+
+    def _evict(self):
+        """Remove the least recently used files while over ``max_size``."""
+        files = []
+        for path in self._files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(x[1] for x in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def set(self, url, user, name, value):
+        entry = {
+            'url': url, 'user': user, 'name': name,
+            'time': time.time(), 'value': value,
+        }
+        with self._lock:
+            self._write(self._file(url, user, name), entry)
+
+    def get(self, url, user, name, fetch, refresh=False):
+        """Return the cached value, calling ``fetch`` to obtain it.
+
+        If ``refresh``, or the entry is missing or too stale, call
+        ``fetch`` now and save its result.  If the entry is stale, return
+        it and refresh it in a background thread.  Errors in background
+        refreshes are ignored; the entry remains stale.
+        """
+        path = self._file(url, user, name)
+        entry = None if refresh else self._read(path)
+        age = time.time() - entry['time'] if entry else None
+        if entry is None or age > self.ttl + self.max_stale:
+            value = fetch()
+            self.set(url, user, name, value)
+            return value
+        try:
+            os.utime(path, None)  # recently used
+        except OSError:
+            pass
+        if age > self.ttl:
+            self._refresh(url, user, name, fetch)
+        return entry['value']
+
+    def _refresh(self, url, user, name, fetch):
+        key = (url, user, name)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.set(url, user, name, fetch())
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        # not a daemon, so that the refresh completes before exit
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        self.threads.append(thread)
+
+    def wait(self):
+        """Wait for background refreshes to complete."""
+        while self.threads:
+            self.threads.pop().join()
+
+    def clear(self, url=None, user=None):
+        """Remove the entries of the given server and user, or all."""
+        with self._lock:
+            for path in self._files():
+                if url is not None or user is not None:
+                    entry = self._read(path)
+                    if entry and (
+                        url is not None and entry['url'] != url
+                        or user is not None and entry['user'] != user
+                    ):
+                        continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
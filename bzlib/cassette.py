@@ -0,0 +1,217 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Record RPCs to a cassette and replay them without a server.
+
+A cassette is a gzip-compressed file of JSON lines.  The first line is
+a header; each other line records one call: its method, its parameters
+without credentials, and its result or the fault it raised.  Calls that
+failed for other reasons (e.g. a dropped connection) are not recorded.
+
+``Recorder`` wraps a backend proxy and records the calls made through
+it.  ``Player`` is used in place of a backend proxy and answers each
+call with the next result recorded for the same method and parameters,
+so a workload is replayed deterministically even if its calls are made
+in another order (e.g. by several threads).
+"""
+
+import base64
+import collections
+import datetime
+import gzip
+import json
+import threading
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+
+VERSION = 1
+
+# parameters that carry credentials, which are not recorded
+_CREDENTIALS = frozenset([
+    'Bugzilla_login', 'Bugzilla_password', 'Bugzilla_token', 'password',
+])
+
+# recorded in place of login tokens
+_TOKEN = 'cassette'
+
+_DATETIME_FORMAT = '%Y%m%dT%H:%M:%S'
+
+
+class CassetteError(Exception):
+    pass
+
+
+def _default(obj):
+    if isinstance(obj, datetime.datetime):
+        return {'$datetime': obj.strftime(_DATETIME_FORMAT)}
+    if isinstance(obj, xmlrpclib.DateTime):
+        return {'$datetime': obj.value}
+    if isinstance(obj, xmlrpclib.Binary):
+        return {'$binary': base64.b64encode(obj.data).decode('ascii')}
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+
+def _object_hook(obj):
+    if len(obj) == 1:
+        if '$datetime' in obj:
+            return datetime.datetime.strptime(
+                obj['$datetime'], _DATETIME_FORMAT)
+        if '$binary' in obj:
+            return xmlrpclib.Binary(base64.b64decode(obj['$binary']))
+    return obj
+
+
+def _strip(obj):
+    """Return ``obj`` without credentials."""
+    if isinstance(obj, dict):
+        return {
+            k: _strip(v) for k, v in obj.items() if k not in _CREDENTIALS
+        }
+    if isinstance(obj, (list, tuple)):
+        return [_strip(x) for x in obj]
+    return obj
+
+
+def _key(method, params):
+    return method, json.dumps(params, sort_keys=True, default=_default)
+
+
+def _dumps(record):
+    return (
+        json.dumps(record, separators=(',', ':'), default=_default) + '\n'
+    ).encode('utf-8')
+
+
+def load(path):
+    """Read a cassette; return its header and list of calls."""
+    with gzip.open(path, 'rb') as fh:
+        lines = iter(fh)
+        try:
+            header = json.loads(next(lines).decode('utf-8'))
+        except (StopIteration, ValueError):
+            raise CassetteError('{} is not a cassette'.format(path))
+        if header.get('cassette') != VERSION:
+            raise CassetteError(
+                '{} has unsupported version {!r}'
+                .format(path, header.get('cassette')))
+        calls = []
+        try:
+            for line in lines:
+                calls.append(
+                    json.loads(line.decode('utf-8'), object_hook=_object_hook))
+        except (EOFError, IOError):
+            # the recording process did not close the cassette;
+            # every complete line was flushed
+            pass
+    return header, calls
+
+
+class _Method(object):
+    def __init__(self, call, name):
+        self._call = call
+        self._name = name
+
+    def __call__(self, params):
+        return self._call(self._name, params)
+
+
+class Recorder(object):
+    """Record calls made through a backend proxy to a cassette file.
+
+    The file is written as calls complete, so that it is usable even if
+    the recording process does not call ``close``.  Streamed calls are
+    recorded whole, so they are not streamed while recording.
+    """
+
+    def __init__(self, proxy, path, **header):
+        self._proxy = proxy
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wb')
+        header['cassette'] = VERSION
+        self._write(header)
+
+    def _write(self, record):
+        with self._lock:
+            self._file.write(_dumps(record))
+            self._file.flush()
+
+    def _record(self, method, params):
+        record = {'method': method, 'params': _strip(params)}
+        try:
+            result = getattr(self._proxy, method)(params)
+        except xmlrpclib.Fault as e:
+            record['fault'] = [e.faultCode, e.faultString]
+            self._write(record)
+            raise
+        if method == 'User.login' and 'token' in result:
+            record['result'] = dict(result, token=_TOKEN)
+        else:
+            record['result'] = result
+        self._write(record)
+        return result
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _Method(self._record, name)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Player(object):
+    """Answer calls with the results recorded in a cassette file.
+
+    Raise ``CassetteError`` for a call that was not recorded, or that
+    was made more times than it was recorded.
+    """
+
+    def __init__(self, path):
+        self.header, calls = load(path)
+        self._lock = threading.Lock()
+        self._calls = collections.defaultdict(collections.deque)
+        for call in calls:
+            self._calls[_key(call['method'], call['params'])].append(call)
+
+    def _play(self, method, params):
+        key = _key(method, _strip(params))
+        with self._lock:
+            calls = self._calls.get(key)
+            if not calls:
+                raise CassetteError(
+                    'no recorded call {}({})'.format(method, key[1]))
+            call = calls.popleft()
+        if 'fault' in call:
+            raise xmlrpclib.Fault(*call['fault'])
+        return call['result']
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _Method(self._play, name)
+
+    def remaining(self):
+        """Return the number of recorded calls not yet replayed."""
+        with self._lock:
+            return sum(len(x) for x in self._calls.values())
+
+    def close(self):
+        pass
@@ -18,16 +18,20 @@
 from __future__ import unicode_literals
 
 import argparse
+import atexit
 import datetime
 import functools
 import itertools
 import re
+import sys
 import textwrap
 
 from . import bug
 from . import bugzilla
+from . import cache
 from . import config
 from . import editor
+from . import stats
 
 curry = functools.partial
 
@@ -121,6 +125,24 @@ def with_limit(things='items', default=None):
     return decorator
 
 
+def with_jobs(cls):
+    cls.args = cls.args + [
+        lambda x: x.add_argument('--jobs', '-j', type=int, metavar='N',
+            help='Process up to N bugs at once (default: the "jobs" '
+                 'server config, or 1).'),
+    ]
+    return cls
+
+
+def with_dry_run(cls):
+    cls.args = cls.args + [
+        lambda x: x.add_argument('--dry-run', action='store_true',
+            help='Print the planned updates and the estimated number of '
+                 'RPCs; do not update bugs.'),
+    ]
+    return cls
+
+
 def with_server(cls):
     def add_server_args(parser):
         group = parser.add_argument_group('server arguments')
@@ -215,6 +237,28 @@ class Config(Command):
                 print('{}: {}'.format(args.name, curvalue))
 
 
+class Cache(Command):
+    """Manage the cache of server metadata.
+
+    The fields, products and users of servers are cached on disk and
+    refreshed periodically.  'clear' removes all cached metadata, so
+    that it is retrieved again when next needed.
+    """
+    args = Command.args + [
+        lambda x: x.add_argument('action', choices=['clear'],
+            help='action to perform'),
+    ]
+
+    def __call__(self):
+        paths = set([None])
+        for section in conf.sections():
+            if section.startswith('server.') \
+                    and conf.has_option(section, 'cache_dir'):
+                paths.add(conf.get(section, 'cache_dir'))
+        for path in paths:
+            cache.MetadataCache(path).clear()
+
+
 class Help(Command):
     """Show help."""
     args = Command.args + [
@@ -239,13 +283,87 @@ class Help(Command):
 
 @with_server
 class BugzillaCommand(Command):
+    # the fields of bug data the command uses; None for all fields
+    include_fields = None
+
     def __init__(self, *args, **kwargs):
         super(BugzillaCommand, self).__init__(*args, **kwargs)
         self.bz = bugzilla.Bugzilla.from_config(conf, **self._args.__dict__)
+        if getattr(self._args, 'jobs', None):
+            self.bz.jobs = self._args.jobs
+        if getattr(self._args, 'trace', None):
+            try:
+                trace = open(self._args.trace, 'a')
+            except IOError as e:
+                raise UserWarning('Cannot open trace file: {}'.format(e))
+            atexit.register(trace.close)
+            self.bz.observers.append(stats.Trace(trace))
+        if getattr(self._args, 'stats', False):
+            _stats = stats.Stats()
+            self.bz.observers.append(_stats)
+            atexit.register(
+                lambda: sys.stderr.write(_stats.format() + '\n'))
+
+    def _update_bugs(self, bugs, fn):
+        """Call ``fn`` on each of the given Bug objects to update it.
+
+        Updates are batched, and up to ``--jobs`` bugs are processed at
+        once.  A failure to update one bug does not prevent the others
+        being updated; errors are reported in the order of the bugs
+        once all bugs were processed.
+        """
+        with self.bz.batch() as batch:
+            jobs = self.bz.map(fn, bugs)
+            batch.flush()
+        errors = []
+        for job in jobs:
+            error = job.error
+            if error is None and isinstance(job.result, bugzilla.BatchCall):
+                error = job.result.fault
+            errors.append((job.item.bugno, error))
+        self._report(errors)
+
+    def _update_all(self, bugnos, changes, fields=None):
+        """Make the given changes to all the given bugs.
+
+        Changes that a bug already has are skipped, and bugs are updated
+        using few ``Bug.update`` calls of many bugs (see
+        ``Bugzilla.plan_update`` for the args).  With ``--dry-run``, the
+        plan is printed instead.  Errors are reported as by
+        ``_update_bugs``.
+        """
+        plan = self.bz.plan_update(bugnos, changes, fields)
+        if getattr(self._args, 'dry_run', False):
+            print('\n'.join(plan.format()))
+            return
+        jobs = plan.execute()
+        self._report(
+            [(job.item, job.error) for job in jobs] + plan.errors)
+
+    def _report(self, errors):
+        """Report the errors of an update of bugs.
+
+        ``errors`` are ``(bugno, error)`` pairs for all the bugs, where
+        ``error`` is ``None`` if the bug was updated.
+        """
+        failed = 0
+        for bugno, error in errors:
+            if error is not None:
+                failed += 1
+                sys.stderr.write('Bug {}: {}\n'.format(bugno, error))
+        if failed:
+            raise UserWarning(
+                '{} of {} bugs not updated.'.format(failed, len(errors)))
+
+    def _bugs(self, bugnos):
+        """Load the ``include_fields`` of the given bugs."""
+        return self.bz.bugs(bugnos, include_fields=self.include_fields)
 
 
 @with_bugs
 @with_optional_message
+@with_jobs
+@with_dry_run
 class Assign(BugzillaCommand):
     """Assign bugs to the given user."""
     args = BugzillaCommand.args + [
@@ -257,41 +375,45 @@ class Assign(BugzillaCommand):
         args = self._args
         message = editor.input('Enter your comment.') if args.message is True \
             else args.message
-        return map(
-            lambda x: self.bz.bug(x).set_assigned_to(args.to, comment=message),
-            args.bugs
-        )
+        user = self.bz.match_one_user(args.to)['name']
+        if 'assign_status' in self.bz.config:
+            # the new status depends on the current status of each bug
+            self._update_all(
+                args.bugs,
+                lambda _bug: _bug._assign_params(
+                    user, message, _bug.data['status']),
+                fields=['assigned_to', 'status'])
+        else:
+            self._update_all(args.bugs, {
+                'assigned_to': user,
+                'comment': {'body': message} if message else None,
+            })
 
 
 @with_set('given bugs', 'blocked bugs', metavar='BUG', type=int)
 @with_add_remove('given bugs', 'blocked bugs', metavar='BUG', type=int)
 @with_bugs
 @with_optional_message
+@with_jobs
+@with_dry_run
 class Block(BugzillaCommand):
     """Show or update block list of given bugs."""
+    include_fields = ['blocks']
     def __call__(self):
         args = self._args
-        bugs = map(self.bz.bug, args.bugs)
         if args.add or args.remove or args.set:
             message = editor.input('Enter your comment.') \
                 if args.message is True else args.message
             # update blocked bugs
-            map(
-                lambda x: self.bz.bug(x).update_block(
-                    add=args.add,
-                    remove=args.remove,
-                    set=args.set,
-                    comment=message
-                ),
-                args.bugs
-            )
+            self._update_all(args.bugs, bug.Bug._list_params(
+                'blocks', args.add, args.remove, args.set, message))
         else:
             # show blocked bugs
-            for bug in bugs:
-                print('Bug {}:'.format(bug.bugno))
-                if bug.data['blocks']:
+            for _bug in self._bugs(args.bugs):
+                print('Bug {}:'.format(_bug.bugno))
+                if _bug.data['blocks']:
                     print('  Blocked bugs: {}'.format(
-                        ', '.join(map(str, bug.data['blocks']))))
+                        ', '.join(map(str, _bug.data['blocks']))))
                 else:
                     print('  No blocked bugs')
 
@@ -299,11 +421,13 @@ class Block(BugzillaCommand):
 @with_add_remove('given users', 'CC List', metavar='USER')
 @with_bugs
 @with_optional_message
+@with_jobs
+@with_dry_run
 class CC(BugzillaCommand):
     """Show or update CC List."""
+    include_fields = ['cc']
     def __call__(self):
         args = self._args
-        bugs = map(self.bz.bug, args.bugs)
         if args.add or args.remove:
             # get actual users
             getuser = lambda x: self.bz.match_one_user(x)['name']
@@ -315,21 +439,15 @@ class CC(BugzillaCommand):
                 if args.message is True else args.message
 
             # update CC list
-            map(
-                lambda x: self.bz.bug(x).update_cc(
-                    add=add,
-                    remove=remove,
-                    comment=message
-                ),
-                args.bugs
-            )
+            self._update_all(args.bugs, bug.Bug._list_params(
+                'cc', add, remove, None, message))
         else:
             # show CC List
-            for bug in bugs:
-                print('Bug {}:'.format(bug.bugno))
-                if bug.data['cc']:
+            for _bug in self._bugs(args.bugs):
+                print('Bug {}:'.format(_bug.bugno))
+                if _bug.data['cc']:
                     print('  CC List: {}'.format(
-                        ', '.join(map(str, bug.data['cc']))))
+                        ', '.join(map(str, _bug.data['cc']))))
                 else:
                     print('  0 users')
 
@@ -337,6 +455,7 @@ class CC(BugzillaCommand):
 @with_bugs
 @with_optional_message
 @with_limit(things='comments')
+@with_jobs
 class Comment(BugzillaCommand):
     """List comments or file a comment on the given bugs."""
     args = BugzillaCommand.args + [
@@ -367,11 +486,14 @@ class Comment(BugzillaCommand):
         message = editor.input('Enter your comment.') \
             if args.message is True else args.message
         if message:
-            map(lambda x: self.bz.bug(x).add_comment(message, args.is_private), args.bugs)
+            self._update_bugs(
+                map(self.bz.bug, args.bugs),
+                lambda bug: bug.add_comment(message, args.is_private)
+            )
         else:
             def cmtfmt(bug):
                 comments = sorted(
-                    enumerate(self.bz.bug(bug).comments),
+                    enumerate(bug.comments),
                     key=lambda x: int(x[1]['id'])
                 )
                 if args.reverse:
@@ -380,7 +502,7 @@ class Comment(BugzillaCommand):
                     comments = comments[:abs(args.limit)]
 
                 return '=====\nBUG {}\n\n-----\n{}'.format(
-                    bug,
+                    bug.bugno,
                     '-----\n'.join(
                         self.formatstring.format(
                             'comment: {}'.format(n) if n else 'description',
@@ -390,38 +512,34 @@ class Comment(BugzillaCommand):
                             and not (args.which and n not in args.which)
                     )
                 )
-            print('\n'.join(map(cmtfmt, args.bugs)))
+            bugs = self.bz.prefetch_comments(map(self.bz.bug, args.bugs))
+            print('\n'.join(map(cmtfmt, bugs)))
 
 
 @with_set('given bugs', 'depdendencies', metavar='BUG', type=int)
 @with_add_remove('given bugs', 'depdendencies', metavar='BUG', type=int)
 @with_bugs
 @with_optional_message
+@with_jobs
+@with_dry_run
 class Depend(BugzillaCommand):
     """Show or update dependencies of given bugs."""
+    include_fields = ['depends_on']
     def __call__(self):
         args = self._args
-        bugs = map(self.bz.bug, args.bugs)
         if args.add or args.remove or args.set:
             message = editor.input('Enter your comment.') \
                 if args.message is True else args.message
             # update dependencies
-            map(
-                lambda x: x.update_depend(
-                    add=args.add,
-                    remove=args.remove,
-                    set=args.set,
-                    comment=message
-                ),
-                bugs
-            )
+            self._update_all(args.bugs, bug.Bug._list_params(
+                'depends_on', args.add, args.remove, args.set, message))
         else:
             # show dependencies
-            for bug in bugs:
-                print('Bug {}:'.format(bug.bugno))
-                if bug.data['depends_on']:
+            for _bug in self._bugs(args.bugs):
+                print('Bug {}:'.format(_bug.bugno))
+                if _bug.data['depends_on']:
                     print('  Dependencies: {}'.format(
-                        ', '.join(map(str, bug.data['depends_on']))))
+                        ', '.join(map(str, _bug.data['depends_on']))))
                 else:
                     print('  No dependencies')
 
@@ -433,23 +551,26 @@ class Desc(BugzillaCommand):
 
     def __call__(self):
         def _descfmt(bug):
-            desc = self.bz.bug(bug).comments[0]
+            desc = bug.comments[0]
             return '=====\nBUG {}\n{}'.format(
-                bug,
+                bug.bugno,
                 self.formatstring.format(**desc)
             )
-        print('\n'.join(_descfmt(bug) for bug in self._args.bugs))
+        bugs = self.bz.prefetch_comments(map(self.bz.bug, self._args.bugs))
+        print('\n'.join(_descfmt(bug) for bug in bugs))
 
 
 @with_bugs
 class Dump(BugzillaCommand):
     """Print internal representation of bug data."""
     def __call__(self):
-        bugs = (self.bz.bug(x) for x in self._args.bugs)
+        bugs = self.bz.prefetch_comments(self._bugs(self._args.bugs))
         print('\n'.join(str((x.data, x.comments)) for x in bugs))
 
 
 @with_bugs
+@with_jobs
+@with_dry_run
 class Edit(BugzillaCommand):
     """Edit the given bugs."""
     args = BugzillaCommand.args + [
@@ -461,29 +582,31 @@ class Edit(BugzillaCommand):
     _fields = frozenset(['priority', 'version'])
 
     def __call__(self):
-        for bug in (self.bz.bug(x) for x in self._args.bugs):
-            kwargs = {
-                k: getattr(self._args, k)
-                for k in self._fields & self._args.__dict__.viewkeys()
-            }
-            bug.update(**kwargs)
+        kwargs = {
+            k: getattr(self._args, k)
+            for k in self._fields & self._args.__dict__.viewkeys()
+        }
+        self._update_all(self._args.bugs, kwargs)
 
 
 class Fields(BugzillaCommand):
     """List valid values for bug fields."""
     def __call__(self):
-        args = self._args
-        fields = filter(lambda x: 'values' in x, self.bz.get_fields())
+        _registry = self.bz.get_field_registry()
+        fields = filter(lambda x: 'values' in x, _registry.fields)
         for field in fields:
+            # values are in sortkey order; sorting by visibility keeps it
             keyfn = lambda x: x.get('visibility_values')
             groups = itertools.groupby(
-                sorted(field['values'], None, keyfn),
+                sorted(
+                    _registry.values(field['name'], omit_empty=False),
+                    None, keyfn
+                ),
                 keyfn
             )
             print("{} :".format(field['name']))
             for key, group in groups:
-                keyfn = lambda x: int(x.get('sortkey', -1))
-                values = sorted(group, None, keyfn)
+                values = list(group)
                 if key:
                     print('  {}: {}'.format(
                         ','.join(key),
@@ -508,7 +631,8 @@ class History(BugzillaCommand):
     """Show the history of the given bugs."""
     def __call__(self):
         fields = ('WHO', 'WHEN', 'WHAT', 'REMOVED', 'ADDED')
-        for bug in map(self.bz.bug, self._args.bugs):
+        bugs = self.bz.prefetch_history(map(self.bz.bug, self._args.bugs))
+        for bug in bugs:
             history = []
             for h in bug.history:
                 _history = [
@@ -527,12 +651,13 @@ class History(BugzillaCommand):
 @with_bugs
 class Info(BugzillaCommand):
     """Show detailed information about the given bugs."""
+    include_fields = config.show_fields
     def __call__(self):
         args = self._args
         fields = config.show_fields
-        for bug in map(self.bz.bug, args.bugs):
+        for bug in self._bugs(args.bugs):
             print('Bug {}:'.format(bug.bugno))
-            fields = config.show_fields & bug.data.viewkeys()
+            fields = set(config.show_fields) & set(bug.data)
             width = max(map(len, fields)) - min(map(len, fields)) + 2
             for field in fields:
                 print('  {:{}} {}'.format(field + ':', width, bug.data[field]))
@@ -542,11 +667,12 @@ class Info(BugzillaCommand):
 @with_bugs
 class List(BugzillaCommand):
     """Show a one-line summary of the given bugs."""
+    include_fields = ['summary']
     def __call__(self):
         args = self._args
         lens = [len(str(x)) for x in args.bugs]
         width = max(lens) - min(lens) + 2
-        for bug in map(self.bz.bug, args.bugs):
+        for bug in self._bugs(args.bugs):
             print('Bug {:{}} {}'.format(
                 str(bug.bugno) + ':', width, bug.data['summary']
             ))
@@ -559,7 +685,8 @@ class New(BugzillaCommand):
         b = bug.Bug(self.bz)
 
         # get mandatory fields
-        fields = self.bz.get_fields()
+        _registry = self.bz.get_field_registry()
+        fields = _registry.fields
         defaulted_fields = [
             'description', 'op_sys', 'rep_platform', 'priority', 'severity']
         mandatory_fields = filter(
@@ -580,10 +707,7 @@ class New(BugzillaCommand):
             if field['name'] in b.data:
                 continue  # field is already defined
             if 'values' in field:
-                values = self.bz.get_field_values(
-                    field['name'],
-                    visible_for=b.data
-                )
+                values = _registry.values(field['name'], visible_for=b.data)
                 # TODO handle select-multiple fields
                 b.data[field['name']] = self._ui.choose(
                     'Choose the {}'.format(field['display_name']),
@@ -628,10 +752,7 @@ class New(BugzillaCommand):
             if field['name'] in b.data:
                 continue  # field is already defined
             if 'values' in field:
-                values = self.bz.get_field_values(
-                    field['name'],
-                    visible_for=b.data
-                )
+                values = _registry.values(field['name'], visible_for=b.data)
                 # TODO handle select-multiple fields
                 b.data[field['name']] = self._ui.choose(
                     'Choose the {}'.format(field['display_name']),
@@ -654,6 +775,8 @@ class New(BugzillaCommand):
 
 
 @with_bugs
+@with_jobs
+@with_dry_run
 class Priority(BugzillaCommand):
     """Set the priority on the given bugs."""
     args = BugzillaCommand.args + [
@@ -662,8 +785,8 @@ class Priority(BugzillaCommand):
     ]
 
     def __call__(self):
-        for bug in (self.bz.bug(x) for x in self._args.bugs):
-            bug.update(priority=self._args.priority)
+        self._update_all(
+            self._args.bugs, {'priority': self._args.priority})
 
 
 class Products(BugzillaCommand):
@@ -679,6 +802,8 @@ class Products(BugzillaCommand):
 
 @with_bugs
 @with_optional_message
+@with_jobs
+@with_dry_run
 class Status(BugzillaCommand):
     """Set the status of the given bugs.
 
@@ -702,6 +827,7 @@ class Status(BugzillaCommand):
     and ``--resolution`` will be ignored.  Bugzilla will automatically set the
     status and resolution fields to appropriate values for duplicate bugs.
     """
+    include_fields = ['is_open']
 
     args = BugzillaCommand.args + [
         lambda x: x.add_argument('--status',
@@ -719,10 +845,9 @@ class Status(BugzillaCommand):
 
         if args.dupe_of:
             # This is all we need; --status and --resolution are ignored
-            return map(
-                lambda x: self.bz.bug(x).set_dupe_of(args.dupe_of, message),
-                args.bugs
-            )
+            self._update_all(
+                args.bugs, bug.Bug._dupe_params(args.dupe_of, message))
+            return
 
         # get the values of the 'bug_status' field
         values = self.bz.get_field_values('bug_status')
@@ -738,22 +863,19 @@ class Status(BugzillaCommand):
 
         # check if the new status is "open"
         try:
-            value = filter(lambda x: x['name'] == status, values)[0]
+            value = [x for x in values if x['name'] == status][0]
             is_open = value['is_open']
         except IndexError:
             # no value matching the chosen status
             raise UserWarning("Invalid status:", status)
 
-        # instantiate bugs
-        bugs = map(self.bz.bug, args.bugs)
-
         resolution = None
         if not is_open:
             # The new status accepts a resolution.
             if args.resolution:
                 # A resolution was supplied.
                 resolution = args.resolution.upper()
-            elif any(map(lambda x: x.is_open(), bugs)):
+            elif any(x.is_open() for x in self._bugs(args.bugs)):
                 # A resolution was not supplied, but one is required since
                 # at least one of the bugs is currently open.  Choose one.
                 values = self.bz.get_field_values('resolution')
@@ -762,14 +884,8 @@ class Status(BugzillaCommand):
                     map(lambda x: x['name'], values)
                 )
 
-        return map(
-            lambda x: self.bz.bug(x).set_status(
-                status=status,
-                resolution=resolution,
-                comment=message
-            ),
-            args.bugs
-        )
+        self._update_all(
+            args.bugs, bug.Bug._status_params(status, resolution, message))
 
 
 def _make_set_argument(arg):
@@ -785,17 +901,21 @@ def _make_set_argument(arg):
     ]
 
 
+@with_limit(things='bugs')
 class Search(BugzillaCommand):
     """Search for bugs matching given criteria.
 
     If both '--foo' and '--not-foo' are given for any argument 'foo',
-    the former takes precendence.
+    the former takes precendence.  Bugs are retrieved and printed in
+    pages of 'page_size' bugs (server config; default: 500).
     """
+    include_fields = ['summary']
+    page_size = 500
     args = BugzillaCommand.args + [
         lambda x: x.add_argument('--summary', nargs='+',
             help='Match summary against any of the given substrings.'),
     ]
-    simple_arguments = ['summary']
+    simple_arguments = ['summary', 'limit']
     set_arguments = 'product', 'component', 'status', 'resolution', 'version'
     for x in set_arguments:
         args.extend(_make_set_argument(x))
@@ -811,23 +931,29 @@ class Search(BugzillaCommand):
             if getattr(self._args, arg)
         }
 
-        bugs = list(bug.Bug.search(self.bz, **kwargs))
-        lens = [len(str(b.bugno)) for b in bugs]
-
+        bugs = bug.Bug.search(
+            self.bz, include_fields=self.include_fields,
+            page_size=self.bz.config.get('page_size', self.page_size),
+            prefetch=True, **kwargs)
+        n = 0
+        width = 0
         for _bug in bugs:
+            n += 1
+            width = max(width, len(str(_bug.bugno)) + 2)
             print('Bug {:{}} {}'.format(
-                str(_bug.bugno) + ':', max(lens) - min(lens) + 2,
-                _bug.data['summary']
+                str(_bug.bugno) + ':', width, _bug.data['summary']
             ))
-        n = len(bugs)
+            sys.stdout.flush()
         print('=> {} bug{} matched criteria'.format(n, 's' if n else ''))
 
 
 @with_bugs
 @with_optional_message
 @with_time
+@with_jobs
 class Time(BugzillaCommand):
     """Show or adjust times and estimates for the given bugs."""
+    include_fields = ['deadline', 'estimated_time', 'remaining_time']
     def __call__(self):
         args = self._args
 
@@ -854,12 +980,11 @@ class Time(BugzillaCommand):
             # As of Bugzilla 4.0.1, "actual_time" (total hours worked) is
             # not returned in bug.get.  It can, however, be calculated from
             # the bug history.
-            bugs = (self.bz.bug(bug) for bug in args.bugs)
+            bugs = self.bz.prefetch_history(self._bugs(args.bugs))
             for bug in bugs:
                 # if user is not in the "time-tracking" group, the fields will
                 # be absent from bug data.  first check that they're there.
-                time_fields = ('deadline', 'estimated_time', 'remaining_time')
-                if not all(x in bug.data for x in time_fields):
+                if not all(x in bug.data for x in self.include_fields):
                     print('User is not in the time-tracking group.')
                     return
                 print('Bug {}:'.format(bug.bugno))
@@ -18,6 +18,7 @@ try:
     import ConfigParser
 except ImportError:
     import configparser as ConfigParser
+import os
 import os.path
 import re
 
@@ -33,6 +34,20 @@ class ConfigError(Exception):
     pass
 
 
+def cache_dir():
+    """Return the directory for cached data, creating it if necessary.
+
+    The directory is ``$XDG_CACHE_HOME/bugzillatools``, or
+    ``~/.cache/bugzillatools`` if ``XDG_CACHE_HOME`` is not set.  It is
+    readable only by the user since it may hold login tokens.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    path = os.path.join(base, 'bugzillatools')
+    if not os.path.isdir(path):
+        os.makedirs(path, 0o700)
+    return path
+
+
 def check_section(section):
     if section in ['core', 'alias'] \
             or re.match(r'server\.\w+', section):
@@ -0,0 +1,774 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A Bugzilla XML-RPC server with an in-memory store, for tests.
+
+``FakeServer`` serves a ``Store`` on a local port.  Artificial latency
+and bandwidth limits make measurements of client round trips and
+throughput reproducible without network access::
+
+    with fakeserver.FakeServer(latency=0.05) as server:
+        server.store.populate(100)
+        bz = bugzilla.Bugzilla(server.url, 'user@example.com', 'pw')
+        bz.bugs(range(1, 101))
+"""
+
+import copy
+import datetime
+import itertools
+import threading
+import time
+
+try:
+    import SimpleXMLRPCServer as xmlrpcserver
+    import SocketServer as socketserver
+except ImportError:
+    import xmlrpc.server as xmlrpcserver
+    import socketserver
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+
+# fault codes, as used by Bugzilla
+FAULT_INVALID_BUG = 101
+FAULT_INVALID_PRODUCT = 106
+FAULT_PARAM_REQUIRED = 50
+FAULT_INVALID_FIELD = 51
+
+OPEN_STATUSES = ['UNCONFIRMED', 'CONFIRMED', 'IN_PROGRESS']
+CLOSED_STATUSES = ['RESOLVED', 'VERIFIED']
+
+# legal values of select fields
+SELECT_FIELDS = {
+    'bug_status': OPEN_STATUSES + CLOSED_STATUSES,
+    'resolution': ['', 'FIXED', 'INVALID', 'WONTFIX', 'DUPLICATE',
+                   'WORKSFORME'],
+    'priority': ['P1', 'P2', 'P3', 'P4', 'P5'],
+    'bug_severity': ['blocker', 'critical', 'major', 'normal', 'minor',
+                     'trivial', 'enhancement'],
+    'op_sys': ['All', 'Linux', 'Mac OS', 'Windows', 'Other'],
+    'rep_platform': ['All', 'PC', 'Macintosh', 'Other'],
+}
+
+# names of select fields in Bug.get and Bug.update
+_FIELD_NAMES = {
+    'bug_status': 'status',
+    'bug_severity': 'severity',
+    'rep_platform': 'platform',
+}
+
+# fields that hold lists of bug numbers or users
+_LIST_FIELDS = frozenset(['blocks', 'depends_on', 'cc'])
+_RECIPROCAL = {'blocks': 'depends_on', 'depends_on': 'blocks'}
+
+# fields that may be set by Bug.create
+_CREATE_FIELDS = frozenset([
+    'product', 'component', 'summary', 'version', 'description',
+    'assigned_to', 'cc', 'op_sys', 'platform', 'priority', 'severity',
+    'status', 'alias', 'blocks', 'depends_on', 'keywords', 'deadline',
+    'estimated_time', 'qa_contact', 'target_milestone', 'url',
+    'whiteboard', 'groups',
+])
+
+
+# names of bug fields in boolean charts (fN/oN/vN search parameters)
+_CHART_FIELDS = {
+    'bug_id': 'id',
+    'bug_status': 'status',
+    'bug_severity': 'severity',
+    'bug_file_loc': 'url',
+    'creation_ts': 'creation_time',
+    'delta_ts': 'last_change_time',
+    'rep_platform': 'platform',
+    'reporter': 'creator',
+    'short_desc': 'summary',
+    'status_whiteboard': 'whiteboard',
+}
+
+_CHART_OPERATORS = {
+    'equals': lambda a, b: a == b,
+    'notequals': lambda a, b: a != b,
+    'anyexact': lambda a, b: a in b.split(','),
+    'substring': lambda a, b: b.lower() in a.lower(),
+    'casesubstring': lambda a, b: b in a,
+    'notsubstring': lambda a, b: b.lower() not in a.lower(),
+    'lessthan': lambda a, b: a < b,
+    'lessthaneq': lambda a, b: a <= b,
+    'greaterthan': lambda a, b: a > b,
+    'greaterthaneq': lambda a, b: a >= b,
+}
+
+
+def _chart_value(value):
+    """Return a bug field value as compared in a boolean chart."""
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (int, float)):
+        return value
+    return u'{}'.format(value)
+
+
+def _now():
+    return datetime.datetime.utcnow().replace(microsecond=0)
+
+
+def _datetime(value):
+    """Return a dateTime parameter as a datetime."""
+    if isinstance(value, xmlrpclib.DateTime):
+        return datetime.datetime.strptime(value.value, '%Y%m%dT%H:%M:%S')
+    return value
+
+
+class Store(object):
+    """The data of a fake Bugzilla, and its RPC methods.
+
+    Each RPC method is a method whose name is the RPC method name with
+    ``_`` for ``.``, e.g. ``Bug_get``.  The store is thread-safe.
+    """
+
+    methods = [
+        'Bug.get', 'Bug.search', 'Bug.create', 'Bug.update',
+        'Bug.comments', 'Bug.history', 'Bug.fields', 'Bug.add_comment',
+        'Product.get_accessible_products', 'Product.get',
+        'User.get', 'User.login', 'User.logout', 'Bugzilla.version',
+    ]
+
+    def __init__(self, products=None, users=None):
+        """Create a store.
+
+        products: a dict mapping product names to lists of components
+                  (default: a product ``TestProduct`` with components
+                  ``Component A`` and ``Component B``)
+        users: a list of user names (logins) (default: ``user@example.com``)
+        """
+        products = products or {
+            'TestProduct': ['Component A', 'Component B'],
+        }
+        self.products = [
+            {
+                'id': i,
+                'name': name,
+                'description': 'The {} product.'.format(name),
+                'components': [
+                    {'id': j, 'name': x, 'description': x}
+                    for j, x in enumerate(components, 1)
+                ],
+                'versions': [{'name': 'unspecified'}, {'name': '1.0'}],
+                'milestones': [{'name': '---'}],
+            }
+            for i, (name, components) in enumerate(sorted(products.items()), 1)
+        ]
+        self.users = [
+            {'id': i, 'name': name, 'real_name': name.split('@')[0]}
+            for i, name in enumerate(users or ['user@example.com'], 1)
+        ]
+        self.bugs = {}
+        self.comments = {}
+        self.history = {}
+        self.tokens = {}
+        self._comment_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        # versions before 5.0 ignore boolean charts in Bug.search
+        self.version = '4.4.13'
+
+    # helpers
+
+    def _login(self, params):
+        """Remove authentication params; return the user's login."""
+        login = params.pop('Bugzilla_login', None)
+        params.pop('Bugzilla_password', None)
+        token = params.pop('Bugzilla_token', None)
+        if token is not None:
+            if token not in self.tokens:
+                raise xmlrpclib.Fault(32000, 'The token is invalid.')
+            login = self.tokens[token]
+        return login or self.users[0]['name']
+
+    def _bug(self, bugno):
+        try:
+            return self.bugs[int(bugno)]
+        except (KeyError, ValueError):
+            raise xmlrpclib.Fault(
+                FAULT_INVALID_BUG, 'Bug #{} does not exist.'.format(bugno))
+
+    def _product(self, name):
+        for product in self.products:
+            if product['name'] == name:
+                return product
+        raise xmlrpclib.Fault(
+            FAULT_INVALID_PRODUCT,
+            "There is no product named '{}'.".format(name))
+
+    @staticmethod
+    def _project(data, params):
+        """Apply the ``include_fields`` and ``exclude_fields`` params."""
+        include = params.get('include_fields')
+        exclude = params.get('exclude_fields') or []
+        return {
+            k: copy.deepcopy(v) for k, v in data.items()
+            if (include is None or k in include) and k not in exclude
+        }
+
+    def _chart(self, params):
+        """Remove boolean chart params; return the chart's terms.
+
+        Terms are ``(field, function, value)`` triples, all of which
+        must hold.  The chart is ignored before version 5.0.
+        """
+        terms = []
+        for i in itertools.count(1):
+            if 'f{}'.format(i) not in params:
+                break
+            field = params.pop('f{}'.format(i))
+            operator = params.pop('o{}'.format(i), 'noop')
+            value = params.pop('v{}'.format(i), '')
+            if operator not in _CHART_OPERATORS:
+                raise xmlrpclib.Fault(
+                    FAULT_INVALID_FIELD,
+                    "Unsupported operator '{}'.".format(operator))
+            terms.append((
+                _CHART_FIELDS.get(field, field),
+                _CHART_OPERATORS[operator],
+                value
+            ))
+        if int(self.version.split('.')[0]) < 5:
+            return []
+        return terms
+
+    def _add_comment(self, bugno, who, text, is_private=False, when=None):
+        comments = self.comments.setdefault(bugno, [])
+        comment_id = next(self._comment_ids)
+        when = when or _now()
+        comments.append({
+            'id': comment_id,
+            'bug_id': bugno,
+            'count': len(comments),
+            'author': who,
+            'creator': who,
+            'creation_time': when,
+            'time': when,
+            'is_private': bool(is_private),
+            'text': text,
+        })
+        return comment_id
+
+    # test fixtures
+
+    def add_bug(self, **fields):
+        """Add a bug to the store without an RPC; return its number.
+
+        Unspecified fields take default values.
+        """
+        with self._lock:
+            bugno = max(self.bugs or [0]) + 1
+            when = fields.pop('creation_time', None) or _now()
+            product = self.products[0]
+            data = {
+                'id': bugno,
+                'alias': [],
+                'assigned_to': self.users[0]['name'],
+                'blocks': [],
+                'cc': [],
+                'classification': 'Unclassified',
+                'component': product['components'][0]['name'],
+                'creation_time': when,
+                'creator': self.users[0]['name'],
+                'deadline': None,
+                'depends_on': [],
+                'dupe_of': None,
+                'estimated_time': 0.0,
+                'groups': [],
+                'is_open': True,
+                'keywords': [],
+                'last_change_time': when,
+                'op_sys': 'All',
+                'platform': 'All',
+                'priority': 'P3',
+                'product': product['name'],
+                'qa_contact': '',
+                'remaining_time': 0.0,
+                'resolution': '',
+                'see_also': [],
+                'severity': 'normal',
+                'status': 'CONFIRMED',
+                'summary': 'Bug {}'.format(bugno),
+                'target_milestone': '---',
+                'url': '',
+                'version': 'unspecified',
+                'whiteboard': '',
+            }
+            description = fields.pop('description', '')
+            data.update(fields)
+            data['is_open'] = data['status'] in OPEN_STATUSES
+            self.bugs[bugno] = data
+            self.history[bugno] = []
+            self.comments[bugno] = []
+            self._add_comment(bugno, data['creator'], description, when=when)
+            return bugno
+
+    def populate(self, n, comments=1, **fields):
+        """Add ``n`` bugs, each with ``comments`` comments.
+
+        Bugs are spread over the components of the products, and the
+        priorities and statuses.  Return the bug numbers.
+        """
+        components = [
+            (p['name'], c['name'])
+            for p in self.products for c in p['components']
+        ]
+        statuses = OPEN_STATUSES + CLOSED_STATUSES
+        bugnos = []
+        with self._lock:
+            for i in range(n):
+                product, component = components[i % len(components)]
+                status = statuses[i % len(statuses)]
+                bug_fields = {
+                    'product': product,
+                    'component': component,
+                    'status': status,
+                    'resolution': 'FIXED' if status in CLOSED_STATUSES else '',
+                    'priority': SELECT_FIELDS['priority'][i % 5],
+                    'summary': 'Generated bug {}'.format(i + 1),
+                    'description': 'Description of generated bug {}.\n'
+                                   .format(i + 1) * 5,
+                }
+                bug_fields.update(fields)
+                bugno = self.add_bug(**bug_fields)
+                for j in range(1, comments):
+                    self._add_comment(
+                        bugno, self.users[j % len(self.users)]['name'],
+                        'Comment {} on bug {}.\n'.format(j, bugno) * 3)
+                bugnos.append(bugno)
+        return bugnos
+
+    # RPC methods
+
+    def Bug_get(self, params):
+        self._login(params)
+        with self._lock:
+            return {
+                'bugs': [
+                    self._project(self._bug(x), params)
+                    for x in params.get('ids', [])
+                ],
+                'faults': [],
+            }
+
+    def Bug_search(self, params):
+        self._login(params)
+        limit = params.pop('limit', None)
+        offset = params.pop('offset', 0)
+        terms = self._chart(params)
+        criteria = {
+            k: v if isinstance(v, list) else [v]
+            for k, v in params.items()
+            if k not in ('include_fields', 'exclude_fields')
+        }
+
+        def match(data):
+            for field, values in criteria.items():
+                if field == 'summary':
+                    if not any(x in data['summary'] for x in values):
+                        return False
+                elif data.get(field) not in values:
+                    return False
+            for field, fn, value in terms:
+                actual = _chart_value(data.get(field, ''))
+                if isinstance(actual, (int, float)):
+                    value = type(actual)(value)
+                if not fn(actual, value):
+                    return False
+            return True
+
+        with self._lock:
+            bugs = [
+                self._project(data, params)
+                for bugno, data in sorted(self.bugs.items()) if match(data)
+            ]
+        bugs = bugs[offset:]
+        return {'bugs': bugs[:limit] if limit else bugs}
+
+    def Bug_create(self, params):
+        who = self._login(params)
+        for name in ('product', 'component', 'summary', 'version'):
+            if not params.get(name):
+                raise xmlrpclib.Fault(
+                    FAULT_PARAM_REQUIRED,
+                    'You must specify a value for {}.'.format(name))
+        with self._lock:
+            product = self._product(params['product'])
+            if params['component'] not in [
+                x['name'] for x in product['components']
+            ]:
+                raise xmlrpclib.Fault(
+                    FAULT_INVALID_FIELD,
+                    "There is no component named '{}'."
+                    .format(params['component']))
+            if 'comment' in params:
+                params['description'] = params.pop('comment')
+            unknowns = set(params) - _CREATE_FIELDS
+            if unknowns:
+                raise xmlrpclib.Fault(
+                    FAULT_INVALID_FIELD,
+                    'Invalid fields: {}.'.format(', '.join(sorted(unknowns))))
+            params.setdefault('assigned_to', who)
+            return {'id': self.add_bug(creator=who, **params)}
+
+    def Bug_update(self, params):
+        who = self._login(params)
+        ids = params.pop('ids', [])
+        comment = params.pop('comment', None)
+        work_time = params.pop('work_time', None)
+        if 'dupe_of' in params:
+            params.setdefault('status', 'RESOLVED')
+            params['resolution'] = 'DUPLICATE'
+        with self._lock:
+            bugs = [self._bug(x) for x in ids]
+            for name in params:
+                if any(name not in data for data in bugs):
+                    raise xmlrpclib.Fault(
+                        FAULT_INVALID_FIELD,
+                        "'{}' is not a valid field.".format(name))
+            result = []
+            when = _now()
+            for data in bugs:
+                changes = self._update(data, params)
+                if work_time:
+                    changes['work_time'] = {
+                        'removed': '0.00', 'added': '{:.2f}'.format(work_time)
+                    }
+                if comment:
+                    self._add_comment(
+                        data['id'], who, comment['body'],
+                        comment.get('is_private', False), when)
+                if changes:
+                    data['last_change_time'] = when
+                    self.history[data['id']].append({
+                        'when': when,
+                        'who': who,
+                        'changes': [
+                            dict(field_name=k, **v)
+                            for k, v in sorted(changes.items())
+                        ],
+                    })
+                result.append({
+                    'id': data['id'],
+                    'alias': data['alias'],
+                    'last_change_time': data['last_change_time'],
+                    'changes': changes,
+                })
+            return {'bugs': result}
+
+    def _update(self, data, params):
+        """Apply ``Bug.update`` params to a bug; return the changes."""
+        changes = {}
+        for name, value in params.items():
+            old = data[name]
+            if name in _LIST_FIELDS:
+                if not isinstance(value, dict):
+                    value = {'set': value}
+                if 'set' in value:
+                    new = list(value['set'])
+                else:
+                    new = [x for x in old if x not in value.get('remove', [])]
+                    new += [x for x in value.get('add', []) if x not in new]
+                added = [x for x in new if x not in old]
+                removed = [x for x in old if x not in new]
+                if name in _RECIPROCAL:
+                    other = _RECIPROCAL[name]
+                    for x in added:
+                        self._bug(x)[other].append(data['id'])
+                    for x in removed:
+                        self._bug(x)[other].remove(data['id'])
+                if added or removed:
+                    changes[name] = {
+                        'added': ', '.join(map(str, added)),
+                        'removed': ', '.join(map(str, removed)),
+                    }
+                data[name] = new
+            elif value != old:
+                changes[name] = {
+                    'added': '' if value is None else str(value),
+                    'removed': '' if old is None else str(old),
+                }
+                data[name] = value
+        if 'status' in changes:
+            data['is_open'] = data['status'] in OPEN_STATUSES
+            if data['is_open'] and data['resolution']:
+                changes['resolution'] = {
+                    'added': '', 'removed': data['resolution']}
+                data['resolution'] = ''
+        return changes
+
+    def Bug_comments(self, params):
+        self._login(params)
+        since = _datetime(params.get('new_since'))
+        with self._lock:
+            bugs = {}
+            for bugno in params.get('ids', []):
+                self._bug(bugno)
+                bugs[str(bugno)] = {
+                    'comments': copy.deepcopy([
+                        x for x in self.comments[int(bugno)]
+                        if since is None or x['time'] > since
+                    ]),
+                }
+            return {'bugs': bugs, 'comments': {}}
+
+    def Bug_history(self, params):
+        self._login(params)
+        # new_since is ignored before Bugzilla 5.0
+        since = None
+        if int(self.version.split('.')[0]) >= 5:
+            since = _datetime(params.get('new_since'))
+        with self._lock:
+            return {'bugs': [
+                {
+                    'id': self._bug(bugno)['id'],
+                    'alias': self._bug(bugno)['alias'],
+                    'history': copy.deepcopy([
+                        x for x in self.history[int(bugno)]
+                        if since is None or x['when'] > since
+                    ]),
+                }
+                for bugno in params.get('ids', [])
+            ]}
+
+    def Bug_fields(self, params):
+        self._login(params)
+        fields = [
+            {
+                'id': i,
+                'name': name,
+                'display_name': _FIELD_NAMES.get(name, name)
+                .replace('_', ' ').capitalize(),
+                'type': 2,
+                'is_mandatory': False,
+                'is_custom': False,
+                'values': [
+                    {'name': x, 'sortkey': j, 'visibility_values': []}
+                    for j, x in enumerate(values)
+                ],
+            }
+            for i, (name, values) in enumerate(sorted(SELECT_FIELDS.items()))
+        ]
+        for field in fields:
+            if field['name'] == 'bug_status':
+                for value in field['values']:
+                    value['is_open'] = value['name'] in OPEN_STATUSES
+        with self._lock:
+            for name, values in (
+                ('product', [x['name'] for x in self.products]),
+                ('component', sorted(set(
+                    c['name'] for p in self.products
+                    for c in p['components']))),
+                ('version', ['unspecified', '1.0']),
+            ):
+                fields.append({
+                    'id': len(fields),
+                    'name': name,
+                    'display_name': name.capitalize(),
+                    'type': 2,
+                    'is_mandatory': True,
+                    'is_custom': False,
+                    'values': [
+                        {'name': x, 'sortkey': j, 'visibility_values': []}
+                        for j, x in enumerate(values)
+                    ],
+                })
+        fields.append({
+            'id': len(fields),
+            'name': 'short_desc',
+            'display_name': 'Summary',
+            'type': 1,
+            'is_mandatory': True,
+            'is_custom': False,
+        })
+        names = params.get('names')
+        if names:
+            fields = [x for x in fields if x['name'] in names]
+        return {'fields': fields}
+
+    def Bug_add_comment(self, params):
+        who = self._login(params)
+        if not params.get('comment'):
+            raise xmlrpclib.Fault(
+                FAULT_PARAM_REQUIRED, 'You must specify a comment.')
+        with self._lock:
+            bugno = self._bug(params.get('id'))['id']
+            return {'id': self._add_comment(
+                bugno, who, params['comment'],
+                params.get('is_private', False))}
+
+    def Product_get_accessible_products(self, params):
+        self._login(params)
+        return {'ids': [x['id'] for x in self.products]}
+
+    def Product_get(self, params):
+        self._login(params)
+        ids = params.get('ids', [])
+        names = params.get('names', [])
+        return {'products': [
+            copy.deepcopy(x) for x in self.products
+            if x['id'] in ids or x['name'] in names
+        ]}
+
+    def User_get(self, params):
+        self._login(params)
+        matches = params.get('match', [])
+        names = params.get('names', [])
+        return {'users': [
+            dict(x, email=x['name']) for x in self.users
+            if x['name'] in names
+            or any(m in x['name'] or m in x['real_name'] for m in matches)
+        ]}
+
+    def User_login(self, params):
+        login = params.get('login')
+        user = [x for x in self.users if x['name'] == login]
+        if not user:
+            raise xmlrpclib.Fault(
+                300, 'The username or password you entered is not valid.')
+        with self._lock:
+            token = '{}-{}'.format(user[0]['id'], len(self.tokens) + 1)
+            self.tokens[token] = login
+        return {'id': user[0]['id'], 'token': token}
+
+    def User_logout(self, params):
+        token = params.pop('Bugzilla_token', None)
+        with self._lock:
+            self.tokens.pop(token, None)
+        return {}
+
+    def Bugzilla_version(self, params):
+        return {'version': self.version}
+
+
+class _Throttled(object):
+    """A file whose writes are slowed to the server's ``bandwidth``."""
+
+    def __init__(self, fileobj, server):
+        self._fileobj = fileobj
+        self._server = server
+
+    def write(self, data):
+        if self._server.bandwidth:
+            time.sleep(float(len(data)) / self._server.bandwidth)
+        return self._fileobj.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
+
+
+class _RequestHandler(xmlrpcserver.SimpleXMLRPCRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    rpc_paths = ('/xmlrpc.cgi',)
+
+    def setup(self):
+        xmlrpcserver.SimpleXMLRPCRequestHandler.setup(self)
+        self.wfile = _Throttled(self.wfile, self.server)
+
+    def do_POST(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.requests += 1
+        xmlrpcserver.SimpleXMLRPCRequestHandler.do_POST(self)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, xmlrpcserver.SimpleXMLRPCServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeServer(object):
+    """Serves a ``Store`` over XML-RPC at ``url`` on a local port.
+
+    store: the ``Store`` to serve (default: a new, empty store)
+    latency: seconds each HTTP request is delayed by before it is handled
+    bandwidth: bytes a second at which responses are sent (default:
+               unlimited); responses are gzipped if the client asks
+
+    ``requests`` counts the HTTP requests handled.  The server runs on
+    a thread from ``start()`` until ``stop()``, or in a ``with`` block,
+    or on the calling thread with ``serve_forever()``.
+    """
+
+    def __init__(self, store=None, latency=0.0, bandwidth=None):
+        self.store = store or Store()
+        self._server = _Server(
+            ('127.0.0.1', 0),
+            requestHandler=_RequestHandler,
+            logRequests=False,
+            allow_none=True
+        )
+        self._server.latency = latency
+        self._server.bandwidth = bandwidth
+        self._server.requests = 0
+        for name in self.store.methods:
+            self._server.register_function(
+                getattr(self.store, name.replace('.', '_')), name)
+        self._server.register_multicall_functions()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}/'.format(*self._server.server_address)
+
+    @property
+    def requests(self):
+        return self._server.requests
+
+    @property
+    def latency(self):
+        return self._server.latency
+
+    @latency.setter
+    def latency(self, value):
+        self._server.latency = value
+
+    @property
+    def bandwidth(self):
+        return self._server.bandwidth
+
+    @bandwidth.setter
+    def bandwidth(self, value):
+        self._server.bandwidth = value
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the current thread until the process ends."""
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,82 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""An identity map of ``Bug`` objects.
+
+Each bug number maps to at most one ``Bug``, so that its data, comments
+and history are fetched once and shared by all users of the bug.  The
+``size`` most recently used bugs are kept; others are kept only while
+they are referenced elsewhere.
+"""
+
+import collections
+import threading
+import weakref
+
+
+DEFAULT_SIZE = 1000
+
+
+class IdentityMap(object):
+    """Bug objects keyed by bug number; thread-safe."""
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._bugs = weakref.WeakValueDictionary()
+        self._recent = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._bugs)
+
+    def _use(self, bugno, bug):
+        self._recent.pop(bugno, None)
+        self._recent[bugno] = bug
+        while len(self._recent) > self.size:
+            self._recent.popitem(last=False)
+
+    def get(self, bugno, factory):
+        """Return the bug, calling ``factory()`` to create it if needed."""
+        with self._lock:
+            bug = self._bugs.get(bugno)
+            if bug is None:
+                bug = self._bugs[bugno] = factory()
+            self._use(bugno, bug)
+            return bug
+
+    def find(self, bugno):
+        """Return the bug if it is in the map, otherwise ``None``."""
+        with self._lock:
+            return self._bugs.get(bugno)
+
+    def invalidate(self, bugnos, commented=()):
+        """Forget the data of the given bugs.
+
+        Their history, and the comments of the ``commented`` bugs, are
+        refreshed when next used.
+        """
+        commented = set(commented)
+        with self._lock:
+            bugs = [
+                (x, self._bugs.get(x)) for x in set(bugnos) | commented]
+        for bugno, bug in bugs:
+            if bug is not None:
+                bug._outdate(comments=bugno in commented)
+
+    def clear(self):
+        with self._lock:
+            self._bugs.clear()
+            self._recent.clear()
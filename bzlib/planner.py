@@ -0,0 +1,208 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Planning of updates of many bugs.
+
+``plan`` retrieves the current values of the fields an update changes
+and reduces the changes to each bug to those that change something, so
+that bugs that already have the new values are not written.  Bugs with
+the same remaining changes are grouped, and each group is updated using
+few ``Bug.update`` calls (see ``Bugzilla.update_bugs``).
+"""
+
+import json
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import bug
+
+# fields whose changes are made regardless of the current values, e.g.
+# a comment is added even if the bug's fields need no change
+_ADDITIVE_FIELDS = frozenset(['comment', 'work_time'])
+
+
+def _same(current, value):
+    """Return True if a field with the ``current`` value has ``value``."""
+    if isinstance(current, (int, float)) and not isinstance(current, bool):
+        try:
+            return float(current) == float(value)
+        except (TypeError, ValueError):
+            return False
+    return current == value
+
+
+def _list_change(current, change):
+    """Return the part of a change to a list field that changes it."""
+    if 'set' in change:
+        return {} if set(change['set']) == set(current) else change
+    result = {}
+    add = [x for x in change.get('add') or [] if x not in current]
+    remove = [x for x in change.get('remove') or [] if x in current]
+    if add:
+        result['add'] = add
+    if remove:
+        result['remove'] = remove
+    return result
+
+
+def reduce_changes(data, changes):
+    """Return the changes that change a bug with the given data.
+
+    Changes to fields that are not in ``data`` are kept, as are a
+    comment and work time, which change any bug.
+    """
+    result = {}
+    for name, value in changes.items():
+        if name in _ADDITIVE_FIELDS:
+            continue
+        if name not in data:
+            result[name] = value  # current value unknown
+        elif isinstance(value, dict):
+            value = _list_change(data[name], value)
+            if value:
+                result[name] = value
+        elif not _same(data[name], value):
+            result[name] = value
+    for name in _ADDITIVE_FIELDS & set(changes):
+        result[name] = changes[name]
+    return result
+
+
+def _format_value(value):
+    if isinstance(value, dict):
+        if 'body' in value:
+            return repr(value['body'])
+        if 'set' in value:
+            return '={}'.format(','.join(map(str, value['set'])))
+        return ' '.join(
+            ['+{}'.format(x) for x in value.get('add') or []]
+            + ['-{}'.format(x) for x in value.get('remove') or []]
+        )
+    return str(value)
+
+
+class Plan(object):
+    """Updates of bugs, grouped by identical changes.
+
+    ``groups`` is a list of ``(changes, bugnos)`` in the order of the
+    first bug of each group.  ``unchanged`` are the bugs that need no
+    update.  ``errors`` are ``(bugno, error)`` pairs for the bugs whose
+    data could not be retrieved; they are not updated.
+    """
+
+    def __init__(self, bz):
+        self.bz = bz
+        self.groups = []
+        self.unchanged = []
+        self.errors = []
+        self._groups = {}
+
+    def add(self, bugno, changes):
+        """Plan to make the given changes to a bug."""
+        if not changes:
+            self.unchanged.append(bugno)
+            return
+        key = json.dumps(changes, sort_keys=True)
+        if key not in self._groups:
+            self._groups[key] = (changes, [])
+            self.groups.append(self._groups[key])
+        self._groups[key][1].append(bugno)
+
+    @property
+    def rpcs(self):
+        """The number of ``Bug.update`` calls needed if none fails."""
+        n = self.bz.chunk_size
+        return sum((len(bugnos) + n - 1) // n for _, bugnos in self.groups)
+
+    def format(self):
+        """Return a description of the plan; a list of lines."""
+        lines = []
+        for changes, bugnos in self.groups:
+            lines.append('Bug {}:'.format(', '.join(map(str, bugnos))))
+            lines.extend(
+                '  {}: {}'.format(k, _format_value(v))
+                for k, v in sorted(changes.items())
+            )
+        if self.unchanged:
+            lines.append('Unchanged: {}'.format(
+                ', '.join(map(str, self.unchanged))))
+        lines.extend(
+            'Bug {}: {}'.format(bugno, error) for bugno, error in self.errors)
+        lines.append('{} bugs to update; {} Bug.update calls.'.format(
+            sum(len(bugnos) for _, bugnos in self.groups), self.rpcs))
+        return lines
+
+    def execute(self):
+        """Make the planned updates.
+
+        Return a list of ``workers.Job``, one per bug updated; see
+        ``Bugzilla.update_bugs``.
+        """
+        jobs = []
+        for changes, bugnos in self.groups:
+            jobs.extend(self.bz.update_bugs(bugnos, **changes))
+        return jobs
+
+
+def plan(bz, bugnos, changes, fields=None):
+    """Plan the updates of the given bugs.
+
+    ``changes`` are the changes to make to each bug, as accepted by
+    ``Bugzilla.update_bugs``, or a function that returns the changes to
+    make to a given ``Bug``, in which case ``fields`` are the fields of
+    bug data that the function and the changes it returns use.  The
+    current data of those fields is retrieved with as few ``Bug.get``
+    calls as possible, even if it is already loaded, and is merged into
+    the bugs.  Return a ``Plan``.
+    """
+    if callable(changes):
+        fn = changes
+    else:
+        changes = bug.Bug._update_params(changes, bug._BULK_UPDATE_FIELDS)
+        fields = set(changes) - _ADDITIVE_FIELDS
+        fn = lambda _bug: changes
+
+    def load(bugnos):
+        return bz.bugs(bugnos, include_fields=fields, use_cache=False)
+
+    _plan = Plan(bz)
+    if not fields:
+        bugs = [bz.bug(bugno) for bugno in bugnos]
+    else:
+        try:
+            bugs = load(bugnos)
+        except xmlrpclib.Fault:
+            # retrieve the bugs one at a time to find those that fail
+            bugs = []
+            for bugno in bugnos:
+                try:
+                    bugs.extend(load([bugno]))
+                except xmlrpclib.Fault as e:
+                    _plan.errors.append((bugno, e))
+
+    for _bug in bugs:
+        try:
+            data = _bug.data if fields else {}
+            _changes = fn(_bug)
+        except xmlrpclib.Fault as e:
+            _plan.errors.append((_bug.bugno, e))
+            continue
+        _changes = bug.Bug._update_params(_changes, bug._BULK_UPDATE_FIELDS)
+        _plan.add(_bug.bugno, reduce_changes(data, _changes))
+    return _plan
@@ -0,0 +1,237 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Deadlines, retries and adaptive concurrency limits for RPCs."""
+
+import contextlib
+import random
+import socket
+import threading
+import time
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+DEFAULT_CONCURRENCY = 8
+
+# methods that may safely be repeated
+IDEMPOTENT_METHODS = frozenset([
+    'Bug.comments', 'Bug.fields', 'Bug.get', 'Bug.history', 'Bug.search',
+    'Bugzilla.version', 'Product.get', 'Product.get_accessible_products',
+    'User.get',
+])
+
+# HTTP statuses with which an overloaded server turns requests away
+OVERLOAD_STATUSES = frozenset([429, 502, 503, 504])
+
+
+class DeadlineExceeded(socket.timeout):
+    pass
+
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def deadline(when):
+    """Set a deadline (a ``time.time()`` value) for the current thread.
+
+    ``None`` sets no deadline.  Nested deadlines cannot extend an
+    enclosing one.
+    """
+    previous = getattr(_local, 'deadline', None)
+    if when is None or (previous is not None and previous < when):
+        when = previous
+    _local.deadline = when
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def remaining():
+    """Return the seconds left until the current thread's deadline.
+
+    Return ``None`` if there is no deadline; raise ``DeadlineExceeded``
+    if it has passed.
+    """
+    when = getattr(_local, 'deadline', None)
+    if when is None:
+        return None
+    left = when - time.time()
+    if left <= 0:
+        raise DeadlineExceeded('deadline exceeded')
+    return left
+
+
+def transient(error):
+    """Return True if the error may not recur if the call is repeated."""
+    if isinstance(error, xmlrpclib.ProtocolError):
+        return error.errcode in OVERLOAD_STATUSES
+    if isinstance(error, socket.gaierror):
+        return False  # the host name does not resolve
+    return isinstance(error, (socket.error, httplib.HTTPException))
+
+
+class Limiter(object):
+    """An adaptive limit on the number of calls in progress.
+
+    The limit is adjusted AIMD-style: it grows by one for every
+    ``limit`` calls that succeed while the limit is reached, and is
+    multiplied by ``decrease`` when a call fails because the server is
+    overloaded or is slow, i.e. takes ``latency_factor`` times longer
+    than the fastest call of the same method (and at least
+    ``min_latency`` seconds).  The limit is decreased at most once for
+    the calls in progress at the time.
+    """
+
+    def __init__(
+        self,
+        maximum=DEFAULT_CONCURRENCY,
+        minimum=1,
+        decrease=0.5,
+        latency_factor=4.0,
+        min_latency=1.0
+    ):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.min_latency = min_latency
+        self.in_flight = 0
+        self.clock = time.time
+        self._fastest = {}
+        self._decreased = None
+        self._cond = threading.Condition()
+
+    def acquire(self, method, timeout=None):
+        """Wait until a call may start; return a token for ``release``.
+
+        Raise ``DeadlineExceeded`` if no call may start within
+        ``timeout`` seconds (``None`` to wait indefinitely).
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if end is None:
+                    self._cond.wait()
+                    continue
+                left = end - time.time()
+                if left <= 0:
+                    raise DeadlineExceeded('deadline exceeded')
+                self._cond.wait(left)
+            self.in_flight += 1
+            return method, self.clock()
+
+    def release(self, token, overloaded=False):
+        """Record the end of a call and adjust the limit."""
+        method, start = token
+        with self._cond:
+            now = self.clock()
+            latency = now - start
+            fastest = self._fastest.get(method)
+            if fastest is None or latency < fastest:
+                self._fastest[method] = fastest = latency
+            slow = latency >= max(
+                self.min_latency, self.latency_factor * fastest)
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if overloaded or slow:
+                if self._decreased is None or start >= self._decreased:
+                    self.limit = max(
+                        self.minimum, self.limit * self.decrease)
+                    self._decreased = now
+            elif saturated:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class Policy(object):
+    """How RPCs are performed: deadlines, retries and concurrency.
+
+    Each call must complete within ``timeout`` seconds (``None`` for
+    no deadline), including retries.  Calls of ``IDEMPOTENT_METHODS``
+    that fail with a ``transient`` error are retried up to ``retries``
+    times after an exponential, jittered delay based on ``backoff``
+    seconds, or after the delay requested by the server.  Calls wait
+    for the ``limiter``, but not past their deadline.
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        limiter=None
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter or Limiter()
+        self.sleep = time.sleep
+        self.retried = 0
+
+    def call(self, method, fn):
+        """Call ``fn`` to perform the named RPC; return its result."""
+        when = None if self.timeout is None else time.time() + self.timeout
+        attempt = 0
+        with deadline(when):
+            while True:
+                try:
+                    return self._attempt(method, fn)
+                except Exception as e:
+                    if method not in IDEMPOTENT_METHODS \
+                            or attempt >= self.retries or not transient(e):
+                        raise
+                    delay = self._delay(attempt, e)
+                    if when is not None and time.time() + delay >= when:
+                        raise
+                attempt += 1
+                self.retried += 1
+                self.sleep(delay)
+
+    def _attempt(self, method, fn):
+        token = self.limiter.acquire(method, remaining())
+        overloaded = False
+        try:
+            return fn()
+        except Exception as e:
+            overloaded = transient(e)
+            raise
+        finally:
+            self.limiter.release(token, overloaded)
+
+    def _delay(self, attempt, error):
+        """Return the seconds to wait before another attempt."""
+        headers = getattr(error, 'headers', None)
+        try:
+            return float(headers.get('Retry-After'))
+        except (AttributeError, TypeError, ValueError):
+            pass
+        return random.uniform(
+            0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
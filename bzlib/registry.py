@@ -0,0 +1,93 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Indexed bug field metadata.
+
+``FieldRegistry`` indexes the result of ``Bug.fields`` once, so that
+fields are looked up by name, and the legal values of a field, sorted
+or not and restricted to the values visible for a controlling value,
+are returned without scanning or sorting the metadata again.
+"""
+
+
+def _sortkey(value):
+    return int(value.get('sortkey', -1))
+
+
+class FieldRegistry(object):
+    """The bug fields of a server, indexed.
+
+    ``fields`` is the list of fields as returned by ``Bug.fields``; it
+    must not be modified.  ``by_name`` maps field names to fields.
+    Value lists returned by the registry are shared and must not be
+    modified either.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.by_name = {}
+        self._names = {}
+        # (name, sort, omit_empty) -> values
+        self._values = {}
+        # (name, sort, omit_empty, controlling value) -> values
+        self._visible = {}
+        for field in fields:
+            self.by_name[field['name']] = field
+            if 'values' in field:
+                self._index(field)
+
+    def _index(self, field):
+        name = field['name']
+        values = [x for x in field['values'] if 'name' in x]
+        self._names[name] = frozenset(x['name'] for x in values)
+        by_sortkey = sorted(values, key=_sortkey)
+        for sort, ordered in ((False, values), (True, by_sortkey)):
+            nonempty = [x for x in ordered if x['name']]
+            for omit_empty, lst in ((False, ordered), (True, nonempty)):
+                self._values[name, sort, omit_empty] = lst
+                if not field.get('value_field'):
+                    continue
+                for value in lst:
+                    for v in value.get('visibility_values') or ():
+                        self._visible.setdefault(
+                            (name, sort, omit_empty, v), []).append(value)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    def names(self, name):
+        """Return the set of legal value names of the named field.
+
+        Raise ``KeyError`` if the field does not exist or has no list of
+        legal values.
+        """
+        return self._names[name]
+
+    def values(self, name, sort=True, omit_empty=True, visible_for=None):
+        """Return the legal values of the named field; a list of dicts.
+
+        See ``Bugzilla.get_field_values``.  Raise ``KeyError`` if the
+        field does not exist or has no list of legal values.
+        """
+        values = self._values[name, sort, omit_empty]
+        value_field = self.by_name[name].get('value_field')
+        if visible_for and value_field and value_field in visible_for:
+            return self._visible.get(
+                (name, sort, omit_empty, visible_for[value_field]), [])
+        return values
@@ -0,0 +1,78 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import os.path
+import threading
+
+from . import config
+
+
+# fault codes with which Bugzilla rejects an expired or unknown token
+INVALID_TOKEN_FAULTS = frozenset([307, 32000])
+
+
+def default_path():
+    return os.path.join(config.cache_dir(), 'tokens')
+
+
+class TokenStore(object):
+    """Login tokens, saved to a file between invocations.
+
+    Tokens are keyed by server URL and user.  The file is created
+    readable and writable only by the user, and is replaced atomically
+    on every change.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write(self, tokens):
+        tmp = '{}.{}'.format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(tokens, fh)
+        os.rename(tmp, self.path)
+
+    @staticmethod
+    def _key(url, user):
+        return '{} {}'.format(url, user)
+
+    def get(self, url, user):
+        """Return the saved token, or ``None``."""
+        with self._lock:
+            return self._read().get(self._key(url, user))
+
+    def set(self, url, user, token):
+        with self._lock:
+            tokens = self._read()
+            tokens[self._key(url, user)] = token
+            self._write(tokens)
+
+    def remove(self, url, user):
+        with self._lock:
+            tokens = self._read()
+            if tokens.pop(self._key(url, user), None) is not None:
+                self._write(tokens)
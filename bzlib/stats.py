@@ -0,0 +1,243 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Observers of the RPCs a ``Bugzilla`` makes.
+
+An observer is a callable that is passed a ``Call`` after each RPC.
+Observers are added to ``Bugzilla.observers``; they may be called from
+several threads at once.
+"""
+
+import collections
+import json
+import math
+import threading
+import time
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+
+class Call(object):
+    """An RPC, as reported to observers.
+
+    method: RPC method, e.g. ``Bug.get``
+    start: time (``time.time()``) at which the call was made
+    latency: seconds until the result was received or, for streamed
+             results (``Bugzilla.rpc_iter``), consumed
+    retries: number of times the call was retried
+    params_size: bytes of request bodies, before compression
+    response_size: bytes of response bodies, after decompression
+    error: the exception the call raised, or ``None``
+    fault: the fault code, if the exception was a ``Fault``
+
+    Sizes include all attempts at the call.
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.start = time.time()
+        self.latency = None
+        self.retries = -1  # incremented by each attempt
+        self.params_size = 0
+        self.response_size = 0
+        self.error = None
+
+    @property
+    def fault(self):
+        if isinstance(self.error, xmlrpclib.Fault):
+            return self.error.faultCode
+        return None
+
+    def finish(self, tally, error=None):
+        """Record the end of the call; return the call.
+
+        ``tally`` is the ``transport.Tally`` of the call.
+        """
+        self.latency = time.time() - self.start
+        self.params_size = tally.data_sent
+        self.response_size = tally.data_received
+        self.error = error
+        return self
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'start': self.start,
+            'latency': self.latency,
+            'retries': self.retries,
+            'params_size': self.params_size,
+            'response_size': self.response_size,
+            'fault': self.fault,
+            'error': None if self.error is None else repr(self.error),
+        }
+
+
+class Histogram(object):
+    """A distribution of latencies.
+
+    Latencies are counted in buckets whose upper bounds are 1ms and
+    powers of two multiples of it, so percentiles are accurate to a
+    factor of two.
+    """
+
+    resolution = 0.001
+
+    def __init__(self):
+        self.buckets = collections.defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        bucket = 0
+        if value > self.resolution:
+            bucket = int(math.ceil(math.log(value / self.resolution, 2)))
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def update(self, other):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] += n
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        """Return an upper bound of the ``p``th percentile, or ``None``."""
+        if not self.count:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                break
+        return min(self.maximum, self.resolution * 2 ** bucket)
+
+
+class MethodStats(object):
+    """Aggregate statistics of calls of a method."""
+
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.faults = collections.Counter()
+        self.params_size = 0
+        self.response_size = 0
+        self.latency = Histogram()
+
+    def add(self, call):
+        self.calls += 1
+        self.retries += call.retries
+        if call.error is not None:
+            self.errors += 1
+        if call.fault is not None:
+            self.faults[call.fault] += 1
+        self.params_size += call.params_size
+        self.response_size += call.response_size
+        self.latency.add(call.latency)
+
+    def update(self, other):
+        self.calls += other.calls
+        self.retries += other.retries
+        self.errors += other.errors
+        self.faults.update(other.faults)
+        self.params_size += other.params_size
+        self.response_size += other.response_size
+        self.latency.update(other.latency)
+
+
+class Stats(object):
+    """An observer that aggregates calls by method.
+
+    ``methods`` maps method names to ``MethodStats``; ``total()``
+    aggregates all methods and ``format()`` returns a table.
+    """
+
+    columns = (
+        'METHOD', 'CALLS', 'RETRIES', 'ERRORS', 'SENT', 'RECEIVED',
+        'MEAN', 'P50', 'P95', 'MAX',
+    )
+
+    def __init__(self):
+        self.methods = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, call):
+        with self._lock:
+            if call.method not in self.methods:
+                self.methods[call.method] = MethodStats()
+            self.methods[call.method].add(call)
+
+    def total(self):
+        total = MethodStats()
+        with self._lock:
+            for stats in self.methods.values():
+                total.update(stats)
+        return total
+
+    def format(self):
+        """Return a table of the statistics of each method."""
+        def ms(seconds):
+            if seconds is None:
+                return '-'
+            return '{:.0f}ms'.format(1000 * seconds)
+
+        def row(name, stats):
+            latency = stats.latency
+            return (
+                name, stats.calls, stats.retries, stats.errors,
+                stats.params_size, stats.response_size,
+                ms(latency.mean), ms(latency.percentile(50)),
+                ms(latency.percentile(95)), ms(latency.maximum),
+            )
+
+        with self._lock:
+            rows = [row(k, v) for k, v in sorted(self.methods.items())]
+        rows.append(row('total', self.total()))
+        rows = [self.columns] + [tuple(map(str, x)) for x in rows]
+        widths = [max(len(x[i]) for x in rows) for i in range(len(rows[0]))]
+        return '\n'.join(
+            '  '.join(
+                x.ljust(w) if i == 0 else x.rjust(w)
+                for i, (x, w) in enumerate(zip(r, widths))
+            )
+            for r in rows
+        )
+
+
+class Trace(object):
+    """An observer that writes each call to a file as a line of JSON."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self._lock = threading.Lock()
+
+    def __call__(self, call):
+        line = json.dumps(call.as_dict(), sort_keys=True)
+        with self._lock:
+            self.fileobj.write(line + '\n')
+            self.fileobj.flush()
@@ -0,0 +1,125 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Incremental decoding of large RPC results.
+
+A *path* is a tuple of struct member names locating an array within a
+result; ``'*'`` matches any member name.  For example, the bugs of a
+``Bug.search`` result are at ``('bugs',)`` and the comments of a
+``Bug.comments`` result are at ``('bugs', '*', 'comments')``.  The
+functions here yield ``(path, item)`` pairs for the items of arrays at
+the given paths, where ``path`` is the actual location of the array.
+"""
+
+import collections
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+
+ANY = '*'
+
+
+def _matches(path, paths):
+    return any(
+        len(path) == len(p)
+        and all(a == b or b == ANY for a, b in zip(path, p))
+        for p in paths
+    )
+
+
+class StreamUnmarshaller(xmlrpclib.Unmarshaller):
+    """An ``Unmarshaller`` that hands over array items as they are parsed.
+
+    Items of arrays at the given paths are removed from the result as
+    soon as they are complete and appended to ``items``, so the memory
+    used does not grow with the size of those arrays.
+    """
+
+    def __init__(self, paths, use_datetime=False):
+        xmlrpclib.Unmarshaller.__init__(self, use_datetime)
+        self.paths = [tuple(p) for p in paths]
+        self.items = collections.deque()
+        # (path, is_array, current member name) of open containers
+        self._containers = []
+
+    def start(self, tag, attrs):
+        tag = tag.split(':')[-1]
+        if tag in ('array', 'struct'):
+            if not self._containers:
+                path = ()
+            else:
+                parent_path, is_array, name = self._containers[-1]
+                path = parent_path + (ANY if is_array else name,)
+            self._containers.append((path, tag == 'array', None))
+        xmlrpclib.Unmarshaller.start(self, tag, attrs)
+
+    def end(self, tag):
+        result = xmlrpclib.Unmarshaller.end(self, tag)
+        tag = tag.split(':')[-1]
+        if tag in ('array', 'struct'):
+            self._containers.pop()
+        elif tag == 'name':
+            path, is_array, name = self._containers[-1]
+            self._containers[-1] = (path, is_array, self._stack[-1])
+        elif tag == 'value' and self._containers:
+            path, is_array, name = self._containers[-1]
+            if is_array and _matches(path, self.paths):
+                self.items.append((path, self._stack.pop()))
+        return result
+
+
+def iterparse(chunks, paths, use_datetime=False):
+    """Decode an XML-RPC response incrementally.
+
+    ``chunks`` is an iterable of pieces of the response body.  Yield
+    ``(path, item)`` pairs for the items of arrays at the given paths
+    as soon as they are decoded.  If the response is a fault, raise
+    ``xmlrpclib.Fault`` once it has been read.
+    """
+    unmarshaller = StreamUnmarshaller(paths, use_datetime)
+    parser = xmlrpclib.ExpatParser(unmarshaller)
+    for chunk in chunks:
+        parser.feed(chunk)
+        while unmarshaller.items:
+            yield unmarshaller.items.popleft()
+    parser.close()
+    while unmarshaller.items:
+        yield unmarshaller.items.popleft()
+    unmarshaller.close()
+
+
+def walk(result, paths):
+    """Yield ``(path, item)`` pairs from an already decoded result."""
+    paths = [tuple(p) for p in paths]
+
+    def _walk(value, path):
+        if isinstance(value, list):
+            if _matches(path, paths):
+                for item in value:
+                    yield path, item
+            else:
+                for item in value:
+                    for x in _walk(item, path + (ANY,)):
+                        yield x
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                for x in _walk(v, path + (k,)):
+                    yield x
+
+    return _walk(result, ())
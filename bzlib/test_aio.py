@@ -0,0 +1,193 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+try:
+    import asyncio
+    from . import aio
+except (ImportError, SyntaxError):
+    aio = None  # Python < 3.5
+
+from . import bugzilla
+from .test_transport import _RequestHandler, _Server
+
+
+class _Bugzilla(object):
+    """Functions of a fake Bugzilla, recording calls and concurrency."""
+
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self.updated = {}
+
+    def register(self, server):
+        for name in (
+            'Bug.get', 'Bug.update', 'Bug.search',
+            'Product.get_accessible_products', 'Product.get', 'User.get',
+        ):
+            server.register_function(
+                self._method(name.replace('.', '_')), name)
+
+    def _method(self, name):
+        def method(params):
+            with self._lock:
+                self.calls.append(name)
+                self.active += 1
+                self.max_active = max(self.active, self.max_active)
+            try:
+                return getattr(self, name)(params)
+            finally:
+                with self._lock:
+                    self.active -= 1
+        return method
+
+    def Bug_get(self, params):
+        time.sleep(0.05)
+        if 999 in params['ids']:
+            raise xmlrpclib.Fault(101, 'Bug #999 does not exist.')
+        return {'bugs': [
+            {'id': x, 'status': 'NEW', 'resolution': '', 'is_open': True}
+            for x in params['ids']
+        ]}
+
+    def Bug_update(self, params):
+        self.updated[params['ids'][0]] = params
+        changes = {
+            k: {'added': params[k], 'removed': ''}
+            for k in ('status', 'resolution') if k in params
+        }
+        return {'bugs': [{'id': params['ids'][0], 'changes': changes}]}
+
+    def Bug_search(self, params):
+        return {'bugs': [{'id': 1}, {'id': 2}]}
+
+    def Product_get_accessible_products(self, params):
+        return {'ids': [1, 2]}
+
+    def Product_get(self, params):
+        return {'products': [{'name': 'A'}, {'name': 'B'}]}
+
+    def User_get(self, params):
+        return {'users': [{'name': params['match'][0] + '@example.com'}]}
+
+
+@unittest.skipIf(aio is None, 'asyncio client requires Python 3.5')
+class AsyncBugzillaTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = _Server(
+            ('127.0.0.1', 0),
+            requestHandler=_RequestHandler,
+            logRequests=False,
+            allow_none=True
+        )
+        self.fake = _Bugzilla()
+        self.fake.register(self.server)
+        self.url = 'http://{}:{}/'.format(*self.server.server_address)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.bz = aio.AsyncBugzilla(self.url, 'u', 'p', concurrency='3')
+
+    def tearDown(self):
+        self.bz.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def run_until_complete(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_concurrency(self):
+        bugs = [self.bz.bug(x) for x in range(1, 11)]
+        data = self.run_until_complete(
+            asyncio.gather(*(x.data for x in bugs)))
+        self.assertEqual([x['id'] for x in data], list(range(1, 11)))
+        self.assertEqual(self.fake.max_active, 3)
+        # connections are reused
+        pool = self.bz.transport.pool
+        self.assertEqual(pool.created, 3)
+
+        # data are cached
+        self.run_until_complete(bugs[0].data)
+        self.assertEqual(len(self.fake.calls), 10)
+
+    def test_bugs(self):
+        bugs = self.run_until_complete(self.bz.bugs([3, 1, 3], chunk_size=1))
+        self.assertEqual([x.bugno for x in bugs], [3, 1, 3])
+        self.assertEqual(self.fake.calls, ['Bug_get'] * 2)
+        self.assertTrue(self.run_until_complete(bugs[0].is_open()))
+
+    def test_fault(self):
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            self.run_until_complete(self.bz.bug(999).data)
+        self.assertEqual(cm.exception.faultCode, 101)
+
+    def test_update(self):
+        _bug = self.bz.bug(1)
+        self.run_until_complete(_bug.data)
+        self.run_until_complete(
+            _bug.set_status('RESOLVED', 'FIXED', comment='done'))
+        params = self.fake.updated[1]
+        self.assertEqual(params['status'], 'RESOLVED')
+        self.assertEqual(params['comment'], {'body': 'done'})
+        self.assertEqual(_bug._data['status'], 'RESOLVED')
+        self.assertFalse(self.run_until_complete(_bug.is_open()))
+        self.assertEqual(self.fake.calls.count('Bug_get'), 1)
+        with self.assertRaises(TypeError):
+            _bug.update(foo='bar')
+        self.assertIsNone(self.run_until_complete(_bug.update_cc()))
+
+    def test_assign(self):
+        bz = aio.AsyncBugzilla(
+            self.url, 'u', 'p', assign_status='NEW ASSIGNED')
+        self.run_until_complete(bz.bug(1).set_assigned_to('fred'))
+        bz.close()
+        params = self.fake.updated[1]
+        self.assertEqual(params['assigned_to'], 'fred@example.com')
+        self.assertEqual(params['status'], 'ASSIGNED')
+
+    def test_cache(self):
+        for i in range(2):
+            products = self.run_until_complete(self.bz.get_products())
+            user = self.run_until_complete(self.bz.match_one_user('fred'))
+        self.assertEqual([x['name'] for x in products], ['A', 'B'])
+        self.assertEqual(user['name'], 'fred@example.com')
+        self.assertEqual(self.fake.calls, [
+            'Product_get_accessible_products', 'Product_get', 'User_get'])
+
+    def test_search(self):
+        bugs = self.run_until_complete(
+            aio.AsyncBug.search(self.bz, not_product=['A']))
+        self.assertEqual([x.bugno for x in bugs], [1, 2])
+        self.assertEqual(self.fake.calls[-1], 'Bug_search')
+
+    def test_url(self):
+        with self.assertRaises(bugzilla.URLError):
+            aio.AsyncBugzilla('ftp://bugzilla.example.com/')
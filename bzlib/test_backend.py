@@ -0,0 +1,139 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import json
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import backend
+from . import bugzilla
+
+
+class _Response(object):
+    reason = 'OK'
+    msg = {}
+
+    def __init__(self, status):
+        self.status = status
+
+
+class _Transport(object):
+    """Stand-in for ``transport.Transport`` returning canned responses."""
+
+    def __init__(self, result, status=200):
+        self.result = result
+        self.status = status
+        self.requests = []
+
+    def http_request(self, host, method, handler, body=None, headers=None):
+        self.requests.append((host, method, handler, body, headers))
+        return _Response(self.status), json.dumps(self.result).encode()
+
+
+class BackendTestCase(unittest.TestCase):
+    def test_server_proxy(self):
+        bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com', backend='jsonrpc')
+        self.assertIsInstance(bz.server, backend.JSONRPCProxy)
+        self.assertEqual(bz.server._handler, '/jsonrpc.cgi')
+        bz = bugzilla.Bugzilla('http://bugzilla.example.com', backend='rest')
+        self.assertIsInstance(bz.server, backend.RESTProxy)
+        self.assertEqual(bz.server._handler, '/rest.cgi/')
+        with self.assertRaises(ValueError):
+            bugzilla.Bugzilla('http://bugzilla.example.com', backend='soap')
+
+
+class JSONRPCTestCase(unittest.TestCase):
+    def test_call(self):
+        transport = _Transport({
+            'result': {'bugs': [
+                {'id': 1, 'creation_time': '2015-04-25T01:02:03Z'},
+            ]},
+            'error': None,
+            'id': 1,
+        })
+        proxy = backend.JSONRPCProxy(
+            'http://bugzilla.example.com/jsonrpc.cgi', transport)
+        result = proxy.Bug.get({'ids': [1]})
+        self.assertEqual(
+            result['bugs'][0]['creation_time'],
+            datetime.datetime(2015, 4, 25, 1, 2, 3)
+        )
+        host, method, handler, body, headers = transport.requests[0]
+        self.assertEqual((host, method, handler),
+            ('bugzilla.example.com', 'POST', '/jsonrpc.cgi'))
+        self.assertEqual(json.loads(body)['method'], 'Bug.get')
+        self.assertEqual(json.loads(body)['params'], [{'ids': [1]}])
+
+    def test_fault(self):
+        transport = _Transport({
+            'result': None,
+            'error': {'code': 101, 'message': 'Bug #1 does not exist.'},
+            'id': 1,
+        })
+        proxy = backend.JSONRPCProxy(
+            'http://bugzilla.example.com/jsonrpc.cgi', transport)
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            proxy.Bug.get({'ids': [1]})
+        self.assertEqual(cm.exception.faultCode, 101)
+        with self.assertRaises(xmlrpclib.Fault):
+            proxy.system.multicall([])
+        self.assertEqual(len(transport.requests), 1)
+
+
+class RESTTestCase(unittest.TestCase):
+    def setUp(self):
+        self.transport = _Transport({'bugs': []})
+        self.proxy = backend.RESTProxy(
+            'http://bugzilla.example.com/rest.cgi/', self.transport)
+
+    def test_get(self):
+        self.proxy.Bug.comments(
+            {'ids': [1, 2], 'Bugzilla_token': 't', 'Bugzilla_login': None})
+        host, method, handler, body, headers = self.transport.requests[0]
+        self.assertEqual(method, 'GET')
+        self.assertEqual(handler, '/rest.cgi/bug/1/comment?ids=2')
+        self.assertIsNone(body)
+        self.assertEqual(headers['X-BUGZILLA-TOKEN'], 't')
+        self.assertNotIn('X-BUGZILLA-LOGIN', headers)
+
+        self.proxy.Bug.get({'ids': [1, 2], 'permissive': True})
+        self.assertEqual(
+            self.transport.requests[1][2],
+            '/rest.cgi/bug?id=1&id=2&permissive=true'
+        )
+
+    def test_put(self):
+        self.proxy.Bug.update({'ids': [1], 'priority': 'P1'})
+        host, method, handler, body, headers = self.transport.requests[0]
+        self.assertEqual((method, handler), ('PUT', '/rest.cgi/bug/1'))
+        self.assertEqual(json.loads(body), {'priority': 'P1'})
+
+    def test_fault(self):
+        self.transport.result = {
+            'error': True, 'code': 101, 'message': 'no such bug'}
+        self.transport.status = 404
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            self.proxy.Bug.get({'ids': [1]})
+        self.assertEqual(cm.exception.faultCode, 101)
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            self.proxy.system.multicall([])
+        self.assertEqual(cm.exception.faultCode, backend.FAULT_NO_SUCH_METHOD)
@@ -15,11 +15,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import datetime
 import socket
 import unittest
 
 from . import bugzilla
 from . import bug
+from . import fakeserver
 
 
 class BugTestCase(unittest.TestCase):
@@ -45,3 +47,182 @@ class BugTestCase(unittest.TestCase):
                 self.bz,
                 **{field: 'not_' + 'foo' for field in fields}
             )
+
+
+class FakeServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeserver.FakeServer().start()
+        self.bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off')
+
+    def tearDown(self):
+        self.bz.close()
+        self.server.stop()
+
+    def test_lifecycle(self):
+        _bug = bug.Bug(self.bz, {
+            'product': 'TestProduct', 'component': 'Component A',
+            'summary': 'It broke', 'version': '1.0', 'description': 'How',
+        })
+        bugno = _bug.create()
+        self.assertEqual(bug.Bug(self.bz, bugno).comments[0]['text'], 'How')
+
+        _bug = self.bz.bug(bugno)
+        self.assertTrue(_bug.is_open())
+        _bug.add_comment('More detail')
+        _bug.update(work_time=1.5)
+        _bug.update(work_time=2)
+        self.assertEqual(_bug.actual_time(), 3.5)
+        _bug.set_status('RESOLVED', 'FIXED')
+        self.assertFalse(_bug.is_open())
+        self.assertEqual(_bug.data['resolution'], 'FIXED')
+        self.assertEqual(len(_bug.comments), 2)
+
+        other = self.bz.bug(self.server.store.add_bug())
+        other.update_block(add=[bugno])
+        self.assertEqual(
+            self.bz.bug(bugno).data['depends_on'], [other.bugno])
+        other.set_dupe_of(bugno)
+        self.assertEqual(other.data['resolution'], 'DUPLICATE')
+
+        bugs = bug.Bug.search(self.bz, status='RESOLVED')
+        self.assertEqual(
+            sorted(x.bugno for x in bugs), sorted([bugno, other.bugno]))
+
+    def test_charts(self):
+        store = self.server.store
+        store.populate(10)
+        store.bugs[3]['last_change_time'] = datetime.datetime(2020, 1, 1)
+        open_bugs = [1, 2, 3, 6, 7, 8]
+
+        # expanded to the other statuses
+        bugs = bug.Bug.search(self.bz, not_status=['RESOLVED', 'VERIFIED'])
+        self.assertEqual([x.bugno for x in bugs], open_bugs)
+        requests = self.server.requests
+        with self.assertRaises(TypeError):
+            bug.Bug.search(self.bz, charts=[('summary', 'substring', 'x')])
+
+        store.version = '5.0.4'
+        self.bz.close()
+        self.bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off')
+        bugs = bug.Bug.search(self.bz, not_status=['RESOLVED', 'VERIFIED'])
+        self.assertEqual([x.bugno for x in bugs], open_bugs)
+        # Bugzilla.version and Bug.search, but not Bug.fields
+        self.assertEqual(self.server.requests - requests, 2)
+
+        bugs = bug.Bug.search(
+            self.bz, not_status=['RESOLVED', 'VERIFIED'], charts=[
+                ('last_change_time', 'lessthan', datetime.date(2021, 1, 1)),
+            ])
+        self.assertEqual([x.bugno for x in bugs], [3])
+        bugs = bug.Bug.search(
+            self.bz, charts=[('summary', 'notsubstring', 'bug 1')])
+        self.assertEqual([x.bugno for x in bugs], list(range(2, 10)))
+        with self.assertRaises(TypeError):
+            bug.Bug.search(self.bz, charts=[('summary', 'bogus', 'x')])
+
+    def test_pages(self):
+        self.server.store.populate(25)
+        requests = self.server.requests
+        bugs = bug.Bug.search(
+            self.bz, product='TestProduct', page_size=10, offset=2)
+        self.assertEqual([x.bugno for x in bugs], list(range(3, 26)))
+        self.assertEqual(self.server.requests - requests, 3)
+
+        requests = self.server.requests
+        bugs = bug.Bug.search(self.bz, page_size=10, prefetch=True, limit=15)
+        first = next(bugs)
+        self.assertEqual(first.bugno, 1)
+        self.assertEqual(
+            [x.bugno for x in bugs], list(range(2, 16)))
+        self.assertEqual(self.server.requests - requests, 2)
+
+        # no limit, as when not paged
+        bugs = bug.Bug.search(self.bz, page_size=10, limit=0)
+        self.assertEqual([x.bugno for x in bugs], list(range(1, 26)))
+        bugs = bug.Bug.search(self.bz, limit=0)
+        self.assertEqual([x.bugno for x in bugs], list(range(1, 26)))
+
+    def test_update_deltas(self):
+        self.server.store.populate(3)
+        _bug = self.bz.bug(1)
+        _bug.data, _bug.history
+        requests = self.server.requests
+        _bug.set_status('RESOLVED', 'FIXED', comment='Done')
+        _bug.update(
+            priority='P1', deadline=datetime.date(2026, 1, 2),
+            estimated_time=4, work_time=1.5)
+        _bug.update_cc(add=['user@example.com'])
+        _bug.update_block(add=[2])
+        _bug.set_dupe_of(3)
+        with self.bz.batch():
+            _bug.update(priority='P2')
+        self.assertFalse(_bug.is_open())
+        self.assertEqual(_bug.actual_time(), 1.5)
+        # no Bug.get or Bug.history
+        self.assertEqual(self.server.requests - requests, 6)
+
+        fresh = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off',
+            identity_map_size='0').bug(1)
+        self.assertEqual(_bug.data, fresh.data)
+        self.assertEqual(_bug.history, fresh.history)
+        fresh.bz.close()
+
+    def test_update_projection(self):
+        self.server.store.populate(1)
+        _bug = self.bz.bug(1, include_fields=['is_open', 'status'])
+        self.assertTrue(_bug.is_open())
+        requests = self.server.requests
+        _bug.set_status('RESOLVED', 'FIXED')
+        self.assertFalse(_bug.is_open())
+        # the resolution is not known; is_open is fetched when looked up
+        _bug.set_status('VERIFIED')
+        self.assertNotIn('is_open', _bug.data)
+        self.assertEqual(_bug.data['status'], 'VERIFIED')
+        # no Bug.get
+        self.assertEqual(self.server.requests - requests, 2)
+        self.assertFalse(_bug.is_open())
+        self.assertEqual(_bug.data['resolution'], 'FIXED')
+
+    def test_new_since(self):
+        store = self.server.store
+        store.version = '5.0.4'
+        bugno, = store.populate(1, comments=20)
+        for i, comment in enumerate(store.comments[bugno]):
+            comment['time'] = comment['creation_time'] = \
+                datetime.datetime(2020, 1, 1) + datetime.timedelta(days=i)
+        store.history[bugno].append({
+            'when': datetime.datetime(2020, 1, 1), 'who': 'user@example.com',
+            'changes': [
+                {'field_name': 'severity', 'added': 'major',
+                 'removed': 'normal'},
+            ],
+        })
+        _bug = self.bz.bug(bugno)
+        _bug.comments, _bug.history
+        sizes = []
+
+        def observe(call):
+            if call.method == 'Bug.comments':
+                sizes.append(call.response_size)
+        self.bz.observers.append(observe)
+
+        _bug.add_comment('More detail')
+        _bug.update(priority='P2', comment={'body': 'Why'})
+        self.bz.prefetch_comments([_bug])
+        self.assertEqual(
+            [x['text'] for x in _bug.comments[-2:]], ['More detail', 'Why'])
+        self.assertEqual(len(_bug.history), 2)
+
+        fresh = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off',
+            identity_map_size='0')
+        fresh.observers.append(observe)
+        self.assertEqual(_bug.comments, fresh.bug(bugno).comments)
+        self.assertEqual(_bug.history, fresh.bug(bugno).history)
+        fresh.close()
+        # only the new comments were retrieved, then all of them
+        incremental, full = sizes
+        self.assertLess(incremental * 4, full)
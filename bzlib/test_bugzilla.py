@@ -18,7 +18,14 @@ import itertools
 import os
 import tempfile
 import unittest
+import weakref
 
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import bug
 from . import bugzilla
 from . import config
 
@@ -145,3 +152,372 @@ class FromConfigTestCase(unittest.TestCase):
         kwargs = {k: None for k in mandatory_args}
         bz = bugzilla.Bugzilla.from_config(self._conf, **kwargs)
         self.assertEqual(bz.url, 'http://bugzilla.example.com/')
+
+
+class _Method(object):
+    """Stand-in for an ``xmlrpclib`` method proxy."""
+
+    def __init__(self, proxy, name):
+        self._proxy = proxy
+        self._name = name
+
+    def __getattr__(self, name):
+        return _Method(self._proxy, self._name + '.' + name)
+
+    def __call__(self, *args):
+        self._proxy.log.append(self._name)
+        return self._proxy.dispatch(self._name, *args)
+
+
+def _project(data, params):
+    """Apply the ``include_fields`` and ``exclude_fields`` params."""
+    include = params.get('include_fields', data)
+    exclude = params.get('exclude_fields', [])
+    return {k: v for k, v in data.items() if k in include and k not in exclude}
+
+
+class _Proxy(object):
+    """Stand-in for ``xmlrpclib.ServerProxy`` that records calls."""
+
+    def __init__(self, multicall=True):
+        self.multicall = multicall
+        self.log = []
+        self.updated = []
+        self.token = 'tok1'
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _Method(self, name)
+
+    def dispatch(self, name, *args):
+        if name == 'User.login':
+            return {'id': 1, 'token': self.token}
+        if name == 'system.multicall':
+            if not self.multicall:
+                raise xmlrpclib.Fault(-32601, 'no such method')
+            results = []
+            for call in args[0]:
+                try:
+                    results.append(
+                        [self.dispatch(call['methodName'], *call['params'])])
+                except xmlrpclib.Fault as e:
+                    results.append(
+                        {'faultCode': e.faultCode, 'faultString': e.faultString})
+            return results
+        token = args[0].get('Bugzilla_token')
+        if token is not None and token != self.token:
+            raise xmlrpclib.Fault(32000, 'invalid token')
+        if name == 'Bug.get':
+            return {'bugs': [
+                _project(
+                    {'id': x, 'summary': 'bug {}'.format(x), 'status': 'NEW'},
+                    args[0]
+                )
+                for x in args[0]['ids']
+            ]}
+        if name == 'Bug.search':
+            return {'bugs': [
+                _project({'id': x, 'summary': 'bug {}'.format(x)}, args[0])
+                for x in (1, 2, 3)
+            ]}
+        if name == 'Bug.comments':
+            return {'bugs': {
+                str(x): {'comments': [{'id': x, 'text': ''}]}
+                for x in args[0]['ids']
+            }}
+        if name == 'Bug.history':
+            return {'bugs': [
+                {'id': x, 'history': [{'who': 'u'}]} for x in args[0]['ids']
+            ]}
+        if name == 'Bug.update':
+            if 0 in args[0]['ids']:
+                raise xmlrpclib.Fault(101, 'bug 0 does not exist')
+            self.updated.extend(args[0]['ids'])
+            return {'bugs': [
+                {'id': x, 'changes': {}} for x in args[0]['ids']
+            ]}
+        raise xmlrpclib.Fault(-32601, 'no such method')
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p', chunk_size='2')
+        self.bz.server = self.proxy = _Proxy()
+
+    def test_multicall(self):
+        with self.bz.batch() as batch:
+            calls = [
+                self.bz.bug(x).update(priority='P1') for x in [1, 2, 3, 0]
+            ]
+            self.assertEqual(self.proxy.log, [])
+            batch.flush()
+        self.assertEqual(self.proxy.log, ['system.multicall'] * 2)
+        self.assertEqual(self.proxy.updated, [1, 2, 3])
+        for bugno, call in zip([1, 2, 3], calls):
+            self.assertEqual(call.result()['bugs'][0]['id'], bugno)
+        self.assertEqual(calls[3].fault.faultCode, 101)
+        with self.assertRaises(xmlrpclib.Fault):
+            calls[3].result()
+
+    def test_raise_on_exit(self):
+        with self.assertRaises(xmlrpclib.Fault):
+            with self.bz.batch():
+                self.bz.bug(0).update(priority='P1')
+                self.bz.bug(1).update(priority='P1')
+        self.assertEqual(self.proxy.updated, [1])
+
+    def test_fallback(self):
+        self.proxy.multicall = False
+        for i in range(2):
+            with self.bz.batch():
+                self.bz.bug(1).update(priority='P1')
+                self.bz.bug(2).update(priority='P1')
+        self.assertEqual(
+            self.proxy.log,
+            ['system.multicall'] + ['Bug.update'] * 4
+        )
+
+    def test_inactive(self):
+        self.assertIsNone(self.bz.active_batch)
+        result = self.bz.bug(1).update(priority='P1')
+        self.assertEqual(result['bugs'][0]['id'], 1)
+
+
+class UpdateBugsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p', chunk_size='2')
+        self.bz.server = self.proxy = _Proxy()
+
+    def test_chunks(self):
+        bugs = self.bz.bugs([1])
+        with self.bz.batch():
+            # sent at once
+            jobs = self.bz.update_bugs([1, 2, 3], priority='P1')
+            self.assertEqual([x.result['id'] for x in jobs], [1, 2, 3])
+        self.assertEqual(self.proxy.log, ['Bug.get'] + ['Bug.update'] * 2)
+        # the changes were applied to the loaded bug
+        self.assertIsNotNone(bugs[0]._data)
+        with self.assertRaises(TypeError):
+            self.bz.update_bugs([1], foo='bar')
+
+    def test_fault(self):
+        jobs = self.bz.update_bugs([1, 0, 2], status='RESOLVED')
+        self.assertEqual([x.item for x in jobs], [1, 0, 2])
+        self.assertEqual([x.error is None for x in jobs], [True, False, True])
+        self.assertEqual(jobs[1].error.faultCode, 101)
+        # the failed chunk was retried one bug at a time
+        self.assertEqual(self.proxy.log, ['Bug.update'] * 4)
+        self.assertEqual(self.proxy.updated, [1, 2])
+
+
+class BugsTestCase(unittest.TestCase):
+    def setUp(self):
+        # each Bug loads its own data
+        self.bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p', chunk_size='2',
+            identity_map_size='0')
+        self.bz.server = self.proxy = _Proxy()
+
+    def test_bugs(self):
+        bugs = self.bz.bugs([3, 1, 2, 1])
+        self.assertEqual(self.proxy.log, ['Bug.get'] * 2)
+        self.assertEqual([x.bugno for x in bugs], [3, 1, 2, 1])
+        self.assertEqual(
+            [x.data['summary'] for x in bugs],
+            ['bug 3', 'bug 1', 'bug 2', 'bug 1']
+        )
+        self.assertEqual(self.proxy.log, ['Bug.get'] * 2)
+
+    def test_chunk_size(self):
+        self.bz.bugs(range(1, 6), chunk_size=5)
+        self.assertEqual(self.proxy.log, ['Bug.get'])
+
+    def test_include_fields(self):
+        bugs = self.bz.bugs([1, 2], include_fields=['status'])
+        self.assertEqual(bugs[0].data, {'id': 1, 'status': 'NEW'})
+        self.assertNotIn('summary', bugs[0].data)
+        self.assertEqual(self.proxy.log, ['Bug.get'])
+
+        # missing fields are fetched once, on first access
+        self.assertEqual(bugs[0].data['summary'], 'bug 1')
+        with self.assertRaises(KeyError):
+            bugs[0].data['cc']
+        self.assertEqual(self.proxy.log, ['Bug.get'] * 2)
+        self.assertEqual(bugs[1].data.get('summary'), None)
+
+        # refetched with the same fields
+        _bug = self.bz.bug(1, include_fields=['summary'])
+        self.assertEqual(_bug.data, {'id': 1, 'summary': 'bug 1'})
+        bugs = bug.Bug.search(self.bz, include_fields=[], product='A')
+        self.assertEqual([x.data for x in bugs], [{'id': x} for x in (1, 2, 3)])
+
+    def test_prefetch(self):
+        bugs = [self.bz.bug(x) for x in [3, 1, 2, 1]]
+        bugs[0].comments = []
+        self.bz.prefetch_comments(bugs)
+        self.bz.prefetch_history(bugs)
+        self.assertEqual(
+            self.proxy.log,
+            ['Bug.comments', 'Bug.history', 'Bug.history']
+        )
+        self.assertEqual(bugs[0].comments, [])
+        self.assertEqual(bugs[3].comments, [{'id': 1, 'text': ''}])
+        self.assertEqual([x.history for x in bugs], [[{'who': 'u'}]] * 4)
+        # any iterable of bugs
+        bugs = self.bz.prefetch_comments(self.bz.bug(x) for x in [4, 5])
+        self.assertEqual([x.bugno for x in bugs], [4, 5])
+
+
+class IdentityMapTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p', identity_map_size='2')
+        self.bz.server = self.proxy = _Proxy()
+
+    def test_shared(self):
+        _bug = self.bz.bug(1, include_fields=['status'])
+        self.assertIs(self.bz.bug(1), _bug)
+        # not loaded yet; all fields are retrieved
+        self.assertEqual(_bug.data['summary'], 'bug 1')
+        bugs = self.bz.bugs([1, 2], include_fields=['status'])
+        self.assertIs(bugs[0], _bug)
+        self.assertEqual(self.proxy.log, ['Bug.get'] * 2)
+        found = list(bug.Bug.search(self.bz, include_fields=[], product='A'))
+        self.assertIs(found[0], _bug)
+        self.assertEqual(_bug.data['summary'], 'bug 1')
+        self.assertEqual(self.proxy.log, ['Bug.get'] * 2 + ['Bug.search'])
+
+    def test_invalidate(self):
+        bugs = self.bz.bugs([1, 2, 3])
+        self.bz.bug(1).update_block(add=[2])
+        # the changes reported for bug 1 are applied; bug 2 is reloaded
+        self.assertIsNotNone(bugs[0]._data)
+        self.assertIsNone(bugs[1]._data)
+        self.assertIsNotNone(bugs[2]._data)
+
+    def test_invalidate_comments(self):
+        _bug = self.bz.bug(1)
+        _bug.comments = []
+        _bug.update(priority='P1')
+        self.assertEqual(_bug.comments, [])
+        _bug.update(priority='P2', comment={'body': 'Why'})
+        _bug.comments
+        self.assertEqual(
+            self.proxy.log, ['Bug.update', 'Bug.update', 'Bug.comments'])
+
+    def test_evict(self):
+        bugs = self.bz.bugs([1, 2, 3])
+        self.assertIs(self.bz.bug(1), bugs[0])  # still referenced
+        ref = weakref.ref(bugs[0])
+        del bugs
+        self.bz.bug(4)
+        self.bz.bug(5)
+        self.assertIsNone(ref())
+        self.assertEqual(len(self.bz.identity_map), 2)
+
+
+class TokenTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self._path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self._path)
+        self.bz = self._bugzilla()
+
+    def tearDown(self):
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+    def _bugzilla(self):
+        bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p',
+            session='token', token_file=self._path, identity_map_size='0'
+        )
+        bz.server = self.proxy = _Proxy()
+        return bz
+
+    def test_login_once(self):
+        self.bz.bugs([1])
+        self.bz.bugs([2])
+        self.assertEqual(self.proxy.log, ['User.login', 'Bug.get', 'Bug.get'])
+        self.assertEqual(os.stat(self._path).st_mode & 0o777, 0o600)
+
+        # token is reused by the next client
+        self.bz = self._bugzilla()
+        self.bz.bugs([1])
+        self.assertEqual(self.proxy.log, ['Bug.get'])
+
+    def test_refresh(self):
+        self.bz.bugs([1])
+        self.proxy.token = 'tok2'
+        self.bz.bugs([1])
+        with self.bz.batch():
+            self.bz.bug(1).update(priority='P1')
+        self.proxy.token = 'tok3'
+        with self.bz.batch():
+            self.bz.bug(1).update(priority='P1')
+        self.assertEqual(self.proxy.log, [
+            'User.login', 'Bug.get',
+            'Bug.get', 'User.login', 'Bug.get',
+            'system.multicall',
+            'system.multicall', 'User.login', 'system.multicall',
+        ])
+        self.assertEqual(self.proxy.updated, [1, 1])
+
+    def test_refresh_search(self):
+        self.bz.login()
+        self.proxy.token = 'tok2'
+        bugs = bug.Bug.search(self.bz, status='NEW')
+        self.assertEqual(
+            self.proxy.log,
+            ['User.login', 'Bug.search', 'User.login', 'Bug.search']
+        )
+        self.assertEqual([x.bugno for x in bugs], [1, 2, 3])
+
+    def test_password(self):
+        bz = bugzilla.Bugzilla('http://bugzilla.example.com/', 'u', 'p')
+        bz.server = proxy = _Proxy()
+        bz.bugs([1])
+        self.assertEqual(proxy.log, ['Bug.get'])
+        self.assertFalse(os.path.exists(self._path))
+
+
+class MapTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bz = bugzilla.Bugzilla(
+            'http://bugzilla.example.com/', 'u', 'p', jobs='4')
+        self.bz.server = self.proxy = _Proxy()
+
+    def test_order(self):
+        def fn(x):
+            if x == 3:
+                raise ValueError(x)
+            return x * 2
+        jobs = self.bz.map(fn, range(10))
+        self.assertEqual([job.item for job in jobs], list(range(10)))
+        self.assertEqual(
+            [job.result for job in jobs],
+            [0, 2, 4, None, 8, 10, 12, 14, 16, 18]
+        )
+        self.assertIsInstance(jobs[3].error, ValueError)
+
+    def test_batch(self):
+        with self.bz.batch() as batch:
+            jobs = self.bz.map(
+                lambda x: self.bz.bug(x).update(priority='P1'), [1, 0, 2])
+            self.assertEqual(self.proxy.log, [])
+            batch.flush()
+        self.assertEqual(self.proxy.log, ['system.multicall'])
+        self.assertEqual(sorted(self.proxy.updated), [1, 2])
+        self.assertEqual(jobs[1].result.fault.faultCode, 101)
+
+    def test_fallback(self):
+        self.proxy.multicall = False
+        self.bz._multicall_supported = False
+        with self.bz.batch():
+            self.bz.map(
+                lambda x: self.bz.bug(x).update(priority='P1'), range(1, 9))
+        self.assertEqual(self.proxy.log, ['Bug.update'] * 8)
+        self.assertEqual(sorted(self.proxy.updated), list(range(1, 9)))
@@ -0,0 +1,129 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from . import bugzilla
+from . import cache
+from . import fakeserver
+
+URL = 'http://bugzilla.example.com/'
+
+
+class MetadataCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = cache.MetadataCache(self.dir, ttl=10, max_stale=100)
+        self.fetched = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def fetch(self, value):
+        def fetch():
+            self.fetched.append(value)
+            return value
+        return fetch
+
+    def _age(self, seconds):
+        for name in os.listdir(self.dir):
+            path = os.path.join(self.dir, name)
+            entry = self.cache._read(path)
+            entry['time'] -= seconds
+            self.cache._write(path, entry)
+
+    def test_get(self):
+        self.assertEqual(self.cache.get(URL, 'u', 'x', self.fetch(1)), 1)
+        self.assertEqual(self.cache.get(URL, 'u', 'x', self.fetch(2)), 1)
+        self.assertEqual(self.cache.get(URL, 'v', 'x', self.fetch(3)), 3)
+        self.assertEqual(
+            self.cache.get(URL, 'u', 'x', self.fetch(4), refresh=True), 4)
+        self.assertEqual(self.fetched, [1, 3, 4])
+
+    def test_stale(self):
+        self.cache.get(URL, 'u', 'x', self.fetch(1))
+        self._age(50)
+        # the stale value is returned and refreshed in the background
+        self.assertEqual(self.cache.get(URL, 'u', 'x', self.fetch(2)), 1)
+        self.cache.wait()
+        self.assertEqual(self.cache.get(URL, 'u', 'x', self.fetch(3)), 2)
+        self._age(500)
+        self.assertEqual(self.cache.get(URL, 'u', 'x', self.fetch(4)), 4)
+
+    def test_evict(self):
+        self.cache.set(URL, 'u', 'size', 'x' * 50)
+        size = os.path.getsize(self.cache._file(URL, 'u', 'size'))
+        self.cache.max_size = 3 * size
+        for i in range(10):
+            self.cache.set(URL, 'u', str(i), 'x' * 50)
+            path = self.cache._file(URL, 'u', str(i))
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        self.cache.set(URL, 'u', 'last', 'x' * 50)
+        sizes = [os.path.getsize(os.path.join(self.dir, x))
+                 for x in os.listdir(self.dir)]
+        self.assertEqual(len(sizes), 3)
+        self.assertEqual(
+            self.cache.get(URL, 'u', '9', self.fetch(None)), 'x' * 50)
+        self.assertEqual(self.cache.get(URL, 'u', '0', self.fetch(0)), 0)
+
+    def test_clear(self):
+        self.cache.set(URL, 'u', 'x', 1)
+        self.cache.set(URL, 'v', 'x', 1)
+        self.cache.clear(URL, 'u')
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class BugzillaCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.server = fakeserver.FakeServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def _bz(self, **config):
+        return bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache_dir=self.dir,
+            **config)
+
+    def test_invocations(self):
+        bz = self._bz()
+        fields = bz.get_fields()
+        products = bz.get_products()
+        bz.match_users('user')
+        bz.close()
+        requests = self.server.requests
+
+        bz = self._bz()
+        self.assertEqual(bz.get_fields(), fields)
+        self.assertEqual(bz.get_products(), products)
+        bz.match_users('user')
+        self.assertEqual(self.server.requests, requests)
+        bz.get_fields(use_cache=False)
+        self.assertEqual(self.server.requests, requests + 1)
+        bz.close()
+
+        bz = self._bz(cache='off')
+        bz.get_fields()
+        self.assertEqual(self.server.requests, requests + 2)
+        bz.close()
@@ -0,0 +1,97 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import bugzilla
+from . import cassette
+from . import fakeserver
+from . import session
+
+
+class CassetteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cassette.gz')
+        self.server = fakeserver.FakeServer().start()
+        self.server.store.populate(10, comments=2)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def _bz(self, **config):
+        return bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'secret', chunk_size='4',
+            **config)
+
+    def _workload(self, bz):
+        bugs = bz.bugs(range(1, 11))
+        with bz.batch():
+            bugs[0].update(priority='P1')
+        comments = list(bz.iter_comments([1, 2]))
+        with self.assertRaises(xmlrpclib.Fault):
+            bz.bug(99).data
+        return (
+            [x.data for x in bugs],
+            bz.bug(1).data['priority'],
+            comments,
+        )
+
+    def test_record_replay(self):
+        bz = self._bz(record=self.path)
+        recorded = self._workload(bz)
+        bz.close()
+        requests = self.server.requests
+        with gzip.open(self.path, 'rb') as fh:
+            self.assertNotIn(b'secret', fh.read())
+
+        bz = self._bz(replay=self.path)
+        self.assertEqual(self._workload(bz), recorded)
+        self.assertEqual(self.server.requests, requests)
+        self.assertEqual(bz.cassette.remaining(), 0)
+        with self.assertRaises(cassette.CassetteError):
+            bz.bug(2).comments
+        self.assertEqual(bz.cassette.header['url'], self.server.url)
+
+    def test_unclosed(self):
+        bz = self._bz(record=self.path)
+        bz.bug(1).data
+        header, calls = cassette.load(self.path)
+        self.assertEqual(header['cassette'], cassette.VERSION)
+        self.assertEqual([x['method'] for x in calls], ['Bug.get'])
+        bz.close()
+
+    def test_tokens(self):
+        token_file = os.path.join(self.dir, 'tokens')
+        tokens = session.TokenStore(token_file)
+        tokens.set(self.server.url, 'user@example.com', 'saved')
+        for config in [{'record': self.path}, {'replay': self.path}]:
+            bz = self._bz(session='token', token_file=token_file, **config)
+            bz.bug(1).data
+            bz.close()
+        # the saved token was neither used nor replaced
+        self.assertEqual(
+            tokens.get(self.server.url, 'user@example.com'), 'saved')
@@ -0,0 +1,65 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import sys
+import unittest
+
+from . import bugzilla
+from . import command
+from . import fakeserver
+
+
+class CommandTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeserver.FakeServer().start()
+        self.server.store.populate(3)
+        self._stderr, sys.stderr = sys.stderr, _Output()
+
+    def tearDown(self):
+        sys.stderr = self._stderr
+        self.server.stop()
+
+    def _run(self, cls, **kwargs):
+        args = dict(
+            url=self.server.url, user='user@example.com', password='p',
+            server=None, jobs=None, message=None)
+        args.update(kwargs)
+        cmd = cls(argparse.Namespace(**args), None, {}, {}, None)
+        cmd.bz.close()
+        cmd.bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off')
+        try:
+            return cmd()
+        finally:
+            cmd.bz.close()
+
+    def test_comment_error(self):
+        with self.assertRaises(UserWarning):
+            self._run(
+                command.Comment, bugs=[1, 999], message='Hello',
+                is_private=False)
+        self.assertIn('Bug 999:', sys.stderr.getvalue())
+        self.assertEqual(
+            self.server.store.comments[1][-1]['text'], 'Hello')
+
+
+class _Output(list):
+    def write(self, s):
+        self.append(s)
+
+    def getvalue(self):
+        return ''.join(self)
@@ -0,0 +1,148 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import time
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import bugzilla
+from . import fakeserver
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = fakeserver.Store(users=['a@example.com', 'b@example.com'])
+        self.store.populate(10, comments=2)
+
+    def test_get(self):
+        result = self.store.Bug_get(
+            {'ids': [2, 1], 'include_fields': ['id', 'status']})
+        self.assertEqual(result['bugs'], [
+            {'id': 2, 'status': 'CONFIRMED'},
+            {'id': 1, 'status': 'UNCONFIRMED'},
+        ])
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            self.store.Bug_get({'ids': [11]})
+        self.assertEqual(cm.exception.faultCode, fakeserver.FAULT_INVALID_BUG)
+
+    def test_search(self):
+        bugs = self.store.Bug_search({'status': ['RESOLVED', 'VERIFIED']})
+        self.assertEqual([x['id'] for x in bugs['bugs']], [4, 5, 9, 10])
+        bugs = self.store.Bug_search(
+            {'summary': 'bug 1', 'limit': 1, 'offset': 1})
+        self.assertEqual([x['id'] for x in bugs['bugs']], [10])
+
+    def test_update(self):
+        result = self.store.Bug_update({
+            'Bugzilla_login': 'b@example.com',
+            'ids': [1],
+            'status': 'RESOLVED',
+            'resolution': 'FIXED',
+            'blocks': {'add': [2]},
+            'comment': {'body': 'fixed'},
+        })
+        self.assertEqual(
+            result['bugs'][0]['changes']['status'],
+            {'added': 'RESOLVED', 'removed': 'UNCONFIRMED'}
+        )
+        self.assertFalse(self.store.bugs[1]['is_open'])
+        self.assertEqual(self.store.bugs[2]['depends_on'], [1])
+        history = self.store.Bug_history({'ids': [1]})['bugs'][0]['history']
+        self.assertEqual(history[0]['who'], 'b@example.com')
+        self.assertEqual(
+            [x['field_name'] for x in history[0]['changes']],
+            ['blocks', 'resolution', 'status']
+        )
+        comments = self.store.Bug_comments({'ids': [1]})['bugs']['1']
+        self.assertEqual(
+            [x['text'] for x in comments['comments']][-1], 'fixed')
+
+        with self.assertRaises(xmlrpclib.Fault):
+            self.store.Bug_update({'ids': [1], 'bogus': 1})
+
+    def test_create(self):
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            self.store.Bug_create({'product': 'TestProduct'})
+        self.assertEqual(
+            cm.exception.faultCode, fakeserver.FAULT_PARAM_REQUIRED)
+        result = self.store.Bug_create({
+            'product': 'TestProduct', 'component': 'Component B',
+            'summary': 'new', 'version': '1.0', 'description': 'text',
+        })
+        self.assertEqual(result, {'id': 11})
+        self.assertEqual(self.store.bugs[11]['component'], 'Component B')
+        self.assertEqual(self.store.comments[11][0]['text'], 'text')
+
+
+class FakeServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeserver.FakeServer().start()
+        self.server.store.populate(20)
+        self.bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'pw', chunk_size='5')
+
+    def tearDown(self):
+        self.bz.close()
+        self.server.stop()
+
+    def test_client(self):
+        bugs = self.bz.bugs(range(1, 21))
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(bugs[4].data['summary'], 'Generated bug 5')
+        with self.bz.batch():
+            for x in bugs:
+                x.update(priority='P1')
+        self.assertEqual(self.server.requests, 8)  # by multicall
+        self.assertEqual(
+            set(x['priority'] for x in self.server.store.bugs.values()),
+            set(['P1'])
+        )
+        self.assertEqual(self.bz.get_products()[0]['name'], 'TestProduct')
+        self.assertEqual(
+            self.bz.match_one_user('user')['name'], 'user@example.com')
+
+    def test_token(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'pw', session='token',
+            token_file=path)
+        try:
+            self.assertEqual(bz.bug(1).data['id'], 1)
+            self.assertEqual(len(self.server.store.tokens), 1)
+        finally:
+            bz.close()
+            os.remove(path)
+
+    def test_latency(self):
+        self.server.latency = 0.1
+        start = time.time()
+        self.bz.bugs([1, 2, 3])
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+    def test_bandwidth(self):
+        self.server.bandwidth = 4000
+        start = time.time()
+        self.bz.rpc('Bug', 'comments', ids=list(range(1, 21)))
+        # the response is gzipped; the bytes sent are throttled
+        size = self.bz.transport.bytes_received
+        self.assertGreaterEqual(time.time() - start, size / 4000.0)
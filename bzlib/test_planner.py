@@ -0,0 +1,137 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from . import bugzilla
+from . import fakeserver
+from . import planner
+
+
+class ReduceChangesTestCase(unittest.TestCase):
+    def test_scalars(self):
+        data = {'priority': 'P1', 'status': 'RESOLVED', 'remaining_time': 2}
+        self.assertEqual(
+            planner.reduce_changes(data, {
+                'priority': 'P1', 'status': 'VERIFIED',
+                'remaining_time': 2.0, 'version': '1.0',
+            }),
+            {'status': 'VERIFIED', 'version': '1.0'})
+
+    def test_lists(self):
+        data = {'cc': ['a', 'b'], 'blocks': [1, 2]}
+        self.assertEqual(
+            planner.reduce_changes(data, {
+                'cc': {'add': ['a', 'c'], 'remove': ['d']},
+                'blocks': {'set': [2, 1]},
+            }),
+            {'cc': {'add': ['c']}})
+        self.assertEqual(
+            planner.reduce_changes(data, {'blocks': {'set': [1]}}),
+            {'blocks': {'set': [1]}})
+
+    def test_comment(self):
+        comment = {'body': 'Why'}
+        data = {'priority': 'P1'}
+        self.assertEqual(
+            planner.reduce_changes(
+                data, {'priority': 'P1', 'comment': comment}),
+            {'comment': comment})
+        self.assertEqual(
+            planner.reduce_changes(
+                data, {'priority': 'P2', 'comment': comment}),
+            {'priority': 'P2', 'comment': comment})
+        self.assertEqual(
+            planner.reduce_changes(data, {'priority': 'P1', 'work_time': 1}),
+            {'work_time': 1})
+
+
+class PlanTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = fakeserver.FakeServer().start()
+        # priorities P1, P2, ..., P5, P1, ...
+        self.server.store.populate(10)
+        self.bz = bugzilla.Bugzilla(
+            self.server.url, 'user@example.com', 'p', cache='off',
+            chunk_size='4')
+        self.calls = []
+        self.bz.observers.append(lambda call: self.calls.append(call.method))
+
+    def tearDown(self):
+        self.bz.close()
+        self.server.stop()
+
+    def test_skip(self):
+        bugnos = list(range(1, 11))
+        plan = self.bz.plan_update(bugnos, {'priority': 'P1'})
+        self.assertEqual(self.calls, ['Bug.get'] * 3)
+        self.assertEqual(plan.unchanged, [1, 6])
+        self.assertEqual(len(plan.groups), 1)
+        self.assertEqual(plan.rpcs, 2)
+        lines = plan.format()
+        self.assertEqual(lines[0], 'Bug 2, 3, 4, 5, 7, 8, 9, 10:')
+        self.assertEqual(lines[-1], '8 bugs to update; 2 Bug.update calls.')
+
+        jobs = plan.execute()
+        self.assertEqual([x.item for x in jobs], [2, 3, 4, 5, 7, 8, 9, 10])
+        self.assertTrue(all(x.error is None for x in jobs))
+        self.assertEqual(self.calls[3:], ['Bug.update'] * 2)
+        bugs = self.server.store.bugs
+        self.assertEqual(set(bugs[x]['priority'] for x in bugnos), set(['P1']))
+
+    def test_comment(self):
+        comment = {'body': 'Late comment'}
+        plan = self.bz.plan_update(
+            [1, 2], {'priority': 'P1', 'comment': comment})
+        # the comment is added to bug 1 although its priority is P1
+        self.assertEqual(plan.groups, [
+            ({'comment': comment}, [1]),
+            ({'priority': 'P1', 'comment': comment}, [2]),
+        ])
+        self.assertEqual(plan.unchanged, [])
+        jobs = plan.execute()
+        self.assertTrue(all(x.error is None for x in jobs))
+        self.assertEqual(
+            [self.server.store.comments[x][-1]['text'] for x in [1, 2]],
+            ['Late comment'] * 2)
+
+    def test_groups(self):
+        plan = self.bz.plan_update(
+            [1, 2, 3],
+            lambda _bug: {'priority': 'P2', 'cc': {'add': ['a@example.com']}}
+            if _bug.data['priority'] == 'P1' else {'priority': 'P3'},
+            fields=['priority', 'cc'])
+        self.assertEqual(
+            [bugnos for changes, bugnos in plan.groups], [[1], [2]])
+        self.assertEqual(plan.unchanged, [3])
+        self.assertEqual(plan.rpcs, 2)
+
+    def test_errors(self):
+        plan = self.bz.plan_update([1, 99, 2], {'priority': 'P2'})
+        self.assertEqual([x for x, e in plan.errors], [99])
+        self.assertEqual(plan.groups, [({'priority': 'P2'}, [1])])
+        self.assertEqual(plan.unchanged, [2])
+
+    def test_stale(self):
+        _bug = self.bz.bug(1)
+        self.assertEqual(_bug.data['priority'], 'P1')
+        self.server.store.bugs[1]['priority'] = 'P3'
+        plan = self.bz.plan_update([1], {'priority': 'P1'})
+        # the current value was retrieved, though the bug was loaded
+        self.assertEqual(plan.groups, [({'priority': 'P1'}, [1])])
+        self.assertEqual(_bug.data['priority'], 'P3')
+        plan.execute()
+        self.assertEqual(self.server.store.bugs[1]['priority'], 'P1')
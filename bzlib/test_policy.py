@@ -0,0 +1,157 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import time
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import policy
+
+
+def _unavailable(headers=None):
+    return xmlrpclib.ProtocolError(
+        'bugzilla.example.com/xmlrpc.cgi', 503, 'Service Unavailable',
+        headers or {})
+
+
+class _Flaky(object):
+    """Callable that raises the given errors, then returns ``'ok'``."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+class PolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.policy = policy.Policy(retries=2)
+        self.delays = []
+        self.policy.sleep = self.delays.append
+
+    def test_retry(self):
+        fn = _Flaky(_unavailable(), socket.timeout())
+        self.assertEqual(self.policy.call('Bug.get', fn), 'ok')
+        self.assertEqual(fn.calls, 3)
+        self.assertEqual(len(self.delays), 2)
+        self.assertTrue(0 <= self.delays[1] <= 2 * self.policy.backoff)
+
+        fn = _Flaky(_unavailable(), _unavailable(), _unavailable())
+        with self.assertRaises(xmlrpclib.ProtocolError):
+            self.policy.call('Bug.get', fn)
+        self.assertEqual(fn.calls, 3)
+
+    def test_no_retry(self):
+        for method, error in [
+            ('Bug.update', _unavailable()),
+            ('Bug.get', xmlrpclib.Fault(101, 'no such bug')),
+            ('Bug.get', socket.gaierror()),
+            ('Bug.get', xmlrpclib.ProtocolError('', 404, 'Not Found', {})),
+        ]:
+            fn = _Flaky(error)
+            with self.assertRaises(type(error)):
+                self.policy.call(method, fn)
+            self.assertEqual(fn.calls, 1)
+        self.assertEqual(self.delays, [])
+
+    def test_retry_after(self):
+        fn = _Flaky(_unavailable({'Retry-After': '7'}))
+        self.policy.call('Bug.search', fn)
+        self.assertEqual(self.delays, [7.0])
+
+        # the delay would pass the deadline
+        self.policy.timeout = 5
+        fn = _Flaky(_unavailable({'Retry-After': '7'}))
+        with self.assertRaises(xmlrpclib.ProtocolError):
+            self.policy.call('Bug.search', fn)
+
+    def test_deadline(self):
+        self.policy.timeout = 10
+
+        def fn():
+            return policy.remaining()
+        self.assertTrue(9 < self.policy.call('Bug.get', fn) <= 10)
+        self.assertIsNone(policy.remaining())
+
+        with policy.deadline(time.time() - 1):
+            self.assertRaises(policy.DeadlineExceeded, policy.remaining)
+            # nested deadlines cannot extend the outer one
+            with policy.deadline(time.time() + 10):
+                self.assertRaises(policy.DeadlineExceeded, policy.remaining)
+
+    def test_limiter_deadline(self):
+        self.policy.timeout = 0.1
+        self.policy.limiter = policy.Limiter(maximum=1)
+        token = self.policy.limiter.acquire('Bug.get')
+        start = time.time()
+        # waits for the busy limiter only until the deadline
+        with self.assertRaises(policy.DeadlineExceeded):
+            self.policy.call('Bug.get', _Flaky())
+        self.assertLess(time.time() - start, 1)
+        self.policy.limiter.release(token)
+        self.assertEqual(self.policy.call('Bug.get', _Flaky()), 'ok')
+
+
+class LimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.limiter = policy.Limiter(maximum=4)
+        self.limiter.clock = lambda: self.now
+
+    def _calls(self, n, latency=0.1, overloaded=False):
+        tokens = [self.limiter.acquire('Bug.get') for i in range(n)]
+        self.now += latency
+        for token in tokens:
+            self.limiter.release(token, overloaded)
+
+    def test_decrease(self):
+        self._calls(4, overloaded=True)
+        # decreased once for the calls in progress
+        self.assertEqual(self.limiter.limit, 2)
+        self._calls(2, overloaded=True)
+        self.assertEqual(self.limiter.limit, 1)
+        self._calls(1, overloaded=True)
+        self.assertEqual(self.limiter.limit, 1)
+
+    def test_slow(self):
+        self._calls(4)
+        self._calls(4, latency=0.2)
+        self.assertEqual(self.limiter.limit, 4)
+        self._calls(4, latency=2.0)
+        self.assertEqual(self.limiter.limit, 2)
+
+    def test_increase(self):
+        self._calls(4, overloaded=True)
+        limits = []
+        while self.limiter.limit < 4:
+            self._calls(int(self.limiter.limit))
+            limits.append(self.limiter.limit)
+        # about one more call in progress for each round at the limit
+        self.assertEqual(limits[0], 2.5)
+        self.assertEqual(len(limits), 6)
+        self._calls(4)
+        self.assertEqual(self.limiter.limit, 4)
+        self.assertEqual(self.limiter.in_flight, 0)
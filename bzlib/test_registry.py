@@ -0,0 +1,73 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from . import bug
+from . import registry
+
+FIELDS = [
+    {'name': 'summary', 'display_name': 'Summary'},
+    {'name': 'priority', 'display_name': 'Priority', 'values': [
+        {'name': 'P2', 'sortkey': 200},
+        {'name': '', 'sortkey': 0},
+        {'name': 'P1', 'sortkey': 100},
+    ]},
+    {'name': 'component', 'value_field': 'product', 'values': [
+        {'name': 'B', 'sortkey': 2, 'visibility_values': ['X', 'Y']},
+        {'name': 'A', 'sortkey': 1, 'visibility_values': ['X']},
+        {'sortkey': 0},
+    ]},
+]
+
+
+class FieldRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.registry = registry.FieldRegistry(FIELDS)
+
+    def _names(self, *args, **kwargs):
+        return [x['name'] for x in self.registry.values(*args, **kwargs)]
+
+    def test_lookup(self):
+        self.assertIs(self.registry['summary'], FIELDS[0])
+        self.assertIn('priority', self.registry)
+        self.assertNotIn('bogus', self.registry)
+        self.assertEqual(self.registry.names('priority'), set(['P1', 'P2', '']))
+        with self.assertRaises(KeyError):
+            self.registry.names('summary')
+
+    def test_values(self):
+        self.assertEqual(self._names('priority'), ['P1', 'P2'])
+        self.assertEqual(
+            self._names('priority', sort=False, omit_empty=False),
+            ['P2', '', 'P1'])
+        self.assertEqual(self._names('component'), ['A', 'B'])
+        self.assertEqual(
+            self._names('component', visible_for={'product': 'Y'}), ['B'])
+        self.assertEqual(
+            self._names('component', visible_for={'product': 'Z'}), [])
+        self.assertEqual(
+            self._names('priority', visible_for={'product': 'Y'}),
+            ['P1', 'P2'])
+
+    def test_search_params(self):
+        params = bug.Bug._search_params(
+            {'not_priority': ['P1'], 'not_product': ['X']},
+            lambda: [{'name': 'X'}, {'name': 'Y'}],
+            lambda: self.registry
+        )
+        self.assertEqual(sorted(params['priority']), ['', 'P2'])
+        self.assertEqual(params['product'], ['Y'])
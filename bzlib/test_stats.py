@@ -0,0 +1,89 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import json
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import stats
+from . import transport
+
+
+def _call(method, latency, error=None, retries=0):
+    call = stats.Call(method)
+    tally = transport.Tally()
+    tally.data_sent = 100
+    tally.data_received = 1000
+    call.finish(tally, error)
+    call.latency = latency
+    call.retries = retries
+    return call
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_percentile(self):
+        h = stats.Histogram()
+        self.assertIsNone(h.percentile(50))
+        for i in range(99):
+            h.add(0.010)
+        h.add(1.5)
+        self.assertEqual(h.count, 100)
+        self.assertAlmostEqual(h.mean, 0.0249)
+        # within a factor of two
+        self.assertTrue(0.010 <= h.percentile(50) < 0.020)
+        self.assertTrue(0.010 <= h.percentile(99) < 0.020)
+        self.assertEqual(h.percentile(100), 1.5)
+
+
+class StatsTestCase(unittest.TestCase):
+    def test_aggregate(self):
+        s = stats.Stats()
+        s(_call('Bug.get', 0.1, retries=2))
+        s(_call('Bug.get', 0.3))
+        s(_call('Bug.update', 0.2, xmlrpclib.Fault(101, 'no such bug')))
+        get = s.methods['Bug.get']
+        self.assertEqual((get.calls, get.retries, get.errors), (2, 2, 0))
+        self.assertEqual(get.response_size, 2000)
+        self.assertEqual(s.methods['Bug.update'].faults, {101: 1})
+
+        total = s.total()
+        self.assertEqual((total.calls, total.errors), (3, 1))
+        self.assertEqual(total.params_size, 300)
+        self.assertEqual(total.latency.maximum, 0.3)
+
+        lines = s.format().splitlines()
+        self.assertEqual(lines[0].split(), list(stats.Stats.columns))
+        self.assertEqual(
+            lines[1].split()[:6], ['Bug.get', '2', '2', '0', '200', '2000'])
+        self.assertEqual(lines[-1].split()[:2], ['total', '3'])
+
+
+class TraceTestCase(unittest.TestCase):
+    def test_trace(self):
+        f = io.StringIO() if str is not bytes else io.BytesIO()
+        trace = stats.Trace(f)
+        trace(_call('Bug.get', 0.1))
+        trace(_call('Bug.get', 0.1, xmlrpclib.Fault(101, 'no such bug')))
+        records = [json.loads(x) for x in f.getvalue().splitlines()]
+        self.assertEqual([x['fault'] for x in records], [None, 101])
+        self.assertEqual(records[0]['method'], 'Bug.get')
+        self.assertEqual(records[0]['response_size'], 1000)
+        self.assertIsNone(records[0]['error'])
@@ -0,0 +1,78 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import unittest
+
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import stream
+
+
+COMMENTS = {
+    'bugs': {
+        '1': {'comments': [{'id': 1, 'text': 'a'}, {'id': 2, 'text': 'b'}]},
+        '2': {'comments': [{'id': 3, 'text': 'c'}]},
+    },
+    'comments': {},
+}
+
+
+def _response(result, size=7):
+    data = xmlrpclib.dumps((result,), methodresponse=True).encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterparseTestCase(unittest.TestCase):
+    def test_items(self):
+        when = datetime.datetime(2015, 4, 25, 1, 2, 3)
+        result = {'bugs': [{'id': 1, 'creation_time': when}, {'id': 2}]}
+        items = list(stream.iterparse(
+            _response(result), [('bugs',)], use_datetime=True))
+        self.assertEqual(items, [(('bugs',), x) for x in result['bugs']])
+
+    def test_incremental(self):
+        chunks = iter(_response({'bugs': [{'id': 1}, {'id': 2}]}))
+        items = stream.iterparse(chunks, [('bugs',)])
+        self.assertEqual(next(items), (('bugs',), {'id': 1}))
+        # the second item arrives before the response has been read
+        self.assertEqual(next(items), (('bugs',), {'id': 2}))
+        self.assertTrue(list(chunks))
+
+    def test_wildcard(self):
+        items = sorted(
+            (path, x['id']) for path, x in stream.iterparse(
+                _response(COMMENTS), [('bugs', stream.ANY, 'comments')])
+        )
+        self.assertEqual(items, [
+            (('bugs', '1', 'comments'), 1),
+            (('bugs', '1', 'comments'), 2),
+            (('bugs', '2', 'comments'), 3),
+        ])
+        self.assertEqual(
+            sorted(items),
+            sorted((p, x['id']) for p, x in stream.walk(
+                COMMENTS, [('bugs', stream.ANY, 'comments')]))
+        )
+
+    def test_fault(self):
+        data = xmlrpclib.dumps(xmlrpclib.Fault(101, 'no such bug'))
+        with self.assertRaises(xmlrpclib.Fault) as cm:
+            list(stream.iterparse([data.encode('utf-8')], [('bugs',)]))
+        self.assertEqual(cm.exception.faultCode, 101)
@@ -0,0 +1,243 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import socket
+import threading
+import time
+import unittest
+import zlib
+
+try:
+    import SimpleXMLRPCServer as xmlrpcserver
+    import SocketServer as socketserver
+except ImportError:
+    import xmlrpc.server as xmlrpcserver
+    import socketserver
+
+from . import bugzilla
+from . import stats
+from . import transport
+
+
+class _RequestHandler(xmlrpcserver.SimpleXMLRPCRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    rpc_paths = ('/xmlrpc.cgi',)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, xmlrpcserver.SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+class _FakeConnection(object):
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeResponse(object):
+    def __init__(self, data, encoding):
+        self._data = io.BytesIO(data)
+        self._encoding = encoding
+
+    def getheader(self, name, default=None):
+        return self._encoding if name == 'Content-Encoding' else default
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+class BodyTestCase(unittest.TestCase):
+    data = b'comment text ' * 1000
+
+    def _read(self, data, encoding):
+        t = transport.Transport()
+        body = transport._Body(t, _FakeResponse(data, encoding))
+        self.assertEqual(body.read(), self.data)
+        return t
+
+    def test_identity(self):
+        t = self._read(self.data, None)
+        self.assertEqual(t.compression_ratio, 1.0)
+
+    def test_gzip(self):
+        t = self._read(transport._gzip(self.data), 'gzip')
+        self.assertGreater(t.compression_ratio, 10)
+
+    def test_deflate(self):
+        self._read(zlib.compress(self.data), 'deflate')
+        raw = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._read(raw.compress(self.data) + raw.flush(), 'deflate')
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    def test_size(self):
+        pool = transport.ConnectionPool(size=1)
+        conns = [_FakeConnection(), _FakeConnection()]
+        for conn in conns:
+            pool.release('example.com', conn)
+        self.assertFalse(conns[0].closed)
+        self.assertTrue(conns[1].closed)
+        self.assertEqual(pool.acquire('example.com'), (conns[0], True))
+        self.assertEqual(pool.reused, 1)
+
+    def test_timeout(self):
+        pool = transport.ConnectionPool(timeout=0)
+        conn = _FakeConnection()
+        pool.release('example.com', conn)
+        new, reused = pool.acquire('example.com')
+        self.assertIsNot(new, conn)
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+        self.assertEqual((pool.created, pool.reused, pool.expired), (1, 0, 1))
+
+    def test_hosts(self):
+        pool = transport.ConnectionPool()
+        conn = _FakeConnection()
+        pool.release('a.example.com', conn)
+        self.assertIsNot(pool.acquire('b.example.com')[0], conn)
+        self.assertIs(pool.acquire('a.example.com')[0], conn)
+
+
+class TransportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = _Server(
+            ('127.0.0.1', 0),
+            requestHandler=_RequestHandler,
+            logRequests=False,
+            allow_none=True
+        )
+        self.server.register_function(
+            lambda params: {'login': params['Bugzilla_login']},
+            'User.whoami'
+        )
+        self.server.register_function(
+            lambda params: {'bugs': [{'id': x} for x in range(params['n'])]},
+            'Bug.search'
+        )
+        self.server.register_function(
+            lambda params: {'length': len(params['comment'])},
+            'Bug.add_comment'
+        )
+        self.server.register_function(
+            lambda params: time.sleep(params['delay']),
+            'Bug.get'
+        )
+        self.url = 'http://{}:{}/'.format(*self.server.server_address)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_reuse(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p')
+        for i in range(3):
+            self.assertEqual(bz.rpc('User', 'whoami'), {'login': 'u'})
+        bz.close()
+        pool = bz.transport.pool
+        self.assertEqual((pool.created, pool.reused), (1, 2))
+
+    def test_config(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p', pool_size='0')
+        for i in range(2):
+            bz.rpc('User', 'whoami')
+        bz.close()
+        pool = bz.transport.pool
+        self.assertEqual((pool.created, pool.reused), (2, 0))
+
+    def test_stream(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p')
+        items = bz.rpc_iter([('bugs',)], 'Bug', 'search', n=3)
+        self.assertEqual(
+            [item for path, item in items],
+            [{'id': 0}, {'id': 1}, {'id': 2}]
+        )
+        # the connection is returned once the response is consumed
+        bz.rpc('User', 'whoami')
+        pool = bz.transport.pool
+        self.assertEqual((pool.created, pool.reused), (1, 1))
+
+        # an abandoned stream closes its connection
+        items = bz.rpc_iter([('bugs',)], 'Bug', 'search', n=3)
+        next(items)
+        items.close()
+        bz.rpc('User', 'whoami')
+        bz.close()
+        self.assertEqual((pool.created, pool.reused), (2, 2))
+
+    def test_compression(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p', compress_threshold='1000')
+        t = bz.transport
+        self.assertEqual(len(bz.rpc('Bug', 'search', n=1000)['bugs']), 1000)
+        self.assertGreater(t.compression_ratio, 2)
+
+        # small requests are sent as they are; large ones are compressed
+        bz.rpc('Bug', 'add_comment', comment='x')
+        self.assertEqual(t.bytes_sent, t.data_sent)
+        result = bz.rpc('Bug', 'add_comment', comment='x' * 10000)
+        self.assertEqual(result, {'length': 10000})
+        self.assertLess(t.bytes_sent * 2, t.data_sent)
+        bz.close()
+
+    def test_deadline(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p', timeout='0.2')
+        bz.policy.sleep = lambda delay: None
+        start = time.time()
+        with self.assertRaises(socket.timeout):
+            bz.rpc('Bug', 'get', delay=1)
+        # retries do not extend the deadline
+        self.assertLess(time.time() - start, 0.5)
+        bz.close()
+
+    def test_observers(self):
+        bz = bugzilla.Bugzilla(self.url, 'u', 'p')
+        calls = []
+        bz.observers.append(calls.append)
+        bz.rpc('Bug', 'search', n=100)
+        with self.assertRaises(Exception):
+            bz.rpc('Bug', 'nonexistent')
+        items = bz.rpc_iter([('bugs',)], 'Bug', 'search', n=1000)
+        self.assertEqual(len(calls), 2)  # streams are reported when done
+        self.assertEqual(len(list(items)), 1000)
+        bz.close()
+
+        self.assertEqual(
+            [x.method for x in calls],
+            ['Bug.search', 'Bug.nonexistent', 'Bug.search']
+        )
+        search, fault, stream = calls
+        self.assertIsNone(search.error)
+        self.assertEqual(search.retries, 0)
+        self.assertGreater(search.params_size, 0)
+        self.assertGreater(search.response_size, 100 * len('<member>'))
+        self.assertIsNotNone(fault.fault)
+        self.assertGreater(stream.response_size, search.response_size * 5)
+        for call in calls:
+            self.assertGreater(call.latency, 0)
+
+        totals = stats.Stats()
+        for call in calls:
+            totals(call)
+        self.assertEqual(totals.total().response_size, sum(
+            x.response_size for x in calls))
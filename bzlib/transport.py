@@ -0,0 +1,422 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import gzip
+import io
+import socket
+import threading
+import time
+import zlib
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+try:
+    import xmlrpclib
+except ImportError:
+    import xmlrpc.client as xmlrpclib
+
+from . import policy
+from . import stream as _stream
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_POOL_TIMEOUT = 60.0
+
+# size of the pieces in which streamed responses are read
+STREAM_CHUNK_SIZE = 64 * 1024
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+# zlib window bits for each supported content encoding
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+class ConnectionPool(object):
+    """A pool of persistent HTTP/1.1 connections, keyed by host.
+
+    Connections are handed out exclusively by ``acquire`` and returned
+    with ``release``; a pool may therefore be shared between threads.
+    At most ``size`` idle connections are kept per host, and idle
+    connections older than ``timeout`` seconds are discarded rather
+    than reused.
+
+    The ``created``, ``reused`` and ``expired`` counters record how
+    many connections were opened, how many requests were served by an
+    existing connection, and how many idle connections timed out.
+    """
+
+    def __init__(
+        self,
+        scheme='http',
+        size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_POOL_TIMEOUT
+    ):
+        if scheme == 'https':
+            self.connection_class = httplib.HTTPSConnection
+        else:
+            self.connection_class = httplib.HTTPConnection
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host):
+        """Return a ``(connection, reused)`` pair for the given host."""
+        now = time.time()
+        stale = []
+        try:
+            with self._lock:
+                idle = self._idle.get(host, [])
+                while idle:
+                    conn, released = idle.pop()
+                    if now - released < self.timeout:
+                        self.reused += 1
+                        return conn, True
+                    stale.append(conn)
+                    self.expired += 1
+                self.created += 1
+        finally:
+            for conn in stale:
+                conn.close()
+        return self.connection_class(host), False
+
+    def release(self, host, conn):
+        """Return a connection to the pool, or close it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self.size:
+                idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, released in conns:
+                conn.close()
+
+
+def _gzip(data):
+    buf = io.BytesIO()
+    f = gzip.GzipFile(fileobj=buf, mode='wb')
+    try:
+        f.write(data)
+    finally:
+        f.close()
+    return buf.getvalue()
+
+
+class _Body(object):
+    """Reader for a response body that undoes its ``Content-Encoding``.
+
+    Reads are counted in the byte counters of ``transport``, a
+    ``Compression``, and in the ``Tally`` current when the body is
+    created.
+    """
+
+    def __init__(self, transport, response):
+        self._transport = transport
+        self._tally = transport._current_tally()
+        self._response = response
+        encoding = (response.getheader('Content-Encoding') or '').lower()
+        self._encoding = encoding if encoding in _WBITS else None
+        if self._encoding:
+            self._decoder = zlib.decompressobj(_WBITS[self._encoding])
+        self._started = False
+        self._eof = False
+
+    def _decode(self, data):
+        try:
+            return self._decoder.decompress(data)
+        except zlib.error:
+            if self._started or self._encoding != 'deflate':
+                raise
+            # some servers send deflate data without the zlib header
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decoder.decompress(data)
+        finally:
+            self._started = True
+
+    def read(self, size=-1):
+        """Read up to ``size`` bytes of encoded data and decode them.
+
+        Return ``b''`` only at the end of the body.  If ``size`` is
+        negative, read the whole body.
+        """
+        if size < 0:
+            return b''.join(iter(lambda: self.read(STREAM_CHUNK_SIZE), b''))
+        while not self._eof:
+            data = self._response.read(size)
+            if not data:
+                self._eof = True
+                out = self._decoder.flush() if self._encoding else b''
+            else:
+                out = self._decode(data) if self._encoding else data
+            self._transport._count_received(len(data), len(out), self._tally)
+            if out:
+                return out
+        return b''
+
+
+class Tally(object):
+    """Counts of the bytes of request and response bodies.
+
+    ``bytes_sent`` and ``bytes_received`` count bytes as transferred,
+    and ``data_sent`` and ``data_received`` before compression or after
+    decompression.
+    """
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.data_sent = 0
+        self.data_received = 0
+
+
+class Compression(object):
+    """Compression of request and response bodies, with byte counters.
+
+    Compressed (gzip or deflate) responses are requested and decoded
+    as they are read.  Request bodies of at least ``compress_threshold``
+    bytes are sent gzipped; if ``None``, requests are not compressed.
+
+    The ``bytes_sent`` and ``bytes_received`` counters record the size
+    of request and response bodies as transferred, and ``data_sent``
+    and ``data_received`` their size before compression or after
+    decompression.  ``tally`` counts the bytes of particular requests.
+    """
+
+    def __init__(self, compress_threshold=None):
+        self.compress_threshold = compress_threshold
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.data_sent = 0
+        self.data_received = 0
+        self._counter_lock = threading.Lock()
+        self._tallies = threading.local()
+
+    @property
+    def compression_ratio(self):
+        """Ratio of decoded to transferred response bytes, or ``None``."""
+        with self._counter_lock:
+            if not self.bytes_received:
+                return None
+            return float(self.data_received) / self.bytes_received
+
+    def _encode(self, body, headers):
+        """Return the body to send, compressing it if appropriate.
+
+        Content negotiation headers are added to ``headers``.
+        """
+        headers['Accept-Encoding'] = ACCEPT_ENCODING
+        if body is None:
+            return None
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        size = len(body)
+        if self.compress_threshold is not None \
+                and size >= self.compress_threshold:
+            body = _gzip(body)
+            headers['Content-Encoding'] = 'gzip'
+        self._count_sent(len(body), size, self._current_tally())
+        return body
+
+    @contextlib.contextmanager
+    def tally(self):
+        """Count the bytes of the requests the current thread makes.
+
+        Yield a ``Tally`` of the requests made in the block and their
+        responses, including parts of responses read after the block.
+        """
+        tally = Tally()
+        previous = self._current_tally()
+        self._tallies.current = tally
+        try:
+            yield tally
+        finally:
+            self._tallies.current = previous
+
+    def _current_tally(self):
+        return getattr(self._tallies, 'current', None)
+
+    def _count_sent(self, sent, data, tally=None):
+        with self._counter_lock:
+            self.bytes_sent += sent
+            self.data_sent += data
+            if tally is not None:
+                tally.bytes_sent += sent
+                tally.data_sent += data
+
+    def _count_received(self, received, data, tally=None):
+        with self._counter_lock:
+            self.bytes_received += received
+            self.data_received += data
+            if tally is not None:
+                tally.bytes_received += received
+                tally.data_received += data
+
+
+class Transport(xmlrpclib.Transport, Compression):
+    """XML-RPC transport that keeps connections alive between requests.
+
+    Connections are taken from a ``ConnectionPool`` which may be shared
+    by several transports and threads.  ``http_request`` makes other
+    kinds of HTTP requests (e.g. JSON-RPC) over the same connections.
+    Bodies are compressed as described for ``Compression``.
+    """
+
+    def __init__(
+        self,
+        scheme='http',
+        use_datetime=False,
+        pool=None,
+        compress_threshold=None
+    ):
+        xmlrpclib.Transport.__init__(self, use_datetime)
+        Compression.__init__(self, compress_threshold)
+        self.pool = pool or ConnectionPool(scheme)
+
+    def request(self, host, handler, request_body, verbose=False):
+        host, extra_headers, x509 = self.get_host_info(host)
+        headers = dict(extra_headers or [])
+        headers['Content-Type'] = 'text/xml'
+
+        conn, response = self._open(
+            host, 'POST', handler, request_body, headers, verbose)
+        try:
+            if response.status != 200:
+                response.read()
+                raise xmlrpclib.ProtocolError(
+                    host + handler,
+                    response.status, response.reason,
+                    response.msg
+                )
+            self.verbose = verbose
+            result = self._parse(response)
+        except:
+            conn.close()
+            raise
+        self._release(host, conn, response)
+        return result
+
+    def stream(self, host, handler, request_body, paths):
+        """Perform an XML-RPC request and decode the response incrementally.
+
+        The request is sent and the response status checked before
+        returning.  Return an iterator of ``(path, item)`` pairs for
+        the items of arrays at the given paths (see ``bzlib.stream``).
+        """
+        host, extra_headers, x509 = self.get_host_info(host)
+        headers = dict(extra_headers or [])
+        headers['Content-Type'] = 'text/xml'
+
+        conn, response = self._open(
+            host, 'POST', handler, request_body, headers)
+        if response.status != 200:
+            conn.close()
+            raise xmlrpclib.ProtocolError(
+                host + handler,
+                response.status, response.reason,
+                response.msg
+            )
+        return self._iterparse(host, conn, response, paths)
+
+    def _parse(self, response):
+        """Parse an XML-RPC response; return the result."""
+        body = _Body(self, response)
+        p, u = self.getparser()
+        for data in iter(lambda: body.read(STREAM_CHUNK_SIZE), b''):
+            if self.verbose:
+                print('body: {!r}'.format(data))
+            p.feed(data)
+        p.close()
+        return u.close()
+
+    def _iterparse(self, host, conn, response, paths):
+        body = _Body(self, response)
+        chunks = iter(lambda: body.read(STREAM_CHUNK_SIZE), b'')
+        items = _stream.iterparse(chunks, paths, self._use_datetime)
+        complete = False
+        try:
+            for item in items:
+                yield item
+            complete = True
+        finally:
+            # an abandoned response leaves the connection unusable
+            if complete:
+                self._release(host, conn, response)
+            else:
+                conn.close()
+
+    def http_request(self, host, method, handler, body=None, headers=None):
+        """Perform an HTTP request on a pooled connection.
+
+        Return a ``(response, data)`` pair, where ``data`` is the
+        response body.
+        """
+        host, extra_headers, x509 = self.get_host_info(host)
+        headers = dict(headers or {})
+        headers.update(extra_headers or [])
+        conn, response = self._open(host, method, handler, body, headers)
+        try:
+            data = _Body(self, response).read()
+        except:
+            conn.close()
+            raise
+        self._release(host, conn, response)
+        return response, data
+
+    def _open(self, host, method, handler, body, headers, verbose=False):
+        """Send a request; return the connection and response."""
+        headers['User-Agent'] = self.user_agent
+        body = self._encode(body, headers)
+        while True:
+            timeout = policy.remaining()
+            if timeout is None:
+                timeout = socket.getdefaulttimeout()
+            conn, reused = self.pool.acquire(host)
+            if verbose:
+                conn.set_debuglevel(1)
+            # applies to new connections, and reused ones' sockets
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, handler, body, headers)
+                return conn, conn.getresponse()
+            except (socket.error, httplib.HTTPException):
+                conn.close()
+                if not reused:
+                    raise
+                # the server closed an idle connection; try another
+
+    def _release(self, host, conn, response):
+        """Return the connection to the pool if it can be reused."""
+        if response.will_close:
+            conn.close()
+        else:
+            self.pool.release(host, conn)
+
+    def close(self):
+        self.pool.close()
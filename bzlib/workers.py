@@ -0,0 +1,90 @@
+# This file is part of bugzillatools
+# Copyright (C) 2026 bugzillatools contributors
+#
+# bugzillatools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Run a function over many items on a pool of threads."""
+
+import threading
+
+
+class Job(object):
+    """The application of a function to one item.
+
+    After the job has run, ``result`` is the return value of the
+    function, or ``error`` the exception it raised.
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self._thread = None
+
+    def __call__(self, fn):
+        try:
+            self.result = fn(self.item)
+        except Exception as e:
+            self.error = e
+
+    def wait(self):
+        """Wait for a job started by ``start`` to complete; return it."""
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+
+def start(fn, item):
+    """Call ``fn`` on the item in a new thread; return its ``Job``."""
+    job = Job(item)
+    job._thread = threading.Thread(target=job, args=(fn,))
+    job._thread.daemon = True
+    job._thread.start()
+    return job
+
+
+def run(fn, items, jobs=1):
+    """Call ``fn`` on each item, using up to ``jobs`` threads.
+
+    Return a list of ``Job`` objects in the order of the items.
+    Exceptions raised by ``fn`` are recorded in the jobs, so a failure
+    for one item does not prevent the others being processed.
+    """
+    queue = [Job(item) for item in items]
+    if jobs <= 1 or len(queue) <= 1:
+        for job in queue:
+            job(fn)
+        return queue
+
+    pending = iter(queue)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                job = next(pending, None)
+            if job is None:
+                return
+            job(fn)
+
+    threads = [
+        threading.Thread(target=worker)
+        for i in range(min(jobs, len(queue)))
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return queue